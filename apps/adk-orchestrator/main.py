@@ -1,25 +1,41 @@
+import asyncio
 import json
 import logging
 import os
 
 # Import Agent SDK components
 import sys
+import time
 import uuid
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
 
-import yaml
-from fastapi import APIRouter, FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "packages"))
 
 from agent_sdk.capabilities.negotiator import CapabilityNegotiator
 from agent_sdk.contracts import AgentBase, AgentContext
-from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
-from agent_sdk.sandbox.subprocess_executor import SubprocessSandbox
+from agent_sdk.discovery import ENTRY_POINT_GROUP, discover, lazy_agents, lazy_tools
+from agent_sdk.protocol.messages import AgentMessage, Artifact
+from agent_sdk.tools.cache import tool_run
 from agent_sdk.tools.protocol import ToolRegistry
+from event_bus.bus import LocalEventBus, OverflowPolicy
+from event_bus.tail import KEEPALIVE, TailHub
+
+if TYPE_CHECKING:
+    from agent_sdk.artifacts.blob_store import BlobStore
+    from agent_sdk.llm.router_client import LLMRouterClient
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+    from agent_sdk.runners.worker_pool import WorkerPool
+    from agent_sdk.sandbox.subprocess_executor import SubprocessSandbox
+    from event_bus.uds import UnixSocketEventBus
 
 # --- simple JSON logger ---
 logging.basicConfig(
@@ -30,8 +46,17 @@ log = logging.getLogger("kyros")
 
 # --- Pydantic Settings Configuration ---
 class OrchestratorConfig(BaseModel):
+    # Worker processes for agents registered with hosting="process"
     workers: int = 4
     timeout_seconds: int = 300
+    # Store streamed agent increments for /v1/runs/{run_id}/progress
+    persist_progress: bool = True
+    # Stored increments older than this are deleted (null keeps them forever)
+    progress_retention_seconds: Optional[float] = 7 * 24 * 3600
+    # Run events stay in this process ("local") or are shared with every
+    # process on the host through a broker socket ("unix")
+    event_bus: str = "local"
+    event_socket_path: str = "data/events.sock"
 
 
 class SandboxConfig(BaseModel):
@@ -43,11 +68,25 @@ class SandboxConfig(BaseModel):
 class MemoryConfig(BaseModel):
     vector_store: bool = False
     history_limit: int = 100
+    vector_path: str = "data/vectors"
+    vector_dim: int = 256
+    vector_ivf_lists: int = 0
+    recall_k: int = 5
+    history_cache_bytes: int = 16 * 1024 * 1024
+    # Content-addressed store for outputs too large to keep in results
+    artifact_path: str = "data/artifacts"
+    artifact_inline_bytes: int = 16 * 1024
+    artifact_gc_grace_seconds: float = 3600.0
 
 
 class ToolsConfig(BaseModel):
     auto_discover: bool = True
+    # Plugin manifests (relative to this app) and entry point group to scan
+    manifest_dirs: List[str] = ["manifests"]
+    entry_point_group: str = ENTRY_POINT_GROUP
     validation: str = "strict"
+    executor_concurrency: Optional[int] = None
+    cache_size: int = 1024
 
 
 class AgentsConfig(BaseModel):
@@ -60,8 +99,22 @@ class LogConfig(BaseModel):
     json_format: bool = True
 
 
+class LLMRouterConfig(BaseModel):
+    max_connections: int = 64
+    max_keepalive: int = 16
+    # Concurrent requests per model, with per-model overrides
+    max_concurrency: int = 8
+    model_concurrency: Dict[str, int] = {}
+    timeout_seconds: float = 120.0
+    max_retries: int = 3
+    # On-disk response cache; off unless a path is set
+    cache_path: Optional[str] = None
+    cache_ttl_seconds: Optional[float] = None
+
+
 class ServicesConfig(BaseModel):
     orchestrator: OrchestratorConfig = OrchestratorConfig()
+    llm_router: LLMRouterConfig = LLMRouterConfig()
 
 
 class AppConfig(BaseSettings):
@@ -75,14 +128,24 @@ class AppConfig(BaseSettings):
 
     # Environment variables for model configuration
     llm_router_base: str = "http://localhost:4000"
+    llm_router_key: Optional[SecretStr] = None
     model_planner: str = "gpt-5-high"
     model_impl: str = "gemini-2.5-pro"
     model_deep: str = "claude-4-sonnet"
 
+    # Collaboration event log followed by /collab/events/tail
+    collab_events_path: str = "collaboration/events.jsonl"
+
+
+# Settings left out of GET /v1/config
+SECRET_SETTINGS = ("llm_router_key",)
+
 
 # --- config loader ---
 def load_config():
     """Load configuration from YAML files and environment variables"""
+    import yaml
+
     base_path = os.path.join(os.path.dirname(__file__), "config")
 
     def read_yaml(name):
@@ -134,8 +197,22 @@ class RunResponse(BaseModel):
     notes: Optional[str] = None
 
 
-# --- Global configuration instance ---
-config = load_config()
+class HistoryPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_after_id: Optional[int] = None
+
+
+class SearchHit(BaseModel):
+    id: int
+    agent_id: Optional[str] = None
+    task_id: Optional[str] = None
+    ts: Optional[str] = None
+    snippet: str
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
 
 
 # --- Agent SDK Integration ---
@@ -144,37 +221,225 @@ class AgentOrchestrator:
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.memory_store = SQLiteMemoryStore(
-            db_path=config.get("agents", {})
-            .get("memory", {})
-            .get("db_path", "data/kyros.db")
-        )
-        self.tool_registry = ToolRegistry()
-        self.sandbox = SubprocessSandbox()
+        self.tool_registry = ToolRegistry(**self._tool_settings())
         self.negotiator = CapabilityNegotiator()
         self.agents: Dict[str, AgentBase] = {}
+        # Agents run in worker processes, whose memory writes bypass our cache
+        self.pooled_agents: Set[str] = set()
+        # Streamed run increments ("run.message", "run.artifact") and
+        # completions ("run.completed"); a slow subscriber loses its oldest
+        # queued events rather than holding up the agent
+        self.events = self._create_event_bus()
 
         # Initialize with example agent if available
         self._initialize_agents()
 
+    def _create_event_bus(self) -> "LocalEventBus | UnixSocketEventBus":
+        orchestrator_config = self.config.get("services", {}).get("orchestrator", {})
+        transport = orchestrator_config.get("event_bus", "local")
+        local = LocalEventBus(overflow=OverflowPolicy.DROP_OLDEST)
+        if transport == "local":
+            return local
+        if transport == "unix":
+            from event_bus.uds import UnixSocketEventBus
+
+            return UnixSocketEventBus(
+                orchestrator_config.get("event_socket_path", "data/events.sock"),
+                local=local,
+            )
+        raise ValueError(f"Unknown event bus: {transport!r}")
+
+    # The memory store (aiosqlite, optionally numpy) and sandbox are created
+    # on first use rather than with the orchestrator
+    @cached_property
+    def memory_store(self) -> "SQLiteMemoryStore":
+        from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+
+        return SQLiteMemoryStore.from_settings(**self._memory_settings())
+
+    def _memory_settings(self) -> Dict[str, Any]:
+        """SQLiteMemoryStore.from_settings arguments, also sent to worker processes."""
+        memory_config = self.config.get("agents", {}).get("memory", {})
+        orchestrator_config = self.config.get("services", {}).get("orchestrator", {})
+        return {
+            "db_path": memory_config.get("db_path", "data/kyros.db"),
+            "vector_store": bool(memory_config.get("vector_store")),
+            "vector_path": memory_config.get("vector_path", "data/vectors"),
+            "vector_dim": memory_config.get("vector_dim", 256),
+            "vector_ivf_lists": memory_config.get("vector_ivf_lists", 0),
+            "history_cache_bytes": memory_config.get(
+                "history_cache_bytes", 16 * 1024 * 1024
+            ),
+            "progress_retention_seconds": orchestrator_config.get(
+                "progress_retention_seconds", 7 * 24 * 3600
+            ),
+        }
+
+    @cached_property
+    def artifact_store(self) -> "BlobStore":
+        from agent_sdk.artifacts.blob_store import BlobStore
+
+        memory_config = self.config.get("agents", {}).get("memory", {})
+        return BlobStore(
+            root=memory_config.get("artifact_path", "data/artifacts"),
+            inline_limit=memory_config.get("artifact_inline_bytes", 16 * 1024),
+        )
+
+    async def collect_artifacts(self) -> Dict[str, Any]:
+        """Delete stored artifacts that no stored interaction references."""
+        memory_config = self.config.get("agents", {}).get("memory", {})
+        referenced = await self.memory_store.artifact_refs()
+        result = await asyncio.to_thread(
+            self.artifact_store.gc,
+            referenced,
+            memory_config.get("artifact_gc_grace_seconds", 3600.0),
+        )
+        log.info(json.dumps({"event": "artifact_gc", **asdict(result)}))
+        return asdict(result)
+
+    @cached_property
+    def sandbox(self) -> "SubprocessSandbox":
+        from agent_sdk.sandbox.subprocess_executor import SubprocessSandbox
+
+        return SubprocessSandbox()
+
+    def _tool_settings(self) -> Dict[str, Any]:
+        """ToolRegistry settings from agents.tools, also given to agents."""
+        tools_config = self.config.get("agents", {}).get("tools", {})
+        return {
+            "validation": tools_config.get("validation", "strict"),
+            "executor_concurrency": tools_config.get("executor_concurrency"),
+            "cache_size": tools_config.get("cache_size", 1024),
+        }
+
+    def _llm_router_settings(self) -> Dict[str, Any]:
+        router_config = self.config.get("services", {}).get("llm_router", {})
+        api_key = self.config.get("llm_router_key")
+        if isinstance(api_key, SecretStr):
+            api_key = api_key.get_secret_value()
+        return {
+            "base_url": self.config.get("llm_router_base", "http://localhost:4000"),
+            "api_key": api_key,
+            "max_connections": router_config.get("max_connections", 64),
+            "max_keepalive": router_config.get("max_keepalive", 16),
+            "max_concurrency": router_config.get("max_concurrency", 8),
+            "model_concurrency": router_config.get("model_concurrency", {}),
+            "timeout_seconds": router_config.get("timeout_seconds", 120.0),
+            "max_retries": router_config.get("max_retries", 3),
+            "cache_dir": router_config.get("cache_path"),
+            "cache_ttl_seconds": router_config.get("cache_ttl_seconds"),
+        }
+
+    # One router client (and connection pool) shared by every agent
+    @cached_property
+    def llm_router(self) -> "LLMRouterClient":
+        from agent_sdk.llm.router_client import LLMRouterClient
+
+        return LLMRouterClient(**self._llm_router_settings())
+
+    @cached_property
+    def worker_pool(self) -> "WorkerPool":
+        from agent_sdk.runners.worker_pool import WorkerPool
+
+        # Workers build their own stores and sandbox from the same settings
+        memory_config = self.config.get("agents", {}).get("memory", {})
+        providers = {
+            "memory_store": (
+                "agent_sdk.memory.sqlite_store:SQLiteMemoryStore.from_settings",
+                self._memory_settings(),
+            ),
+            "sandbox": ("agent_sdk.sandbox.subprocess_executor:SubprocessSandbox", {}),
+            "artifact_store": (
+                "agent_sdk.artifacts.blob_store:BlobStore",
+                {
+                    "root": memory_config.get("artifact_path", "data/artifacts"),
+                    "inline_limit": memory_config.get(
+                        "artifact_inline_bytes", 16 * 1024
+                    ),
+                },
+            ),
+            "llm_router": (
+                "agent_sdk.llm.router_client:LLMRouterClient",
+                self._llm_router_settings(),
+            ),
+            "tool_settings": ("builtins:dict", self._tool_settings()),
+        }
+        orchestrator_config = self.config.get("services", {}).get("orchestrator", {})
+        return WorkerPool(size=orchestrator_config.get("workers"), providers=providers)
+
     def _initialize_agents(self):
         """Initialize available agents."""
+        tools_config = self.config.get("agents", {}).get("tools", {})
+        if tools_config.get("auto_discover", True):
+            self._discover_plugins(tools_config)
+            return
         try:
             from agent_sdk.runners.example_agent import ExampleAgent
 
-            example_agent = ExampleAgent(self.memory_store, self.sandbox)
+            example_agent = ExampleAgent(
+                self.memory_store,
+                self.sandbox,
+                self.artifact_store,
+                tool_settings=self._tool_settings(),
+            )
             self.register_agent(example_agent)
         except ImportError:
             log.warning("Example agent not available")
 
-    def register_agent(self, agent: AgentBase):
-        """Register an agent with the orchestrator."""
+    def _discover_plugins(self, tools_config: Dict[str, Any]):
+        """Register tools and agents from plugin manifests; code loads on first call."""
+        base_path = os.path.dirname(__file__)
+        found = discover(
+            [
+                os.path.join(base_path, directory)
+                for directory in tools_config.get("manifest_dirs", ["manifests"])
+            ],
+            tools_config.get("entry_point_group", ENTRY_POINT_GROUP),
+        )
+        for source, error in found.errors:
+            log.warning(
+                json.dumps(
+                    {"event": "manifest_error", "source": source, "error": error}
+                )
+            )
+        for tool, executor in lazy_tools(found.manifests):
+            self.tool_registry.register(tool, executor)
+        providers = {
+            "memory_store": lambda: self.memory_store,
+            "sandbox": lambda: self.sandbox,
+            "artifact_store": lambda: self.artifact_store,
+            "llm_router": lambda: self.llm_router,
+            "tool_settings": self._tool_settings,
+        }
+        for agent in lazy_agents(found.manifests, providers):
+            self.register_agent(
+                agent, priority=agent.manifest.priority, hosting=agent.manifest.hosting
+            )
+
+    def register_agent(
+        self, agent: AgentBase, priority: int = 1, hosting: str = "inline"
+    ):
+        """
+        Register an agent with the orchestrator.
+
+        With ``hosting="process"`` the agent runs in the worker pool instead:
+        each worker builds its own instance from the agent's manifest factory
+        (or its class), so ``agent`` itself is only used for its name and
+        capabilities.
+        """
+        if hosting == "process":
+            from agent_sdk.runners.worker_pool import PooledAgent, manifest_for
+
+            agent = PooledAgent(self.worker_pool, manifest_for(agent))
+            self.pooled_agents.add(agent.get_name())
+        elif hosting != "inline":
+            raise ValueError(f"Unknown agent hosting: {hosting!r}")
         agent_id = agent.get_name()
         self.agents[agent_id] = agent
 
         # Register with capability negotiator
         capabilities = agent.capabilities()
-        self.negotiator.register_agent(agent, capabilities)
+        self.negotiator.register_agent(agent, capabilities, priority=priority)
 
         log.info(
             json.dumps(
@@ -182,6 +447,7 @@ class AgentOrchestrator:
                     "event": "agent_registered",
                     "agent_id": agent_id,
                     "capabilities": capabilities,
+                    "hosting": hosting,
                 }
             )
         )
@@ -198,35 +464,72 @@ class AgentOrchestrator:
                 "missing_capabilities": missing_caps,
             }
 
+        # Recall similar past interactions when the vector store is enabled
+        memory: Dict[str, Any] = {}
+        if self.memory_store.vector_index is not None:
+            memory["recall"] = await self.memory_store.recall(
+                task.get("description", ""),
+                k=self.config["agents"]["memory"].get("recall_k", 5),
+                tenant_id=task.get("tenant_id"),
+            )
+
         # Create agent context
         tools_as_dicts = [tool.model_dump() for tool in self.tool_registry.list_all()]
         context = AgentContext(
             task=task,
             tools=tools_as_dicts,
-            memory={},
+            memory=memory,
             telemetry={"mode": mode, "timestamp": datetime.utcnow().isoformat()},
             tenant_id=task.get("tenant_id"),
         )
 
-        # Execute with the selected agent
+        # Execute with the selected agent; run-scoped tool results are
+        # memoized under the task id and dropped once it finishes
+        run_id = task.get("id", "unknown")
+        agent_id = best_agent.get_name()
+        started = time.perf_counter()
+        first_update_ms: Optional[float] = None
         try:
-            result: Dict[str, Any] = await best_agent.execute(context)
+            result: Optional[Dict[str, Any]] = None
+            with tool_run(run_id):
+                # Increments are forwarded as they arrive; agents without
+                # execute_stream yield only their final result
+                async with aclosing(best_agent.execute_stream(context)) as updates:
+                    async for update in updates:
+                        if isinstance(update, dict):
+                            result = update
+                            continue
+                        if first_update_ms is None:
+                            first_update_ms = (time.perf_counter() - started) * 1000
+                        await self._forward_update(run_id, agent_id, update)
+            if result is None:
+                raise RuntimeError("Agent stream ended without a result")
 
             # Log the interaction
             log.info(
                 json.dumps(
                     {
                         "event": "task_executed",
-                        "agent_id": best_agent.get_name(),
+                        "agent_id": agent_id,
                         "mode": mode,
                         "task_id": task.get("id", "unknown"),
                         "status": result.get("status", "unknown"),
                         "rationale_summary": result.get("message", {}).get(
                             "rationale_summary", ""
                         ),
+                        "first_update_ms": first_update_ms,
+                        "duration_ms": (time.perf_counter() - started) * 1000,
                     }
                 )
             )
+            await self.events.publish(
+                "run.completed",
+                {
+                    "run_id": run_id,
+                    "agent_id": agent_id,
+                    "status": result.get("status"),
+                },
+            )
 
             return result
 
@@ -241,11 +544,50 @@ class AgentOrchestrator:
                     }
                 )
             )
+            await self.events.publish(
+                "run.completed",
+                {"run_id": run_id, "agent_id": agent_id, "status": "error"},
+            )
             return {
                 "status": "error",
                 "error": str(e),
                 "agent_id": best_agent.get_name(),
             }
+        finally:
+            for registry in self.tool_registries().values():
+                registry.clear_cache(run_id)
+            if agent_id in self.pooled_agents:
+                # The worker stored the run's history in its own process
+                self.memory_store.invalidate_history(run_id)
+            # Increments are stored in batches; write the run's last ones now
+            try:
+                await self.memory_store.flush_progress()
+            except Exception as e:
+                log.error(
+                    json.dumps({"event": "progress_flush_error", "error": str(e)})
+                )
+
+    async def _forward_update(
+        self, run_id: str, agent_id: str, update: "AgentMessage | Artifact"
+    ):
+        """Publish a streamed message or artifact, then queue it for storage."""
+        kind = "message" if isinstance(update, AgentMessage) else "artifact"
+        payload = update.model_dump(mode="json")
+        await self.events.publish(
+            f"run.{kind}", {"run_id": run_id, "agent_id": agent_id, kind: payload}
+        )
+        orchestrator_config = self.config.get("services", {}).get("orchestrator", {})
+        if orchestrator_config.get("persist_progress", True):
+            await self.memory_store.store_progress(agent_id, run_id, kind, payload)
+
+    def tool_registries(self) -> Dict[str, ToolRegistry]:
+        """The orchestrator's tool registry and those of agents that expose one."""
+        registries = {"orchestrator": self.tool_registry}
+        for agent_id, agent in self.agents.items():
+            registry = getattr(agent, "tool_registry", None)
+            if isinstance(registry, ToolRegistry):
+                registries[agent_id] = registry
+        return registries
 
     async def get_agent_status(self) -> Dict[str, Any]:
         """Get status of all registered agents."""
@@ -254,11 +596,50 @@ class AgentOrchestrator:
 
     async def cleanup(self):
         """Clean up resources."""
-        await self.sandbox.cleanup()
+        await self.events.close(timeout=5.0)
+        if "memory_store" in self.__dict__:
+            await self.memory_store.flush_progress()
+        if "worker_pool" in self.__dict__:
+            await self.worker_pool.close()
+        if "llm_router" in self.__dict__:
+            await self.llm_router.aclose()
+        if "sandbox" in self.__dict__:
+            await self.sandbox.cleanup()
+
+
+# --- Application state, built on first use ---
+_config: Optional[Dict[str, Any]] = None
+_orchestrator: Optional[AgentOrchestrator] = None
+
+
+def get_app_config() -> Dict[str, Any]:
+    """Configuration, loaded from YAML and the environment on first call."""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
 
 
-# --- Global orchestrator instance ---
-orchestrator = AgentOrchestrator(config)
+def get_orchestrator() -> AgentOrchestrator:
+    """The process-wide orchestrator, built on first call."""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = AgentOrchestrator(get_app_config())
+    return _orchestrator
+
+
+def __getattr__(name: str) -> Any:
+    # ``main.config`` and ``main.orchestrator`` still work, without being
+    # built at import time
+    if name == "config":
+        return get_app_config()
+    if name == "orchestrator":
+        return get_orchestrator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# One tail reader per event log, shared by every SSE client
+event_tails = TailHub()
 
 
 # --- very small "workflow" shim (will call engine later) ---
@@ -267,6 +648,7 @@ def run_with_engine(
 ) -> str:
     """Simulate running a workflow with the engine"""
     needs_deep = any(label in labels for label in ["needs:deep-refactor", "complex"])
+    config = get_app_config()
     impl = (
         config.get("model_deep", "claude-4-sonnet")
         if needs_deep
@@ -279,10 +661,21 @@ def run_with_engine(
 
 
 # --- FastAPI setup ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the orchestrator before serving; release it on shutdown."""
+    get_orchestrator()
+    yield
+    await event_tails.close()
+    if _orchestrator is not None:
+        await _orchestrator.cleanup()
+
+
 app = FastAPI(
     title="Kyros Orchestrator API",
     version="1.0.0",
     description="API for managing agent runs and system configuration",
+    lifespan=lifespan,
 )
 api = APIRouter(prefix="/v1")
 
@@ -306,7 +699,7 @@ async def runs_plan(req: RunRequest):
         }
 
         # Execute task using orchestrator
-        result = await orchestrator.execute_task(task, "plan")
+        result = await get_orchestrator().execute_task(task, "plan")
 
         # Extract rationale summary for logging
         rationale_summary = ""
@@ -359,7 +752,7 @@ async def runs_implement(req: RunRequest):
         }
 
         # Execute task using orchestrator
-        result = await orchestrator.execute_task(task, "implement")
+        result = await get_orchestrator().execute_task(task, "implement")
 
         log.info(
             json.dumps(
@@ -404,7 +797,7 @@ async def runs_critic(req: RunRequest):
         }
 
         # Execute task using orchestrator
-        result = await orchestrator.execute_task(task, "critic")
+        result = await get_orchestrator().execute_task(task, "critic")
 
         log.info(
             json.dumps(
@@ -430,19 +823,239 @@ async def runs_critic(req: RunRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@api.get("/runs/{run_id}/history", response_model=HistoryPage)
+async def get_run_history(
+    run_id: str,
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """Page through stored interactions for a run, oldest first"""
+    page_size = limit or get_app_config()["agents"]["memory"]["history_limit"]
+    try:
+        items: List[Dict[str, Any]] = []
+        async with aclosing(
+            get_orchestrator().memory_store.iter_history(
+                run_id, after_id=after_id, page_size=page_size
+            )
+        ) as rows:
+            async for row in rows:
+                items.append(row)
+                if len(items) == page_size:
+                    break
+
+        next_after_id = items[-1]["id"] if len(items) == page_size else None
+        return HistoryPage(items=items, next_after_id=next_after_id)
+    except Exception as e:
+        log.error(json.dumps({"event": "run_history_error", "error": str(e)}))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@api.get("/runs/{run_id}/progress", response_model=HistoryPage)
+async def get_run_progress(
+    run_id: str,
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Page through messages and artifacts a run has streamed so far"""
+    try:
+        items = await get_orchestrator().memory_store.progress(
+            run_id, after_id=after_id, limit=limit
+        )
+        next_after_id = items[-1]["id"] if len(items) == limit else None
+        return HistoryPage(items=items, next_after_id=next_after_id)
+    except Exception as e:
+        log.error(json.dumps({"event": "run_progress_error", "error": str(e)}))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+RUN_EVENTS = ("run.message", "run.artifact", "run.completed")
+
+
+@api.get("/runs/events")
+async def stream_run_events(run_id: Optional[str] = None):
+    """Stream run messages, artifacts and completions as SSE while runs execute"""
+    events = get_orchestrator().events
+    # One frame in hand per client: a slow client backs up its bus
+    # subscriptions, which drop their oldest events rather than stall agents
+    frames: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=1)
+
+    def forward(event_type: str):
+        async def handler(payload: dict, metadata: Optional[dict]) -> None:
+            if run_id is None or payload.get("run_id") == run_id:
+                data = json.dumps(payload).encode()
+                await frames.put(
+                    b"event: %s\ndata: %s\n\n" % (event_type.encode(), data)
+                )
+
+        return handler
+
+    subscriptions = [
+        events.subscribe(event_type, forward(event_type)) for event_type in RUN_EVENTS
+    ]
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(frames.get(), 15.0)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                yield frame
+                if run_id is not None and frame.startswith(b"event: run.completed"):
+                    return
+        finally:
+            # Disconnected clients must not stay subscribed
+            for subscription in subscriptions:
+                subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.get("/history/search", response_model=SearchResponse)
+async def search_history(
+    q: str = Query(..., min_length=1),
+    tenant_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Full-text search over stored interactions, ranked by relevance"""
+    try:
+        results = await get_orchestrator().memory_store.search(q, tenant_id, limit)
+        return SearchResponse(results=[SearchHit(**hit) for hit in results])
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        log.error(json.dumps({"event": "history_search_error", "error": str(e)}))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@api.get("/memory/stats")
+async def get_memory_stats():
+    """Get history cache hit-rate and size counters"""
+    return {"history_cache": get_orchestrator().memory_store.cache_stats()}
+
+
+@api.get("/tools/cache/stats")
+async def get_tool_cache_stats():
+    """Get memoized tool result hit-rate and size counters per registry"""
+    return {
+        name: registry.cache_stats()
+        for name, registry in get_orchestrator().tool_registries().items()
+    }
+
+
+@api.get("/llm/stats")
+async def get_llm_stats():
+    """Get LLM router client request, retry, coalescing and cache counters"""
+    orchestrator = get_orchestrator()
+    if "llm_router" not in orchestrator.__dict__:
+        return {"llm_router": None}
+    return {"llm_router": orchestrator.llm_router.stats()}
+
+
+@api.get("/artifacts/{ref}")
+async def get_artifact(
+    ref: str, range_header: Optional[str] = Header(None, alias="Range")
+):
+    """Serve a stored artifact, honouring single byte-range requests"""
+    from agent_sdk.artifacts.blob_store import parse_range
+
+    store = get_orchestrator().artifact_store
+    try:
+        blob = store.open(ref)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid artifact ref")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{ref}"'}
+    try:
+        requested = parse_range(range_header, blob.size)
+    except ValueError:
+        blob.close()
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{blob.size}"},
+        )
+    start, end = requested if requested is not None else (0, blob.size)
+    headers["Content-Length"] = str(end - start)
+    if requested is not None:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{blob.size}"
+
+    def body():
+        with blob:
+            yield from blob.chunks(start, end)
+
+    return StreamingResponse(
+        body(),
+        status_code=206 if requested is not None else 200,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+@api.post("/artifacts/gc")
+async def collect_artifacts():
+    """Delete stored artifacts no stored interaction references"""
+    try:
+        return await get_orchestrator().collect_artifacts()
+    except Exception as e:
+        log.error(json.dumps({"event": "artifact_gc_error", "error": str(e)}))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@api.get("/agents/workers")
+async def get_agent_workers():
+    """Get pid, load and restart counters for agent worker processes"""
+    orchestrator = get_orchestrator()
+    if "worker_pool" not in orchestrator.__dict__:
+        return {"workers": []}
+    return {"workers": orchestrator.worker_pool.stats()}
+
+
 @api.get("/agents/status")
 async def get_agents_status():
     """Get status of all registered agents"""
     try:
-        status = await orchestrator.get_agent_status()
+        status = await get_orchestrator().get_agent_status()
         return {"agents": status}
     except Exception as e:
         log.error(json.dumps({"event": "agent_status_error", "error": str(e)}))
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+collab = APIRouter(prefix="/collab")
+
+
+@collab.get("/events/tail")
+async def tail_events(
+    offset: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Stream appended collaboration events as SSE, resuming from an offset"""
+    if offset is None and last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+    tail = event_tails.get(get_app_config()["collab_events_path"])
+
+    async def stream():
+        async with aclosing(tail.follow(offset, keepalive=15.0)) as records:
+            async for batch in records:
+                yield b"".join(record.frame for record in batch) or KEEPALIVE
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Include the v1 API router
 app.include_router(api)
+app.include_router(collab)
 
 # Response models for basic endpoints
 class HealthResponse(BaseModel):
@@ -465,13 +1078,9 @@ def readyz():
 @app.get("/v1/config")
 def get_config():
     """Get orchestrator configuration"""
-    return config
-
+    config = get_app_config()
+    return {key: value for key, value in config.items() if key not in SECRET_SETTINGS}
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Clean up resources on shutdown"""
-    await orchestrator.cleanup()
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,12 +3,39 @@
 Hermetic test script for the orchestrator API using FastAPI TestClient
 """
 
+import asyncio
+import json
+import os
+import subprocess
 import sys
+import time
+from contextlib import aclosing
 
 from fastapi.testclient import TestClient
 
 # Import the FastAPI app
-from main import app
+from main import app, orchestrator
+
+# Cold-start budget for `import main` (cumulative, per -X importtime); most of
+# it is FastAPI and pydantic, which the app cannot avoid
+IMPORT_BUDGET_MS = float(os.environ.get("KYROS_IMPORT_BUDGET_MS", "1500"))
+
+# Event stores and repositories import each other as top-level modules
+DATA_ACCESS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "packages", "data-access"
+)
+
+# Modules that must only load once a request needs them
+LAZY_MODULES = [
+    "aiosqlite",
+    "numpy",
+    "yaml",
+    "agent_sdk.memory.sqlite_store",
+    "agent_sdk.sandbox.subprocess_executor",
+    "agent_sdk.runners.example_agent",
+    "agent_sdk.llm.router_client",
+    "httpx",
+]
 
 
 def test_orchestrator():
@@ -76,6 +103,1917 @@ def test_orchestrator():
         return False
 
 
+def test_run_history_pagination():
+    """Test keyset pagination over a run's stored interactions"""
+    client = TestClient(app)
+
+    plan_data = {
+        "pr": {
+            "repo": "test/repo",
+            "pr_number": 7,
+            "branch": "feature/history",
+            "head_sha": "def456abc123",
+        },
+        "mode": "plan",
+    }
+    run_id = client.post("/v1/runs/plan", json=plan_data).json()["run_id"]
+
+    response = client.get(f"/v1/runs/{run_id}/history", params={"limit": 1})
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page["items"]) == 1
+    assert page["items"][0]["context"]["task"]["id"] == run_id
+    assert page["next_after_id"] == page["items"][0]["id"]
+
+    response = client.get(
+        f"/v1/runs/{run_id}/history",
+        params={"after_id": page["next_after_id"], "limit": 1},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_after_id": None}
+
+
+def test_history_search():
+    """Test full-text search returns ranked snippets for stored interactions"""
+    client = TestClient(app)
+
+    plan_data = {
+        "pr": {
+            "repo": "search/needle-repo",
+            "pr_number": 42,
+            "branch": "feature/search",
+            "head_sha": "0123abcd",
+        },
+        "mode": "plan",
+    }
+    run_id = client.post("/v1/runs/plan", json=plan_data).json()["run_id"]
+
+    response = client.get("/v1/history/search", params={"q": "needle-repo#42"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert any(hit["task_id"] == run_id for hit in results)
+    assert all("[" in hit["snippet"] for hit in results)
+
+    response = client.get(
+        "/v1/history/search", params={"q": "needle-repo", "tenant_id": "other"}
+    )
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_history_search_tenants(tmp_path, monkeypatch):
+    """Test search filters tenants inside the MATCH and migrates the old index"""
+    import sqlite3
+
+    from agent_sdk.memory import sqlite_store
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+
+    db_path = str(tmp_path / "fts.db")
+    with sqlite3.connect(db_path) as db:
+        # Layout written before tenants were indexed: a full copy of the body
+        db.execute(
+            "CREATE TABLE agent_history (id INTEGER PRIMARY KEY, agent_id TEXT,"
+            " task_id TEXT, context TEXT, result TEXT, tenant_id TEXT,"
+            " ts DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        )
+        db.execute("CREATE VIRTUAL TABLE agent_history_fts USING fts5(body)")
+        for n, tenant in enumerate(["acme", "acme-corp", None, "acme", "acme"]):
+            context = {"task": {"description": f"segfault in parser {n}"}}
+            db.execute(
+                "INSERT INTO agent_history(agent_id, task_id, context, result,"
+                " tenant_id) VALUES ('a', ?, ?, '{}', ?)",
+                (f"t{n}", json.dumps(context), tenant),
+            )
+    monkeypatch.setattr(sqlite_store, "_FTS_BACKFILL_BATCH", 2)
+    store = SQLiteMemoryStore(db_path)
+
+    async def search(query, tenant_id):
+        return [hit["task_id"] for hit in await store.search(query, tenant_id)]
+
+    async def scenario():
+        assert sorted(await search("segfault parser", "acme")) == ["t0", "t3", "t4"]
+        assert await search("segfault", "acme-corp") == ["t1"]
+        assert await search("segfault", None) == ["t2"]
+        assert await search("tnone", None) == []
+        await store.store_interaction(
+            "a", "t5", {"task": {"description": "segfault"}, "tenant_id": "acme"}, {}
+        )
+        assert "t5" in await search("segfault", "acme")
+
+    asyncio.run(scenario())
+    with sqlite3.connect(db_path) as db:
+        db.execute("DELETE FROM agent_history WHERE task_id = 't0'")
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master")}
+    assert "agent_history_fts_content" not in tables
+    assert sorted(asyncio.run(search("parser", "acme"))) == ["t3", "t4"]
+
+
+def test_history_search_backfill_resumes(tmp_path, monkeypatch):
+    """Test an interrupted FTS backfill resumes and indexes rows written meanwhile"""
+    import sqlite3
+
+    import aiosqlite
+    import pytest
+    from agent_sdk.memory import sqlite_store
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+
+    db_path = str(tmp_path / "fts.db")
+    with sqlite3.connect(db_path) as db:
+        db.execute(
+            "CREATE TABLE agent_history (id INTEGER PRIMARY KEY, agent_id TEXT,"
+            " task_id TEXT, context TEXT, result TEXT, tenant_id TEXT,"
+            " ts DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        )
+        for n in range(7):
+            context = {"task": {"description": f"segfault in parser {n}"}}
+            db.execute(
+                "INSERT INTO agent_history(agent_id, task_id, context, result)"
+                " VALUES ('a', ?, ?, '{}')",
+                (f"t{n}", json.dumps(context)),
+            )
+    monkeypatch.setattr(sqlite_store, "_FTS_BACKFILL_BATCH", 2)
+
+    # Die right after the first backfill batch commits
+    commit = aiosqlite.Connection.commit
+
+    async def crashing_commit(self):
+        await commit(self)
+        try:
+            ((done_id,),) = await self.execute_fetchall(
+                "SELECT done_id FROM agent_history_fts_backfill"
+            )
+        except aiosqlite.OperationalError:
+            return
+        if done_id:
+            raise RuntimeError("killed mid-backfill")
+
+    monkeypatch.setattr(aiosqlite.Connection, "commit", crashing_commit)
+    with pytest.raises(RuntimeError):
+        asyncio.run(SQLiteMemoryStore(db_path)._init())
+    monkeypatch.setattr(aiosqlite.Connection, "commit", commit)
+
+    with sqlite3.connect(db_path) as db:
+        ((done_id, end_id),) = db.execute(
+            "SELECT done_id, end_id FROM agent_history_fts_backfill"
+        )
+        assert (done_id, end_id) == (2, 7)
+        # Written between the crash and the restart: the trigger indexes it,
+        # and deleting a row the backfill has not reached leaves the index intact
+        db.execute(
+            "INSERT INTO agent_history(agent_id, task_id, context, result)"
+            " VALUES ('a', 't7', ?, '{}')",
+            (json.dumps({"task": {"description": "segfault in parser 7"}}),),
+        )
+        db.execute("DELETE FROM agent_history WHERE task_id = 't5'")
+
+    store = SQLiteMemoryStore(db_path)
+
+    async def search(query):
+        return sorted(hit["task_id"] for hit in await store.search(query, None))
+
+    expected = [f"t{n}" for n in range(8) if n != 5]
+    assert asyncio.run(search("segfault parser")) == expected
+    with sqlite3.connect(db_path) as db:
+        db.execute(
+            "INSERT INTO agent_history_fts(agent_history_fts) VALUES ('integrity-check')"
+        )
+        ((done_id, end_id),) = db.execute(
+            "SELECT done_id, end_id FROM agent_history_fts_backfill"
+        )
+    assert done_id == end_id == 7
+
+
+def test_history_cache_stats():
+    """Test repeated history reads are served from the history cache"""
+    client = TestClient(app)
+    before = client.get("/v1/memory/stats").json()["history_cache"]
+
+    async def read_twice():
+        await orchestrator.memory_store.history("cache-probe")
+        await orchestrator.memory_store.history("cache-probe")
+
+    asyncio.run(read_twice())
+    after = client.get("/v1/memory/stats").json()["history_cache"]
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    assert 0.0 <= after["hit_rate"] <= 1.0
+
+
+def test_history_cache_writes_and_eviction(tmp_path):
+    """Test writes update cached pages in row order and eviction keeps the budget"""
+    from agent_sdk.memory.history_cache import HistoryCache
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+
+    store = SQLiteMemoryStore(str(tmp_path / "cache.db"), history_cache_bytes=4096)
+
+    async def scenario():
+        await store.store_interaction("a", "task", {"n": 0}, {"out": 0})
+        assert len(await store.history("task")) == 1
+        await asyncio.gather(
+            *(
+                store.store_interaction("a", "task", {"n": n}, {"out": n})
+                for n in range(1, 6)
+            )
+        )
+        cached = await store.history("task")
+        stats = store.cache_stats()
+        assert stats is not None and stats["hits"] == 1
+        store._history_cache = None
+        return cached, await store.history("task")
+
+    # Concurrent writers commit in any order; the cache follows row order
+    cached, stored = asyncio.run(scenario())
+    assert cached == stored and len(cached) == 6
+
+    cache = HistoryCache(max_bytes=100)
+    cache.put("a", [{"n": 1}], [40], [1], limit=10)
+    cache.put("b", [{"n": 2}], [40], [2], limit=10)
+    cache.get("a", 10)
+    cache.put("c", [{"n": 3}], [40], [3], limit=10)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    cache.put("huge", [{}], [101], [4], limit=10)
+    assert "huge" not in cache
+    # Late or duplicate rows land in id order; a task outgrowing the budget
+    # sheds its oldest rows
+    cache.prepend("a", {"n": 0}, 5, 0)
+    cache.prepend("a", {"n": 1}, 40, 1)
+    cache.prepend("a", {"n": 9}, 40, 9)
+    assert cache.get("a", 10) == [{"n": 9}, {"n": 1}, {"n": 0}]
+    cache.prepend("a", {"n": 10}, 40, 10)
+    stats = cache.stats()
+    assert stats.bytes <= stats.max_bytes and stats.evictions == 2
+    assert cache.get("a", 2) == [{"n": 10}, {"n": 9}] and cache.get("a", 3) is None
+
+
+def test_vector_index_recall(tmp_path):
+    """Test recall index appends, IVF training and sharing across instances"""
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+    from agent_sdk.memory.vector_index import VectorIndex
+
+    path = str(tmp_path / "vectors")
+    texts = [f"fix flaky test {n} in module_{n}" for n in range(64)]
+    first = VectorIndex(path, dim=64, nlist=2, initial_capacity=8)
+    second = VectorIndex(path, dim=64, nlist=2, initial_capacity=8)
+
+    async def add_concurrently():
+        # Two instances on the same files stand in for two processes
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(index.add, [n], [texts[n]])
+                for n in range(32)
+                for index in [(first, second)[n % 2]]
+            )
+        )
+
+    asyncio.run(add_concurrently())
+    assert first.search(["module_7"], k=1)[0][0][0] == 7
+    # No append overwrote another instance's row
+    assert sorted(first._ids[: len(first)]) == list(range(32))
+    assert first._centroids is None
+
+    # Reaching nlist * 32 rows trains the IVF partition; others load it
+    second.add(list(range(32, 64)), texts[32:])
+    assert second._centroids is not None
+    (hits,) = first.search(["module_40"], k=3)
+    assert first._centroids is not None and hits[0][0] == 40
+    assert sorted(i for lists in first._lists for i in lists) == list(range(64))
+    reopened = VectorIndex(path, dim=64, nlist=2)
+    assert len(reopened) == 64 and reopened.search(["module_63"], k=1)[0][0][0] == 63
+
+    store = SQLiteMemoryStore(
+        str(tmp_path / "recall.db"), vector_index=VectorIndex(str(tmp_path / "v2"))
+    )
+
+    async def recall():
+        for n, tenant in enumerate(["acme", "acme", "globex"]):
+            await store.store_interaction(
+                "agent",
+                f"task-{n}",
+                {"task": {"description": f"parser crash {n}"}, "tenant_id": tenant},
+                {"output": "traceback in parser" if n != 1 else "docs typo"},
+            )
+        return (
+            await store.recall("parser traceback", k=1, tenant_id="acme"),
+            await store.recall("parser traceback", k=5, tenant_id="globex"),
+        )
+
+    acme, globex = asyncio.run(recall())
+    assert [hit["task_id"] for hit in acme] == ["task-0"]
+    assert [hit["task_id"] for hit in globex] == ["task-2"]
+
+
+def test_event_bus_overflow_and_unsubscribe():
+    """Test overflow policies, counters, draining close and unsubscribe"""
+    from event_bus.bus import LocalEventBus, OverflowPolicy
+
+    async def scenario():
+        bus = LocalEventBus(queue_size=2)
+        gate = asyncio.Event()
+        seen = {"block": [], "oldest": [], "newest": []}
+
+        def recorder(name):
+            async def handler(payload, metadata):
+                await gate.wait()
+                if payload["n"] == 3 and name == "block":
+                    raise ValueError("boom")
+                seen[name].append(payload["n"])
+
+            return handler
+
+        bus.subscribe("t.block", recorder("block"), queue_size=1)
+        for name, policy in [
+            ("oldest", OverflowPolicy.DROP_OLDEST),
+            ("newest", OverflowPolicy.DROP_NEWEST),
+        ]:
+            bus.subscribe(f"t.{name}", recorder(name), overflow=policy)
+            for n in range(5):
+                await bus.publish(f"t.{name}", {"n": n})
+
+        # One event in the handler and one queued: the third publish waits
+        await bus.publish("t.block", {"n": 0})
+        await bus.publish("t.block", {"n": 1})
+        blocked = asyncio.create_task(bus.publish("t.block", {"n": 2}))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        gate.set()
+        await blocked
+        await bus.publish("t.block", {"n": 3})
+
+        stats = {s["event_type"]: s for s in bus.stats()}
+        await bus.close(drain=True)
+        return seen, stats, {s["event_type"]: s for s in bus.stats()}
+
+    seen, before, after = asyncio.run(scenario())
+    assert seen == {"block": [0, 1, 2], "oldest": [3, 4], "newest": [0, 1]}
+    assert before["t.oldest"]["dropped"] == before["t.newest"]["dropped"] == 3
+    assert before["t.block"]["dropped"] == 0
+    assert after["t.block"]["delivered"] == 3 and after["t.block"]["errors"] == 1
+    assert after["t.oldest"]["queued"] == 0
+
+    async def stuck_close():
+        bus = LocalEventBus()
+        bus.subscribe("t", lambda payload, metadata: asyncio.Event().wait())
+        await bus.publish("t", {})
+        await bus.publish("t", {})
+        await bus.close(drain=True, timeout=0.05)
+        with_closed = bus.stats()[0]
+        try:
+            await bus.publish("t", {})
+        except RuntimeError:
+            return with_closed
+        raise AssertionError("publish after close must fail")
+
+    assert asyncio.run(asyncio.wait_for(stuck_close(), 2))["delivered"] == 0
+
+    async def unsubscribe():
+        bus = LocalEventBus(queue_size=1)
+        got = []
+        gate = asyncio.Event()
+
+        async def handler(payload, metadata):
+            await gate.wait()
+            got.append(payload)
+
+        kept = bus.subscribe("run.*", lambda payload, metadata: got.append("kept"))
+        subscription = bus.subscribe("run.#", handler)
+        for n in range(2):
+            await bus.publish("run.x", {"n": n})
+        # Unsubscribing releases a publisher blocked on the full queue
+        blocked = asyncio.create_task(bus.publish("run.x", {"n": 2}))
+        await asyncio.sleep(0.01)
+        subscription.close()
+        subscription.close()
+        await asyncio.wait_for(blocked, 1)
+        gate.set()
+        await bus.publish("run.x", {"n": 3})
+        await bus.close()
+        return got, bus, kept
+
+    got, bus, kept = asyncio.run(unsubscribe())
+    assert got == ["kept"] * 4 and len(bus.stats()) == 1
+    assert "#" not in bus._topics._root.children["run"].children
+    assert kept.stats.delivered == 4
+
+
+def test_topic_trie_wildcards():
+    """Test * matches one segment, # zero or more, and overlaps deliver once"""
+    from event_bus.bus import LocalEventBus, TopicTrie
+
+    trie = TopicTrie()
+    patterns = ["run.*", "run.#", "#", "lease.#.stale", "*.completed", "run.started"]
+    subs = {pattern: object() for pattern in patterns}
+    for pattern, sub in subs.items():
+        trie.add(pattern, sub)
+
+    def matching(topic):
+        found = trie.match(topic)
+        assert len(found) == len(set(map(id, found)))
+        return {pattern for pattern, sub in subs.items() if sub in found}
+
+    assert matching("run") == {"run.#", "#"}
+    assert matching("run.started") == {"run.*", "run.#", "#", "run.started"}
+    assert matching("run.completed") == {"run.*", "run.#", "#", "*.completed"}
+    assert matching("run.step.completed") == {"run.#", "#"}
+    assert matching("lease.stale") == {"#", "lease.#.stale"}
+    assert matching("lease.a.b.stale") == {"#", "lease.#.stale"}
+    assert matching("lease.stale.x") == {"#"}
+    assert matching("") == {"#"}
+
+    # Memoized matches are recomputed after add and remove
+    late = object()
+    trie.add("run.step.*", late)
+    assert late in trie.match("run.step.completed")
+    trie.remove("run.step.*", late)
+    assert late not in trie.match("run.step.completed")
+
+    async def deliver():
+        bus = LocalEventBus()
+        got = []
+        for pattern in ["run.*", "run.#", "#", "run.started"]:
+            bus.subscribe(pattern, lambda payload, metadata, p=pattern: got.append(p))
+        await bus.publish("run.started", {})
+        await bus.publish("other", {})
+        await bus.close()
+        return got
+
+    assert sorted(asyncio.run(deliver())) == ["#", "#", "run.#", "run.*", "run.started"]
+
+
+def test_unix_socket_event_bus_failover(tmp_path):
+    """Test broker election, cross-process fanout and broker failover"""
+    import copy
+
+    from event_bus.uds import UnixSocketEventBus
+
+    async def wait_for(condition):
+        for _ in range(500):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("condition not reached")
+
+    async def scenario():
+        # Each bus takes the lock through its own descriptor, as separate
+        # processes would
+        path = str(tmp_path / "events.sock")
+        buses = [UnixSocketEventBus(path, reconnect_delay=0.01) for _ in range(3)]
+        seen = [[] for _ in buses]
+        for bus, got in zip(buses, seen):
+            bus.subscribe(
+                "run.*", lambda payload, metadata, got=got: got.append(payload)
+            )
+        for bus in buses:
+            await bus.start()
+        assert [bus.is_broker for bus in buses] == [True, False, False]
+
+        await buses[1].publish("run.a", {"n": 1})
+        await buses[2].publish("run.b", {"n": 2})
+        await wait_for(lambda: all(len(got) == 2 for got in seen))
+
+        # The broker's process goes away; a survivor takes over and events
+        # published meanwhile are delivered after reconnecting
+        await buses[0].close()
+        await buses[1].publish("run.c", {"n": 3})
+        await wait_for(lambda: all({"n": 3} in got for got in seen[1:]))
+        assert sum(bus.is_broker for bus in buses[1:]) == 1
+        await buses[2].publish("run.d", {"n": 4})
+        await wait_for(lambda: all({"n": 4} in got for got in seen[1:]))
+
+        # Closing flushes what is still buffered; past the backlog the oldest
+        # frames are dropped and counted
+        sender = UnixSocketEventBus(path, backlog=2, reconnect_delay=0.01)
+        for n in range(5, 8):
+            await sender.publish("run.e", {"n": n})
+        assert sender.stats()["dropped"] == 1
+        await sender.close(timeout=5)
+        assert sender.stats()["pending"] == 0
+        await wait_for(lambda: all({"n": 7} in got for got in seen[1:]))
+        for bus in buses[1:]:
+            await bus.close()
+        return seen
+
+    seen = asyncio.run(asyncio.wait_for(scenario(), 20))
+    assert [p["n"] for p in seen[0]] in ([1, 2], [2, 1])
+    assert all(sorted(p["n"] for p in got)[-4:] == [3, 4, 6, 7] for got in seen[1:])
+
+    # The orchestrator shares run events across processes when configured to
+    from main import AgentOrchestrator, get_app_config
+
+    config = copy.deepcopy(get_app_config())
+    services = config["services"]["orchestrator"]
+    services["event_bus"] = "unix"
+    services["event_socket_path"] = str(tmp_path / "run-events.sock")
+
+    async def shared_run_events():
+        orchestrator = AgentOrchestrator(config)
+        assert isinstance(orchestrator.events, UnixSocketEventBus)
+        got = []
+        orchestrator.events.subscribe(
+            "run.*", lambda payload, metadata: got.append(payload)
+        )
+        await orchestrator.events.publish("run.completed", {"run_id": "r"})
+        await wait_for(lambda: got == [{"run_id": "r"}])
+        await orchestrator.events.close()
+
+    asyncio.run(asyncio.wait_for(shared_run_events(), 20))
+    services["event_bus"] = "kafka"
+    try:
+        AgentOrchestrator(config)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown event bus must be rejected")
+
+
+def test_events_tail_fanout(tmp_path):
+    """Test one tail reader feeds several followers and offsets resume"""
+    from event_bus.tail import LogTail
+
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"event":"seed"}\n')
+
+    async def follow(tail, offset, count):
+        seen = []
+        async with aclosing(tail.follow(offset)) as records:
+            async for batch in records:
+                seen.extend(batch)
+                if len(seen) >= count:
+                    return seen
+
+    async def scenario():
+        tail = LogTail(str(path), capacity=4, poll_interval=0.01)
+        live = [asyncio.create_task(follow(tail, None, 6)) for _ in range(3)]
+        resumed = asyncio.create_task(follow(tail, 0, 7))
+        await asyncio.sleep(0.05)
+        with open(path, "a") as f:
+            for n in range(6):
+                f.write(f'{{"event":"e{n}"}}\n')
+        results = await asyncio.wait_for(asyncio.gather(*live, resumed), 5)
+        assert tail.subscribers == 0
+        return tail, results
+
+    tail, results = asyncio.run(scenario())
+    for seen in results[:3]:
+        assert [r.line for r in seen] == [
+            f'{{"event":"e{n}"}}'.encode() for n in range(6)
+        ]
+    assert results[3][0].line == b'{"event":"seed"}'
+    assert [r.line for r in results[3][1:]] == [r.line for r in results[0]]
+    assert results[0][0].frame.startswith(b"id: %d\n" % results[0][0].end)
+    # Appends were read once by the shared reader, not once per follower
+    assert tail.reads <= 6
+
+
+def test_events_tail_truncation(tmp_path):
+    """Test running followers restart from the top of a truncated log"""
+    from event_bus.tail import LogTail
+
+    path = tmp_path / "events.jsonl"
+    path.write_text("".join(f'{{"event":"old{n}"}}\n' for n in range(20)))
+
+    async def scenario():
+        tail = LogTail(str(path), capacity=4, poll_interval=0.01)
+        seen = []
+
+        async def follow():
+            async with aclosing(tail.follow()) as records:
+                async for batch in records:
+                    seen.extend(batch)
+                    if len(seen) >= 3:
+                        return
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.05)
+        with open(path, "a") as f:
+            f.write('{"event":"old20"}\n')
+        await asyncio.sleep(0.05)
+        # Rotated in place: shorter than where the follower had read up to
+        with open(path, "w") as f:
+            f.write('{"event":"new0"}\n{"event":"new1"}\n')
+        await asyncio.wait_for(follower, 5)
+        return tail, seen
+
+    tail, seen = asyncio.run(scenario())
+    assert [r.line for r in seen] == [
+        b'{"event":"old20"}',
+        b'{"event":"new0"}',
+        b'{"event":"new1"}',
+    ]
+    assert (seen[1].offset, seen[2].offset) == (0, seen[1].end)
+    assert tail.generation == 1
+
+    # Replaced by a longer file: detected by inode rather than size
+    replacement = tmp_path / "events.new"
+    replacement.write_text("".join(f'{{"event":"r{n}"}}\n' for n in range(10)))
+    os.replace(replacement, path)
+    asyncio.run(tail.poll())
+    assert tail.generation == 2 and tail.position == path.stat().st_size
+
+
+def test_jsonl_event_store(tmp_path, monkeypatch):
+    """Test optimistic concurrency, torn-tail recovery and group commit"""
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from event_store import ConcurrencyError
+    from jsonl_event_store import JsonlEventStore
+
+    path = str(tmp_path / "events.jsonl")
+
+    async def first_session():
+        store = JsonlEventStore(path)
+        assert await store.append("s", [{"type": "a"}], expected_version=0) == 1
+        try:
+            await store.append("s", [{"type": "b"}], expected_version=0)
+        except ConcurrencyError as e:
+            assert (e.expected, e.actual) == (0, 1)
+        else:
+            raise AssertionError("stale expected_version must be rejected")
+        racing = await asyncio.gather(
+            *(store.append("s", [{"n": n}], expected_version=1) for n in range(3)),
+            return_exceptions=True,
+        )
+        assert sum(not isinstance(r, Exception) for r in racing) == 1
+
+        # Appends arriving during an fsync share the next one
+        syncs = []
+
+        def slow_sync():
+            syncs.append(1)
+            time.sleep(0.02)
+            store._log.sync()
+
+        store._commit._sync = slow_sync
+        await asyncio.gather(*(store.append(f"g{n}", [{"n": n}]) for n in range(20)))
+        assert len(syncs) <= 2
+
+        # A cancelled appender does not fail the others sharing its fsync,
+        # and later appends still commit
+        appends = [
+            asyncio.create_task(store.append(f"c{n}", [{"n": n}])) for n in range(3)
+        ]
+        await asyncio.sleep(0.005)
+        appends[1].cancel()
+        results = await asyncio.gather(*appends, return_exceptions=True)
+        assert results[0] == results[2] == 1
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert await asyncio.wait_for(store.append("c3", [{"n": 3}]), 1) == 1
+        try:
+            JsonlEventStore(path)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("a second writer must be refused")
+        await store.close()
+
+    asyncio.run(first_session())
+    with open(path, "ab") as f:
+        f.write(b'{"stream_id":"s","version":3,"ty')  # crash mid-append
+    os.remove(path + ".idx")
+
+    async def reopen():
+        store = JsonlEventStore(path)
+        events = await store.read("s")
+        assert [e["version"] for e in events] == [1, 2] and store.version("g7") == 1
+        assert await store.append("s", [{"type": "c"}], expected_version=2) == 3
+        assert [e["type"] for e in await store.read("s", from_version=3)] == ["c"]
+        await store.close()
+
+    asyncio.run(reopen())
+    with open(path, "rb") as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_segmented_event_store(tmp_path, monkeypatch):
+    """Test segment rotation, snapshots and block-compressed compaction"""
+    import gzip
+
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    import segmented_event_store
+    from segmented_event_store import SegmentedEventStore
+
+    monkeypatch.setattr(segmented_event_store, "ARCHIVE_BLOCK_BYTES", 512)
+    directory = str(tmp_path / "events")
+    padding = "x" * 100
+
+    async def write():
+        store = SegmentedEventStore(directory, max_segment_bytes=2048)
+        for n in range(60):
+            await store.append(f"s{n % 3}", [{"n": n, "pad": padding}])
+        await store.save_snapshot("s0", 10, {"count": 10})
+        try:
+            await store.save_snapshot("s0", 99, {})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("snapshot beyond the stream head must fail")
+        await store.close()
+
+    asyncio.run(write())
+
+    async def reopen():
+        store = SegmentedEventStore(directory, max_segment_bytes=2048)
+        assert len(store.segments()) > 3 and store.version("s1") == 20
+        events = await store.read("s1")
+        assert [e["n"] for e in events] == list(range(1, 60, 3))
+        page = await store.read("s1", from_version=3, limit=5)
+        assert [e["version"] for e in page] == [3, 4, 5, 6, 7]
+        state, version, rest = await store.read_from_snapshot("s0")
+        assert (state, version, rest[0]["version"]) == ({"count": 10}, 10, 11)
+
+        closed = len(store.segments()) - 1
+        assert await store.compact(prune_snapshotted=True) == closed
+        assert await store.compact() == 0
+        archives = [meta["name"] for meta in store.segments() if meta["archived"]]
+        assert all(
+            not os.path.exists(os.path.join(directory, name)) for name in archives
+        )
+        # Each archive is one valid gzip file made of several members
+        with gzip.open(os.path.join(directory, archives[0] + ".gz")) as f:
+            assert f.read().count(b"\n") > 0
+
+        reads = []
+        original = segmented_event_store._read_member
+        monkeypatch.setattr(
+            segmented_event_store,
+            "_read_member",
+            lambda f, offset: reads.append(offset) or original(f, offset),
+        )
+        assert [e["n"] for e in await store.read("s1")] == list(range(1, 60, 3))
+        blocks = len(reads)
+        reads.clear()
+        assert [e["n"] for e in await store.read("s1", from_version=19)] == [55, 58]
+        assert len(reads) < blocks
+        # Snapshotted events were pruned from the archives, later ones kept
+        assert (await store.read("s0"))[0]["version"] == 11
+        state, version, rest = await store.read_from_snapshot("s0")
+        assert [e["version"] for e in rest] == list(range(11, 21))
+        assert await store.append("s0", [{"n": 60}], expected_version=20) == 21
+
+        # A cancelled appender does not fail the others sharing its fsync,
+        # and later appends still commit
+        def slow_sync():
+            time.sleep(0.02)
+            store._active.sync()
+
+        store._commit._sync = slow_sync
+        appends = [
+            asyncio.create_task(store.append(f"c{n}", [{"n": n}])) for n in range(3)
+        ]
+        await asyncio.sleep(0.005)
+        appends[1].cancel()
+        results = await asyncio.gather(*appends, return_exceptions=True)
+        assert results[0] == results[2] == 1
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert await asyncio.wait_for(store.append("c3", [{"n": 3}]), 1) == 1
+        await store.close()
+
+    asyncio.run(reopen())
+
+
+def test_projection_checkpoint_and_rebuild(tmp_path, monkeypatch):
+    """Test projections resume from their checkpoint, page reads and rebuild"""
+    import threading
+
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from jsonl_event_store import JsonlEventStore
+    from projections import (
+        Projection,
+        ProjectionEngine,
+        ProjectionState,
+        SQLiteProjectionState,
+    )
+
+    try:
+        ProjectionState()  # type: ignore[abstract]
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("ProjectionState must be abstract")
+
+    db_path = str(tmp_path / "projections.db")
+    loop_threads = []
+
+    def build(store):
+        counts = Projection(
+            "counts", ["work"], SQLiteProjectionState(db_path, "counts")
+        )
+
+        @counts.on("done")
+        def done(state, event):
+            loop_threads.append(threading.get_ident())
+            state.put(event["who"], state.get(event["who"], 0) + 1)
+
+        @counts.on("broken")
+        def broken(state, event):
+            raise RuntimeError("bad event")
+
+        engine = ProjectionEngine(store, batch_size=4)
+        engine.register(counts)
+        limits = []
+        read = store.read
+
+        async def paged_read(stream_id, from_version=0, limit=None):
+            limits.append(limit)
+            return await read(stream_id, from_version, limit)
+
+        store.read = paged_read
+        return engine, counts, limits
+
+    async def scenario():
+        store = JsonlEventStore(str(tmp_path / "events.jsonl"))
+        await store.append("work", [{"event": "done", "who": "a"}] * 6)
+        await store.append("work", [{"event": "broken"}])
+        await store.append("work", [{"event": "done", "who": "b"}] * 3)
+        engine, counts, limits = build(store)
+        assert await engine.catch_up() == 10
+        # Three pages of at most batch_size, never the whole stream at once
+        assert limits == [4, 4, 4]
+        [stats] = engine.stats()
+        assert (stats["batches"], stats["errors"], stats["applied"]) == (3, 1, 9)
+        assert threading.get_ident() not in loop_threads
+        engine.close()
+
+        # A new engine over the same database picks up after the checkpoint
+        await store.append("work", [{"event": "done", "who": "a"}])
+        engine, counts, limits = build(store)
+        assert counts.state.checkpoint() == {"work": 10}
+        assert await engine.catch_up() == 1
+        assert dict(counts.state.items()) == {"a": 7, "b": 3}
+
+        counts.state.put("stale", 1)
+        counts.state.commit({"work": 11})
+        assert await engine.rebuild("counts") == 11
+        assert dict(counts.state.items()) == {"a": 7, "b": 3}
+        assert counts.state.checkpoint() == {"work": 11}
+        engine.close()
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_json_task_repository(tmp_path, monkeypatch):
+    """Test JSON task ETags, preconditions, locked atomic replace and legacy files"""
+    import fcntl
+
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from json_repositories import JsonTaskRepository
+    from repositories import PreconditionFailedError
+
+    path = tmp_path / "state" / "tasks.json"
+    path.parent.mkdir()
+    path.write_text("[]")  # the file as shipped before any task existed
+
+    async def scenario():
+        repo = JsonTaskRepository(str(path))
+        assert await repo.list() == [] and repo.etag("t1") is None
+        empty = repo.etag()
+
+        first = await repo.save({"id": "t1", "status": "queued", "labels": ["x"]})
+        assert first == repo.etag("t1") and repo.etag() != empty
+        assert (await repo.get("t1"))["version"] == 1
+
+        second = await repo.save({"id": "t1", "status": "running"}, if_match=first)
+        assert second != first and (await repo.get("t1"))["version"] == 2
+
+        for stale in (first, "*"):
+            target = "t1" if stale == first else "missing"
+            try:
+                await repo.save({"id": target, "status": "done"}, if_match=stale)
+            except PreconditionFailedError as e:
+                assert e.key == target and e.expected == stale
+            else:
+                raise AssertionError(f"if_match={stale} must fail for {target}")
+        assert (await repo.get("t1"))["status"] == "running"
+        assert await repo.get("missing") is None
+
+        # Another instance sees the write and its stale ETag is rejected too
+        other = JsonTaskRepository(str(path))
+        assert other.etag("t1") == second
+        await other.save({"id": "t1", "status": "done"}, if_match=second)
+        try:
+            await repo.save({"id": "t1", "status": "queued"}, if_match=second)
+        except PreconditionFailedError as e:
+            assert e.actual == other.etag("t1")
+        else:
+            raise AssertionError("stale ETag from before another writer must fail")
+        assert (await repo.get("t1"))["status"] == "done"
+        await repo.save({"id": "t2", "status": "queued", "labels": ["y"]})
+        assert [t["id"] for t in await other.list(label="y")] == ["t2"]
+        assert [t["id"] for t in await other.list(status="done")] == ["t1"]
+
+        # Of two writers holding the same ETag exactly one wins
+        current = repo.etag("t2")
+        results = await asyncio.gather(
+            repo.save({"id": "t2", "status": "a"}, if_match=current),
+            other.save({"id": "t2", "status": "b"}, if_match=current),
+            return_exceptions=True,
+        )
+        assert sorted(type(r).__name__ for r in results) == [
+            "PreconditionFailedError",
+            "str",
+        ]
+
+        # Writers wait for the flock and then swap in a new file whole
+        inode = os.stat(path).st_ino
+        with open(str(path) + ".lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            save = asyncio.create_task(repo.save({"id": "t3", "status": "queued"}))
+            await asyncio.sleep(0.2)
+            assert not save.done()
+            assert "t3" not in path.read_text()
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            await asyncio.wait_for(save, 5)
+        assert os.stat(path).st_ino != inode
+        assert [
+            entry.name for entry in path.parent.iterdir() if "tmp" in entry.name
+        ] == []
+        assert {t["id"] for t in json.loads(path.read_text())} == {"t1", "t2", "t3"}
+
+    asyncio.run(scenario())
+
+
+def test_lease_manager_shared_document(tmp_path, monkeypatch):
+    """Test two lease managers on one locks.json never both lease a path"""
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from leases import LeaseManager
+    from repositories import LeaseConflictError
+
+    path = str(tmp_path / "locks.json")
+
+    async def scenario():
+        first, second = LeaseManager(path), LeaseManager(path)
+        results = await asyncio.gather(
+            first.acquire("src/b.py", "alice", 60),
+            second.acquire("src/b.py", "bob", 60),
+            return_exceptions=True,
+        )
+        winners = [r for r in results if isinstance(r, dict)]
+        assert len(winners) == 1
+        assert sum(isinstance(r, LeaseConflictError) for r in results) == 1
+        stored = json.loads(open(path).read())
+        assert [lease["path"] for lease in stored] == ["src/b.py"]
+        assert stored[0]["lock_id"] == winners[0]["lock_id"]
+        loser = second if winners[0]["owner"] == "alice" else first
+        assert await loser.list() == []
+
+        # The loser can take other paths, and this one once it is released
+        other = await loser.acquire("src/c.py", "carol", 60)
+        winner = first if loser is second else second
+        try:
+            await loser.acquire("src/b.py", "carol", 60)
+        except LeaseConflictError:
+            pass
+        else:
+            raise AssertionError("path leased by the other manager")
+        await winner.release(winners[0]["lock_id"], winners[0]["owner"])
+        again = await loser.acquire("src/b.py", "carol", 60)
+        stored = {lease["lock_id"] for lease in json.loads(open(path).read())}
+        assert stored == {other["lock_id"], again["lock_id"]}
+
+        # An expired lease held elsewhere does not block the path
+        stale = await winner.acquire("src/d.py", "dave", 1)
+        await asyncio.sleep(1.1)
+        taken = await loser.acquire("src/d.py", "erin", 60)
+        assert taken["owner"] == "erin"
+        assert [e["lock_id"] for e in await winner.reclaim_expired()] == [
+            stale["lock_id"]
+        ]
+        await first.flush()
+        await second.flush()
+        paths = sorted(lease["path"] for lease in json.loads(open(path).read()))
+        assert paths == ["src/b.py", "src/c.py", "src/d.py"]
+
+    asyncio.run(scenario())
+
+
+def test_lease_manager_cancelled_acquire(tmp_path, monkeypatch):
+    """Test a cancelled acquire neither fails others sharing its write nor orphans leases"""
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from leases import LeaseManager
+
+    path = str(tmp_path / "locks.json")
+
+    async def scenario():
+        manager = LeaseManager(path)
+        update = manager.document.update
+        failures = []
+
+        async def slow_update(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            if failures:
+                raise failures.pop()
+            await update(*args, **kwargs)
+
+        manager.document.update = slow_update
+        acquires = [
+            asyncio.create_task(manager.acquire(f"src/{name}.py", name, 60))
+            for name in "ab"
+        ]
+        await asyncio.sleep(0.005)
+        acquires[0].cancel()
+        cancelled, taken = await asyncio.gather(*acquires, return_exceptions=True)
+        assert isinstance(cancelled, asyncio.CancelledError)
+        assert taken["owner"] == "b"
+        await asyncio.sleep(0)
+        # The cancelled lease was written, so it stays tracked until it expires
+        stored = sorted(lease["owner"] for lease in json.loads(open(path).read()))
+        assert stored == sorted(lease["owner"] for lease in await manager.list())
+        assert stored == ["a", "b"]
+        assert manager._acquiring == set()
+
+        # Later acquires do not hang; a failed write drops only its own lease
+        failures.append(OSError("disk full"))
+        try:
+            await asyncio.wait_for(manager.acquire("src/c.py", "c", 60), 1)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("the failed write must surface")
+        assert await manager.list(owner="c") == []
+        lease = await asyncio.wait_for(manager.acquire("src/c.py", "c", 60), 1)
+        stored = {lease["lock_id"] for lease in json.loads(open(path).read())}
+        assert lease["lock_id"] in stored and len(stored) == 3
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_repositories(tmp_path, monkeypatch):
+    """Test SQLite task/agent CRUD, version preconditions and list filters"""
+    monkeypatch.syspath_prepend(DATA_ACCESS)
+    from repositories import PreconditionFailedError
+    from sqlite_repositories import SQLiteDatabase
+
+    db_path = str(tmp_path / "kyros.db")
+
+    async def expect_precondition(save):
+        try:
+            await save
+        except PreconditionFailedError:
+            pass
+        else:
+            raise AssertionError("stale expected_version must fail")
+
+    async def scenario(db, other):
+        async with db.unit_of_work() as uow:
+            created = await uow.tasks.save(
+                {"id": "t1", "status": "queued", "labels": ["ui"]},
+                expected_version=0,
+            )
+            assert created["version"] == 1
+            await uow.tasks.save({"id": "t2", "status": "running", "assignee": "a"})
+            await uow.tasks.save({"id": "t3", "status": "done", "labels": ["ui"]})
+        async with db.unit_of_work() as uow:
+            await expect_precondition(uow.tasks.save({"id": "t1"}, expected_version=0))
+        async with db.unit_of_work() as uow:
+            updated = await uow.tasks.save(
+                {**created, "status": "running"}, expected_version=1
+            )
+            assert updated["version"] == 2
+            assert (await uow.tasks.get("t1"))["status"] == "running"
+
+            ids = lambda tasks: sorted(t["id"] for t in tasks)  # noqa: E731
+            assert ids(await uow.tasks.list(status="running")) == ["t1", "t2"]
+            assert ids(await uow.tasks.list(status=["done", "queued"])) == ["t3"]
+            assert ids(await uow.tasks.list(assignee="a")) == ["t2"]
+            assert ids(await uow.tasks.list(label="ui")) == ["t1", "t3"]
+            assert ids(await uow.tasks.list(label="ui", status="done")) == ["t3"]
+            after = updated["updated_at"]
+            assert ids(await uow.tasks.list(updated_before=after)) == ["t2", "t3"]
+            assert await uow.tasks.list(updated_after=after) == []
+            first, cursor = await uow.tasks.page(limit=2)
+            rest, end = await uow.tasks.page(after=cursor, limit=2)
+            assert [t["id"] for t in first + rest] == ["t1", "t3", "t2"]
+            assert end is None
+            try:
+                await uow.tasks.list(owner="a")
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("unknown filters must be rejected")
+
+            await uow.tasks.delete("t3")
+            assert await uow.tasks.get("t3") is None
+            assert ids(await uow.tasks.list(label="ui")) == ["t1"]
+
+            await uow.agents.save({"id": "b", "runner": "adk", "model": "m1"})
+            await uow.agents.save({"id": "a", "runner": "adk", "model": "m2"})
+            agent = await uow.agents.save({"id": "b", "runner": "local", "model": "m1"})
+            assert agent["version"] == 2 and (await uow.agents.get("b")) == agent
+            assert [a["id"] for a in await uow.agents.list(runner="adk")] == ["a"]
+            assert [a["id"] for a in await uow.agents.list(model="m1")] == ["b"]
+
+        # Two connections racing on one version: the second save waits for
+        # the first to commit, then sees the new version and fails
+        async with db.unit_of_work() as uow:
+            await uow.tasks.save({"id": "t1", "status": "a"}, expected_version=2)
+            racer = asyncio.create_task(save_with(other, expected_version=2))
+            await asyncio.sleep(0.2)
+            assert not racer.done()
+        await expect_precondition(racer)
+        async with db.unit_of_work() as uow:
+            stored = await uow.tasks.get("t1")
+            assert (stored["status"], stored["version"]) == ("a", 3)
+
+            await uow.agents.save({"id": "a", "runner": "adk", "model": "m3"})
+            racer = asyncio.create_task(save_agent(other))
+            await asyncio.sleep(0.2)
+            assert not racer.done()
+        assert (await racer)["version"] == 3
+
+    async def save_with(database, expected_version):
+        async with database.unit_of_work() as uow:
+            return await uow.tasks.save(
+                {"id": "t1", "status": "b"}, expected_version=expected_version
+            )
+
+    async def save_agent(database):
+        async with database.unit_of_work() as uow:
+            return await uow.agents.save({"id": "a", "runner": "adk", "model": "m4"})
+
+    async def run():
+        db, other = SQLiteDatabase(db_path), SQLiteDatabase(db_path)
+        try:
+            await scenario(db, other)
+        finally:
+            # Open aiosqlite threads would keep the interpreter alive
+            await db.close()
+            await other.close()
+
+    asyncio.run(run())
+
+
+def test_tool_discovery_index():
+    """Test indexed tool discovery matches a linear scan and tracks re-registration"""
+    import random
+
+    from agent_sdk.tools.protocol import ToolRegistry, ToolSchema
+
+    rng = random.Random(7)
+    caps = [f"cap{n}" for n in range(8)]
+
+    def schema(name, required):
+        return ToolSchema(
+            name=name,
+            description=name,
+            parameters={"type": "object"},
+            returns={"type": "object"},
+            capabilities=required,
+        )
+
+    def linear(tools, offered):
+        return [
+            tool.name
+            for tool in tools.values()
+            if all(cap in offered for cap in tool.capabilities)
+        ]
+
+    registry = ToolRegistry(discover_cache_size=8)
+    tools = {}
+    for n in range(60):
+        # Duplicated capabilities must count once
+        required = rng.sample(caps, rng.randint(0, 3)) * rng.randint(1, 2)
+        tools[f"t{n}"] = schema(f"t{n}", required)
+        registry.register(tools[f"t{n}"])
+
+    queries = [rng.sample(caps, rng.randint(1, 6)) for _ in range(40)]
+    for offered in queries + queries:  # the second pass is served from the cache
+        got = [tool.name for tool in registry.discover(offered)]
+        assert got == linear(tools, offered)
+    assert len(registry._discover_cache) == 8
+    assert [t.name for t in registry.discover([])] == list(tools)
+
+    # Re-registering changes what cached queries return
+    offered = ["cap0", "cap1"]
+    tools["t0"] = schema("t0", ["cap0"])
+    registry.register(tools["t0"])
+    assert "t0" in [tool.name for tool in registry.discover(offered)]
+    tools["t0"] = schema("t0", ["cap7"])
+    registry.register(tools["t0"])
+    assert registry._discover_cache == {}
+    after = [tool.name for tool in registry.discover(offered)]
+    assert "t0" not in after and after == linear(tools, offered)
+    tools["t0"] = schema("t0", [])
+    registry.register(tools["t0"])
+    assert [tool.name for tool in registry.discover(offered)][0] == "t0"
+    registry.register(schema("new", ["cap0"]))
+    assert "new" in [tool.name for tool in registry.discover(offered)]
+
+
+def test_tool_parameter_validation():
+    """Test strict tool validation rejects bad parameters before execution"""
+    from agent_sdk.tools.validation import ToolValidationError
+
+    registry = orchestrator.agents["ExampleAgent"].load().tool_registry
+    result = asyncio.run(registry.execute_tool("add", {"a": 2, "b": 3}))
+    assert result["result"] == 5
+
+    try:
+        asyncio.run(registry.execute_tool("add", {"a": "2"}))
+    except ToolValidationError as e:
+        assert e.errors == ["$.b: required", "$.a: expected number"]
+    else:
+        raise AssertionError("expected ToolValidationError")
+
+    # A schema that fails to compile leaves the registered version in place
+    from agent_sdk.tools.protocol import ToolRegistry, ToolSchema
+
+    def schema(name, properties, capabilities):
+        return ToolSchema(
+            name=name,
+            description=name,
+            parameters={"type": "object", "properties": properties},
+            returns={"type": "object"},
+            capabilities=capabilities,
+        )
+
+    registry = ToolRegistry()
+    good = schema("echo", {"text": {"type": "string"}}, ["fs"])
+    registry.register(good)
+    for name in ("echo", "fresh"):
+        try:
+            registry.register(schema(name, {"text": 5}, ["net"]))
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("expected the schema to be rejected")
+    assert registry.get("echo") is good and registry.get("fresh") is None
+    assert registry.discover(["fs", "net"]) == [good]
+    assert registry.discover(["net"]) == []
+    assert registry._validators["echo"]({"text": 1}) == ["$.text: expected string"]
+
+
+def test_validation_json_semantics():
+    """Test multipleOf, enum, const and uniqueItems follow JSON number rules"""
+    from agent_sdk.tools.validation import compile_schema
+
+    def valid(schema, value):
+        return compile_schema(schema)(value) == []
+
+    tenth = {"multipleOf": 0.1}
+    assert all(valid(tenth, v) for v in (0.3, 0.7, 1.1, 3, -0.2, 12345.6))
+    assert not any(valid(tenth, v) for v in (0.35, 0.01, 1e-9))
+    assert valid({"multipleOf": 3}, 9) and valid({"multipleOf": 3}, 9.0)
+    assert not valid({"multipleOf": 3}, 7.5)
+    assert not valid({"multipleOf": 0.5}, float("inf"))
+
+    assert valid({"enum": [1, "a"]}, 1.0) and not valid({"enum": [1, "a"]}, True)
+    assert valid({"enum": [True]}, True) and not valid({"enum": [True]}, 1)
+    assert not valid({"enum": [0]}, False) and not valid({"enum": [None]}, 0)
+    assert valid({"enum": [[1, {"a": 2}]]}, [1.0, {"a": 2.0}])
+    assert not valid({"enum": [[1]]}, [True])
+    assert valid({"const": 0}, 0.0) and not valid({"const": False}, 0)
+
+    unique = {"uniqueItems": True}
+    assert not valid(unique, [1, 1.0])
+    assert not valid(unique, [{"a": 1, "b": [2]}, {"b": [2.0], "a": 1}])
+    assert valid(unique, [1, True]) and valid(unique, [0, False, None, "0"])
+
+
+def test_agent_tool_settings():
+    """Test agents' own tool registries use the configured validation mode"""
+    import copy
+
+    from agent_sdk.discovery import import_target
+    from main import AgentOrchestrator, get_app_config
+
+    config = copy.deepcopy(get_app_config())
+    config["agents"]["tools"]["validation"] = "off"
+    configured = AgentOrchestrator(config)
+    registry = configured.agents["ExampleAgent"].load().tool_registry
+    assert registry.validation == "off" and configured.tool_registry.validation == "off"
+    # A schema violation reaches the executor instead of being rejected
+    assert asyncio.run(registry.execute_tool("add", {"a": 2}))["result"] == 2
+
+    target, kwargs = configured.worker_pool.providers["tool_settings"]
+    assert import_target(target)(**kwargs)["validation"] == "off"
+
+
+def test_execute_tools_batch():
+    """Test batched tool calls run concurrently within limits, in call order"""
+    from agent_sdk.tools.protocol import ToolExecutor, ToolRegistry, ToolSchema
+
+    class SleepExecutor(ToolExecutor):
+        def __init__(self):
+            self.running = 0
+            self.peak = 0
+
+        async def execute(self, name, parameters):
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(parameters["seconds"])
+            finally:
+                self.running -= 1
+            return {"slept": parameters["seconds"]}
+
+    executor = SleepExecutor()
+    registry = ToolRegistry(executor_concurrency=3)
+    registry.register(
+        ToolSchema(
+            name="sleep",
+            description="Sleep",
+            parameters={"type": "object", "required": ["seconds"]},
+            returns={},
+            timeout_seconds=0.5,
+        ),
+        executor,
+    )
+
+    calls = [{"name": "sleep", "parameters": {"seconds": 0.05}} for _ in range(6)]
+    calls[2] = {"name": "sleep", "parameters": {"seconds": 5}}
+    calls[4] = {"name": "sleep", "parameters": {}}
+    calls.append({"name": "missing", "parameters": {}})
+    results = asyncio.run(registry.execute_tools(calls))
+
+    assert [r.status for r in results] == [
+        "ok", "ok", "timeout", "ok", "error", "ok", "error"
+    ]  # fmt: skip
+    assert results[0].result == {"slept": 0.05}
+    assert results[4].error_type == "ToolValidationError"
+    assert executor.peak == 3
+
+
+def test_pure_tool_memoization():
+    """Test pure tools are memoized on canonical parameters and counted"""
+    from agent_sdk.tools.cache import tool_run
+    from agent_sdk.tools.protocol import ToolExecutor, ToolRegistry, ToolSchema
+
+    class CountingExecutor(ToolExecutor):
+        calls = 0
+
+        async def execute(self, name, parameters):
+            self.calls += 1
+            return {"result": parameters["a"] + parameters["b"]}
+
+    executor = CountingExecutor()
+    registry = ToolRegistry(cache_size=2)
+    for name, options in (
+        ("add", {"pure": True}),
+        ("add_run", {"cache_ttl_seconds": 60, "cache_scope": "run"}),
+        ("add_plain", {}),
+    ):
+        registry.register(
+            ToolSchema(
+                name=name, description=name, parameters={}, returns={}, **options
+            ),
+            executor,
+        )
+
+    async def scenario():
+        await registry.execute_tool("add", {"a": 1, "b": 2})
+        await registry.execute_tool("add", {"b": 2, "a": 1})
+        await registry.execute_tool("add_plain", {"a": 1, "b": 2})
+        await registry.execute_tool("add_plain", {"a": 1, "b": 2})
+        await registry.execute_tool("add_run", {"a": 1, "b": 2})  # no run: uncached
+        with tool_run("run-1"):
+            await registry.execute_tool("add_run", {"a": 1, "b": 2})
+            await registry.execute_tool("add_run", {"a": 1, "b": 2})
+        with tool_run("run-2"):
+            await registry.execute_tool("add_run", {"a": 1, "b": 2})
+
+    asyncio.run(scenario())
+    assert executor.calls == 6
+    stats = registry.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1)
+    assert registry.clear_cache("run-2") == 1
+
+    client = TestClient(app)
+    plan_data = {
+        "pr": {"repo": "test/repo", "pr_number": 1, "branch": "b", "head_sha": "s"},
+        "mode": "plan",
+    }
+    client.post("/v1/runs/plan", json=plan_data)
+    response = client.get("/v1/tools/cache/stats")
+    assert response.status_code == 200
+    assert {"orchestrator", "ExampleAgent"} <= set(response.json())
+
+
+def test_lazy_plugin_discovery(tmp_path, monkeypatch):
+    """Test manifests register tools and agents without importing their code"""
+    from agent_sdk.discovery import discover, lazy_agents, lazy_tools
+    from agent_sdk.tools.protocol import ToolRegistry
+
+    (tmp_path / "kyros_test_pack.py").write_text(
+        "from agent_sdk.tools.protocol import ToolExecutor\n"
+        "class Executor(ToolExecutor):\n"
+        "    async def execute(self, name, parameters):\n"
+        "        return {'tool': name}\n"
+    )
+    manifests = tmp_path / "manifests"
+    manifests.mkdir()
+    tool = {"description": "", "parameters": {}, "returns": {}}
+    (manifests / "pack.json").write_text(
+        json.dumps(
+            {
+                "tools": [
+                    {**tool, "name": "one", "executor": "kyros_test_pack:Executor"},
+                    {**tool, "name": "two", "executor": "kyros_test_pack:Executor"},
+                ],
+                "agents": [
+                    {
+                        "name": "ExampleAgent",
+                        "capabilities": ["math"],
+                        "factory": "agent_sdk.runners.example_agent:ExampleAgent",
+                    }
+                ],
+            }
+        )
+    )
+    (manifests / "broken.json").write_text("{")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    found = discover([str(manifests)], entry_point_group=None)
+    assert [source for source, _ in found.errors] == [str(manifests / "broken.json")]
+
+    registry = ToolRegistry()
+    tools = lazy_tools(found.manifests)
+    assert tools[0][1] is tools[1][1]  # one executor per target
+    for schema, executor in tools:
+        registry.register(schema, executor)
+    assert "kyros_test_pack" not in sys.modules
+
+    assert asyncio.run(registry.execute_tool("two", {})) == {"tool": "two"}
+    assert "kyros_test_pack" in sys.modules
+
+    (agent,) = lazy_agents(
+        found.manifests,
+        {
+            "memory_store": lambda: orchestrator.memory_store,
+            "sandbox": lambda: orchestrator.sandbox,
+        },
+    )
+    assert agent.get_name() == "ExampleAgent" and not agent.loaded
+    assert agent.tool_registry is None
+    assert agent.load().tool_registry is agent.tool_registry is not None
+
+
+def test_wire_format_roundtrip():
+    """Test binary encoding of SDK models, with large payloads left uncopied"""
+    from agent_sdk.protocol.messages import AgentMessage, Artifact
+    from agent_sdk.protocol.wire import decode, decode_model, encode_model, encode_parts
+    from agent_sdk.sandbox.executor import ExecutionResult
+
+    message = AgentMessage(
+        intent="Process task",
+        confidence=0.5,
+        rationale_summary="Ran tools",
+        artifacts=[Artifact(kind="output", ref="r", summary="s", metadata={"n": -7})],
+        agent_id="ExampleAgent",
+    )
+    for validate in (True, False):
+        decoded = decode_model(AgentMessage, encode_model(message), validate=validate)
+        assert decoded == message
+        assert isinstance(decoded.artifacts[0], Artifact)
+
+    result = ExecutionResult(
+        exit_code=0, stdout="x" * 100_000, stderr="", execution_time=0.1
+    )
+    blob = b"\x00" * 100_000
+    parts = encode_parts({"result": result, "blob": blob})
+    assert any(part is blob for part in parts)  # large bytes are not copied
+    frame = b"".join(parts)
+    decoded_frame = decode(frame)
+    assert isinstance(decoded_frame["blob"], memoryview)
+    assert decoded_frame["blob"].obj is frame
+    assert ExecutionResult(**decoded_frame["result"]) == result
+
+
+def test_artifact_store_ranges_and_gc(tmp_path, monkeypatch):
+    """Test large outputs are stored by content hash, served by range and GC'd"""
+    from agent_sdk.artifacts.blob_store import BlobStore
+    from agent_sdk.contracts import AgentContext
+    from agent_sdk.runners.example_agent import ExampleAgent
+
+    store = BlobStore(str(tmp_path / "artifacts"), inline_limit=1024)
+    monkeypatch.setattr(orchestrator, "artifact_store", store)
+    agent = ExampleAgent(orchestrator.memory_store, orchestrator.sandbox, store)
+    task = {
+        "id": "artifact-task",
+        "type": "code",
+        "code": "print('0123456789' * 500, end='')",
+    }
+    ctx = AgentContext(task=task, tools=[], memory={}, telemetry={})
+    result = asyncio.run(agent.execute(ctx))["result"]
+    ref = result["output_ref"]
+    assert len(result["output"]) == 1024 and result["artifacts"][0]["ref"] == ref
+    assert store.put("0123456789" * 500) == ref and store.dedupes == 1
+    assert store.put([b"0123456789"] * 500) == ref and store.writes == 1
+    assert os.path.relpath(store.path(ref), store.root).count(os.sep) == 2
+
+    client = TestClient(app)
+    response = client.get(f"/v1/artifacts/{ref}")
+    assert response.status_code == 200 and len(response.content) == 5000
+    response = client.get(f"/v1/artifacts/{ref}", headers={"Range": "bytes=12-15"})
+    assert response.status_code == 206 and response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 12-15/5000"
+    response = client.get(f"/v1/artifacts/{ref}", headers={"Range": "bytes=-3"})
+    assert response.content == b"789"
+    response = client.get(f"/v1/artifacts/{ref}", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert client.get("/v1/artifacts/sha256:" + "0" * 64).status_code == 404
+    assert client.get("/v1/artifacts/not-a-ref").status_code == 400
+
+    orphan = store.put(b"unreferenced" * 2000)
+    memory = orchestrator.config["agents"]["memory"]
+    monkeypatch.setitem(memory, "artifact_gc_grace_seconds", 0)
+    gc = client.post("/v1/artifacts/gc").json()
+    assert gc["removed"] == 1 and not store.exists(orphan) and store.exists(ref)
+
+    # A put deduping onto a stale blob after gc scanned it keeps the blob
+    stale = store.put(b"stale" * 1000)
+    os.utime(store.path(stale), (time.time() - 600, time.time() - 600))
+    scan = store._blob_paths
+
+    def scan_then_put():
+        yield from scan()
+        assert store.put(b"stale" * 1000) == stale
+
+    monkeypatch.setattr(store, "_blob_paths", scan_then_put)
+    result = store.gc({ref}, grace_seconds=60)
+    assert (result.removed, result.kept_recent) == (0, 1) and store.exists(stale)
+    monkeypatch.undo()
+    assert store.gc({ref}, grace_seconds=0).removed == 1 and not store.exists(stale)
+
+
+def test_streaming_execution():
+    """Test streamed increments reach subscribers and storage before the run ends"""
+    from agent_sdk.contracts import AgentBase
+    from agent_sdk.protocol.messages import AgentMessage, Artifact
+    from main import AgentOrchestrator, get_app_config
+
+    class StreamingAgent(AgentBase):
+        def capabilities(self):
+            return ["streaming"]
+
+        async def execute(self, ctx):
+            raise AssertionError("execute_stream should be used")
+
+        async def execute_stream(self, ctx):
+            yield AgentMessage(intent="start", rationale_summary="streaming")
+            # Only continues once a subscriber has seen the first increment
+            await asyncio.wait_for(first_seen.wait(), 5)
+            yield Artifact(kind="output", ref="sha256:" + "a" * 64, summary="part")
+            yield {"status": "success", "streamed": True}
+
+    class BatchAgent(AgentBase):
+        def capabilities(self):
+            return ["batch"]
+
+        async def execute(self, ctx):
+            return {"status": "success", "streamed": False}
+
+    async def scenario():
+        orchestrator = AgentOrchestrator(get_app_config())
+        orchestrator.register_agent(StreamingAgent())
+        orchestrator.register_agent(BatchAgent())
+        seen = []
+
+        def on_event(payload, metadata):
+            seen.append(payload)
+            first_seen.set()
+
+        orchestrator.events.subscribe("run.#", on_event)
+        streamed = await orchestrator.execute_task(
+            {"id": "stream-task", "capabilities": ["streaming"]}, "plan"
+        )
+        batch = await orchestrator.execute_task(
+            {"id": "batch-task", "capabilities": ["batch"]}, "plan"
+        )
+        await orchestrator.events.close()
+        progress = await orchestrator.memory_store.progress("stream-task")
+        refs = await orchestrator.memory_store.artifact_refs()
+        return streamed, batch, seen, progress, refs
+
+    first_seen = asyncio.Event()
+    streamed, batch, seen, progress, refs = asyncio.run(scenario())
+    assert streamed == {"status": "success", "streamed": True}
+    assert batch == {"status": "success", "streamed": False}
+    assert seen[0]["message"]["intent"] == "start" and "artifact" in seen[1]
+    assert [e["run_id"] for e in seen if "status" in e] == ["stream-task", "batch-task"]
+    assert [item["kind"] for item in progress][-2:] == ["message", "artifact"]
+    assert progress[-1]["payload"]["ref"] in refs
+
+    client = TestClient(app)
+    response = client.get("/v1/runs/stream-task/progress", params={"limit": 1})
+    assert response.status_code == 200 and response.json()["next_after_id"]
+
+
+def test_run_event_stream(monkeypatch):
+    """Test run events are served as SSE and the stream unsubscribes when done"""
+    import main
+    from agent_sdk.contracts import AgentBase
+    from agent_sdk.protocol.messages import AgentMessage
+
+    class StepAgent(AgentBase):
+        def capabilities(self):
+            return ["steps"]
+
+        async def execute(self, ctx):
+            raise AssertionError("execute_stream should be used")
+
+        async def execute_stream(self, ctx):
+            yield AgentMessage(intent="step", rationale_summary="one")
+            yield {"status": "success"}
+
+    async def read_frames(response, stop_after):
+        frames = []
+        async for chunk in response.body_iterator:
+            frames.append(chunk)
+            if len(frames) == stop_after:
+                break
+        return frames
+
+    async def scenario():
+        orchestrator = main.AgentOrchestrator(main.get_app_config())
+        orchestrator.register_agent(StepAgent())
+        monkeypatch.setattr(main, "_orchestrator", orchestrator)
+        subscribers = lambda: len(orchestrator.events.stats())  # noqa: E731
+        baseline = subscribers()
+
+        own = await main.stream_run_events(run_id="sse-task")
+        every = await main.stream_run_events()
+        assert subscribers() == baseline + 2 * len(main.RUN_EVENTS)
+        own_frames = asyncio.create_task(read_frames(own, 10))
+        every_frames = asyncio.create_task(read_frames(every, 4))
+        for task_id in ("other-task", "sse-task"):
+            await orchestrator.execute_task(
+                {"id": task_id, "capabilities": ["steps"]}, "plan"
+            )
+        own_frames, every_frames = await asyncio.wait_for(
+            asyncio.gather(own_frames, every_frames), 5
+        )
+        # The unfiltered stream stays open until the client goes away
+        await every.body_iterator.aclose()
+        assert subscribers() == baseline
+        await orchestrator.events.close()
+        return own_frames, every_frames
+
+    own, every = asyncio.run(scenario())
+    events = [frame.split(b"\n")[0] for frame in own]
+    assert events == [b"event: run.message", b"event: run.completed"]
+    data = [json.loads(frame.split(b"\n")[1][len(b"data: ") :]) for frame in own]
+    assert {payload["run_id"] for payload in data} == {"sse-task"}
+    assert data[0]["message"]["intent"] == "step"
+    assert data[1]["status"] == "success"
+    assert [json.loads(f.split(b"\n")[1][6:])["run_id"] for f in every] == [
+        "other-task",
+        "other-task",
+        "sse-task",
+        "sse-task",
+    ]
+
+
+def test_progress_batching_and_retention(tmp_path):
+    """Test streamed increments are written in batches and pruned when expired"""
+    import sqlite3
+
+    from agent_sdk.memory.sqlite_store import SQLiteMemoryStore
+
+    db_path = str(tmp_path / "progress.db")
+    store = SQLiteMemoryStore(
+        db_path,
+        progress_batch_size=3,
+        progress_flush_seconds=60,
+        progress_retention_seconds=3600,
+    )
+
+    def stored():
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT count(*) FROM agent_progress").fetchone()[0]
+
+    async def scenario():
+        assert await store.flush_progress() == 0  # creates the schema
+        await store.store_progress("a", "t", "message", {"n": 0})
+        await store.store_progress("a", "t", "message", {"n": 1})
+        assert stored() == 0
+        await store.store_progress("a", "t", "message", {"n": 2})
+        assert stored() == 3
+        await store.store_progress("a", "t", "message", {"n": 3})
+        assert stored() == 3
+        # Reads see queued increments
+        assert [i["payload"]["n"] for i in await store.progress("t")] == [0, 1, 2, 3]
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "UPDATE agent_progress SET ts = datetime('now', '-2 hours') "
+                "WHERE json_extract(payload, '$.n') < 2"
+            )
+        assert await store.prune_progress() == 2
+        assert [i["payload"]["n"] for i in await store.progress("t")] == [2, 3]
+
+    asyncio.run(scenario())
+
+
+def test_process_pool_agents(tmp_path):
+    """Test agents hosted in worker processes stream results and survive crashes"""
+    import copy
+    import signal
+
+    from agent_sdk.contracts import AgentContext
+    from agent_sdk.runners.example_agent import ExampleAgent
+    from agent_sdk.runners.worker_pool import PooledAgent, WorkerCrashedError
+    from main import AgentOrchestrator, get_app_config
+
+    config = copy.deepcopy(get_app_config())
+    config["services"]["orchestrator"]["workers"] = 2
+    memory = config["agents"]["memory"]
+    memory["db_path"] = str(tmp_path / "workers.db")
+    memory["vector_store"] = True
+    memory["vector_path"] = str(tmp_path / "vectors")
+
+    async def scenario():
+        orchestrator = AgentOrchestrator(config)
+        local = ExampleAgent(orchestrator.memory_store, orchestrator.sandbox)
+        orchestrator.register_agent(local, hosting="process")
+        agent = orchestrator.agents["ExampleAgent"]
+        assert isinstance(agent, PooledAgent) and agent.capabilities()
+        pool = orchestrator.worker_pool
+        # Workers get the same memory settings, vector index included
+        _, settings = pool.providers["memory_store"]
+        assert settings == orchestrator._memory_settings() and settings["vector_store"]
+        try:
+            task = {"id": "pooled", "type": "math", "a": 2, "b": 3}
+            store = orchestrator.memory_store
+            assert await store.history("pooled") == []  # now cached in this process
+            result = await orchestrator.execute_task(
+                {**task, "capabilities": ["math"]}, "plan"
+            )
+            assert result["result"]["output"] == 5
+            assert await store.progress("pooled")
+            # The worker's write is seen here, in history and in recall
+            assert len(await store.history("pooled")) == 1
+            assert [hit["task_id"] for hit in await store.recall("math")] == ["pooled"]
+
+            # A worker killed mid-task fails that task and is replaced
+            code = {"id": "crash", "type": "code", "code": "import time; time.sleep(5)"}
+            ctx = AgentContext(task=code, tools=[], memory={}, telemetry={})
+            stream = agent.execute_stream(ctx)
+            await stream.__anext__()
+            busy = next(w for w in pool.stats() if w["in_flight"])
+            os.kill(busy["pid"], signal.SIGKILL)
+            try:
+                async for _ in stream:
+                    pass
+                raise AssertionError("expected WorkerCrashedError")
+            except WorkerCrashedError:
+                pass
+            for _ in range(100):
+                slot = pool.stats()[busy["slot"]]
+                if slot["restarts"] and slot["alive"]:
+                    break
+                await asyncio.sleep(0.05)
+            assert slot["pid"] != busy["pid"] and slot["failed"] == 1
+            ctx = AgentContext(task=task, tools=[], memory={}, telemetry={})
+            results = await asyncio.gather(*(agent.execute(ctx) for _ in range(4)))
+            assert all(r["result"]["output"] == 5 for r in results)
+        finally:
+            await orchestrator.cleanup()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert len(stats) == 2 and not any(w["alive"] for w in stats)
+
+
+def test_llm_router_client(tmp_path):
+    """Test the router client pools, bounds, retries, coalesces and caches"""
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from agent_sdk.llm.router_client import LLMRouterClient, LLMRouterError
+
+    state = {"requests": 0, "active": 0, "peak": 0, "ports": set(), "flaky": 0}
+    lock = threading.Lock()
+
+    class StubRouter(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            with lock:
+                state["requests"] += 1
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                state["ports"].add(self.client_address[1])
+                flaky = prompt == "flaky" and state["flaky"] == 0
+                state["flaky"] += prompt == "flaky"
+            time.sleep(0.1 if prompt.startswith("slow") else 0)
+            status = 400 if prompt == "bad" else 503 if flaky else 200
+            reply = {
+                "model": body["model"],
+                "choices": [{"message": {"content": prompt.upper()}}],
+            }
+            data = json.dumps(reply).encode()
+            with lock:
+                state["active"] -= 1
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if flaky:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRouter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def scenario():
+        client = LLMRouterClient(
+            base_url,
+            max_concurrency=2,
+            model_concurrency={"solo": 1},
+            backoff_base=0.01,
+            cache_dir=str(tmp_path / "llm"),
+        )
+        async with client:
+            # Identical prompts in flight (modulo trailing whitespace) share one request
+            replies = await asyncio.gather(
+                *(client.complete("m", "slow same" + " " * i) for i in range(5))
+            )
+            assert replies == ["SLOW SAME"] * 5 and state["requests"] == 1
+            # Distinct prompts are bounded per model and reuse pooled connections
+            await asyncio.gather(*(client.complete("m", f"slow {i}") for i in range(6)))
+            assert state["peak"] == 2 and len(state["ports"]) <= 2
+            state["peak"] = 0
+            await asyncio.gather(
+                *(client.complete("solo", f"slow {i}") for i in range(3))
+            )
+            assert state["peak"] == 1
+            # 503 with Retry-After is retried; 400 is not
+            assert await client.complete("m", "flaky") == "FLAKY"
+            try:
+                await client.complete("m", "bad")
+                raise AssertionError("expected LLMRouterError")
+            except LLMRouterError as e:
+                assert e.status == 400
+            sent = state["requests"]
+            assert await client.complete("m", "flaky\r\n") == "FLAKY"
+            assert state["requests"] == sent
+            stats = client.stats()
+        # A new client (or process) reads the same on-disk cache
+        async with LLMRouterClient(base_url, cache_dir=str(tmp_path / "llm")) as fresh:
+            assert await fresh.complete("m", "slow same") == "SLOW SAME"
+            assert fresh.stats()["cache_hits"] == 1 and state["requests"] == sent
+            # An uncached call does not join a cached lookup already in flight
+            cached, uncached = await asyncio.gather(
+                fresh.complete("m", "slow same"),
+                fresh.complete("m", "slow same", cache=False),
+            )
+            assert cached == uncached == "SLOW SAME"
+            assert state["requests"] == sent + 1 and fresh.stats()["coalesced"] == 0
+        return stats
+
+    try:
+        stats = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    assert stats["coalesced"] == 4 and stats["retries"] == 1 and stats["errors"] == 1
+    assert stats["cache_hits"] == 1 and stats["in_flight"] == 0
+
+
+def test_config_hides_secrets(monkeypatch):
+    """Test the router key reaches the client but not GET /v1/config"""
+    import main
+
+    monkeypatch.setenv("LLM_ROUTER_KEY", "sk-secret-123")
+    config = main.load_config()
+    monkeypatch.setattr(main, "_config", config)
+    assert "sk-secret-123" not in repr(config)
+
+    response = TestClient(app).get("/v1/config")
+    assert response.status_code == 200
+    assert "sk-secret-123" not in response.text
+    assert "llm_router_key" not in response.json()
+    assert "services" in response.json()
+    settings = main.AgentOrchestrator(config)._llm_router_settings()
+    assert settings["api_key"] == "sk-secret-123"
+
+
+def test_import_time_budget():
+    """Test importing main builds nothing and stays within the import budget"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            cumulative_us[name.strip()] = int(cumulative)
+
+    assert [name for name in LAZY_MODULES if name in cumulative_us] == []
+    assert cumulative_us["main"] / 1000 < IMPORT_BUDGET_MS
+
+
 def main():
     """Main test function - now hermetic with TestClient"""
     try:
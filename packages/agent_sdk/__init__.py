@@ -4,23 +4,60 @@ Kyros Agent SDK
 A comprehensive SDK for building and managing AI agents in the Kyros system.
 """
 
-from .capabilities.negotiator import (
-    AgentCapability,
-    CapabilityNegotiator,
-    TaskRequirements,
-)
-from .contracts import AgentBase, AgentContext
-from .memory.sqlite_store import SQLiteMemoryStore
-from .memory.store import AgentMemoryStore, InteractionRecord
-from .protocol.messages import AgentMessage, Artifact
-from .sandbox.executor import ExecutionResult, SandboxExecutor
-from .sandbox.subprocess_executor import SubprocessSandbox
-from .tools.protocol import ToolExecutor, ToolRegistry, ToolSchema
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .capabilities.negotiator import (
+        AgentCapability,
+        CapabilityNegotiator,
+        TaskRequirements,
+    )
+    from .contracts import AgentBase, AgentContext, AgentUpdate
+    from .memory.sqlite_store import SQLiteMemoryStore
+    from .memory.store import AgentMemoryStore, InteractionRecord
+    from .protocol.messages import AgentMessage, Artifact
+    from .sandbox.executor import ExecutionResult, SandboxExecutor
+    from .sandbox.subprocess_executor import SubprocessSandbox
+    from .tools.protocol import ToolExecutor, ToolRegistry, ToolSchema
+
+# Public names are imported on first access, so importing one submodule (say
+# agent_sdk.tools.protocol) does not pull in SQLite, numpy or the sandbox
+_EXPORTS = {
+    "AgentCapability": ".capabilities.negotiator",
+    "CapabilityNegotiator": ".capabilities.negotiator",
+    "TaskRequirements": ".capabilities.negotiator",
+    "AgentBase": ".contracts",
+    "AgentContext": ".contracts",
+    "AgentUpdate": ".contracts",
+    "SQLiteMemoryStore": ".memory.sqlite_store",
+    "AgentMemoryStore": ".memory.store",
+    "InteractionRecord": ".memory.store",
+    "AgentMessage": ".protocol.messages",
+    "Artifact": ".protocol.messages",
+    "ExecutionResult": ".sandbox.executor",
+    "SandboxExecutor": ".sandbox.executor",
+    "SubprocessSandbox": ".sandbox.subprocess_executor",
+    "ToolExecutor": ".tools.protocol",
+    "ToolRegistry": ".tools.protocol",
+    "ToolSchema": ".tools.protocol",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __version__ = "0.1.0"
 __all__ = [
     "AgentBase",
     "AgentContext",
+    "AgentUpdate",
     "AgentMessage",
     "Artifact",
     "ToolRegistry",
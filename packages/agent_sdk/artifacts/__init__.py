@@ -0,0 +1,5 @@
+"""Content-addressed storage for agent artifacts."""
+
+from .blob_store import REF_PATTERN, Blob, BlobStore, GCResult, digest_of, parse_range
+
+__all__ = ["BlobStore", "Blob", "GCResult", "REF_PATTERN", "digest_of", "parse_range"]
@@ -0,0 +1,288 @@
+"""
+Local content-addressed blob store for artifact bodies.
+
+A blob is stored once under the SHA-256 of its bytes, in two levels of
+shard directories (``ab/cd/abcd...``) so no directory grows past a few
+hundred entries. Its ref is ``sha256:<hex>``; storing identical output again
+returns the same ref without writing. Writes go to ``tmp/`` and are fsync'd
+and renamed into place, so a blob path either holds the full content or does
+not exist. Reads map the file with ``mmap`` and copy only the byte range
+asked for.
+
+Blobs are not refcounted: ``gc`` deletes every blob whose ref is not in the
+set the caller says is still referenced (e.g. the refs in stored
+interactions), sparing blobs written within ``grace_seconds`` that may
+belong to interactions not stored yet. A ``put`` that dedupes refreshes the
+blob's mtime under a shared flock on ``<root>/gc.lock``, and ``gc`` re-stats
+and unlinks under the exclusive lock, so a blob is never deleted after a put
+(in any process) has returned its ref.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+REF_PREFIX = "sha256:"
+REF_PATTERN = re.compile(r"sha256:[0-9a-f]{64}")
+_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+@dataclass
+class GCResult:
+    """Outcome of one garbage collection pass."""
+
+    scanned: int = 0
+    removed: int = 0
+    bytes_freed: int = 0
+    kept_recent: int = 0
+    tmp_removed: int = 0
+
+
+def digest_of(ref: str) -> str:
+    """Hex digest from a ``sha256:<hex>`` ref (or a bare hex digest)."""
+    digest = ref[len(REF_PREFIX) :] if ref.startswith(REF_PREFIX) else ref
+    if not _HEX.fullmatch(digest):
+        raise ValueError(f"Invalid artifact ref: {ref!r}")
+    return digest
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range: bytes=...`` header into ``(start, end)``.
+
+    ``end`` is exclusive. Returns None when the header is absent, malformed
+    or asks for several ranges (serve the whole blob), and raises
+    ``ValueError`` when the range cannot be satisfied (respond 416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[len("bytes=") :].strip().partition("-")
+    if not sep or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size
+    start = int(first)
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if not last:
+        return start, size
+    if not last.isdigit() or int(last) < start:
+        return None
+    return start, min(int(last) + 1, size)
+
+
+class Blob:
+    """
+    A stored blob mapped into memory; use as a context manager.
+
+    ``chunks`` copies out one chunk at a time, so serving a range of a large
+    blob never holds more than ``chunk_size`` extra bytes.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Empty files cannot be mapped
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size
+            else None
+        )
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        end = self.size if end is None else min(end, self.size)
+        if self._map is None or start >= end:
+            return b""
+        return self._map[start:end]
+
+    def chunks(
+        self, start: int = 0, end: Optional[int] = None, chunk_size: int = 1 << 20
+    ) -> Iterator[bytes]:
+        end = self.size if end is None else min(end, self.size)
+        for offset in range(start, end, chunk_size):
+            yield self.read(offset, min(offset + chunk_size, end))
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "Blob":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BlobStore:
+    """
+    Content-addressed store rooted at ``root``.
+
+    Outputs larger than ``inline_limit`` bytes are meant to be stored here
+    and referenced from results instead of embedded in them.
+    """
+
+    def __init__(self, root: str = "data/artifacts", inline_limit: int = 16 * 1024):
+        self.root = root
+        self.inline_limit = inline_limit
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.writes = 0
+        self.dedupes = 0
+
+    def path(self, ref: str) -> str:
+        digest = digest_of(ref)
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self.path(ref))
+
+    def size(self, ref: str) -> int:
+        return os.stat(self.path(ref)).st_size
+
+    def open(self, ref: str) -> Blob:
+        """Map a blob for reading; raises ``FileNotFoundError`` if absent."""
+        return Blob(self.path(ref))
+
+    def put(self, data: Union[Buffer, str, Iterable[Buffer]]) -> str:
+        """
+        Store ``data`` (bytes-like, str as UTF-8, or an iterable of chunks such
+        as ``encode_parts`` output) and return its ref.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            ref = REF_PREFIX + hashlib.sha256(data).hexdigest()
+            if self._touch(ref):
+                return ref
+            return self._write([data], ref)
+        return self._write(data, None)
+
+    @contextmanager
+    def _gc_lock(self, exclusive: bool) -> Iterator[None]:
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "gc.lock"), "ab") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _touch(self, ref: str) -> bool:
+        """Refresh an existing blob's mtime (for the GC grace period)."""
+        path = self.path(ref)
+        if not os.path.exists(path):
+            return False
+        with self._gc_lock(exclusive=False):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return False
+        self.dedupes += 1
+        return True
+
+    def _write(self, chunks: Iterable[Buffer], ref: Optional[str]) -> str:
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        tmp = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        hasher = hashlib.sha256() if ref is None else None
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if hasher is not None:
+                ref = REF_PREFIX + hasher.hexdigest()
+                if self._touch(ref):
+                    os.unlink(tmp)
+                    return ref
+            assert ref is not None
+            final = self.path(ref)
+            shard = os.path.dirname(final)
+            os.makedirs(shard, exist_ok=True)
+            os.replace(tmp, final)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        dir_fd = os.open(shard, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self.writes += 1
+        return ref
+
+    def delete(self, ref: str) -> bool:
+        try:
+            os.unlink(self.path(ref))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def refs(self) -> Iterator[str]:
+        """Every stored ref, in shard order."""
+        for path, _ in self._blob_paths():
+            yield REF_PREFIX + os.path.basename(path)
+
+    def _blob_paths(self) -> Iterator[Tuple[str, os.stat_result]]:
+        if not os.path.isdir(self.root):
+            return
+        for first in sorted(os.listdir(self.root)):
+            level1 = os.path.join(self.root, first)
+            if len(first) != 2 or not os.path.isdir(level1):
+                continue
+            for second in sorted(os.listdir(level1)):
+                level2 = os.path.join(level1, second)
+                for entry in os.scandir(level2):
+                    if entry.is_file() and _HEX.fullmatch(entry.name):
+                        yield entry.path, entry.stat()
+
+    def gc(self, referenced: Set[str], grace_seconds: float = 3600.0) -> GCResult:
+        """Delete blobs whose ref is not in ``referenced``, outside the grace period."""
+        keep = {digest_of(ref) for ref in referenced}
+        cutoff = time.time() - grace_seconds
+        result = GCResult()
+        candidates: List[str] = []
+        for path, st in self._blob_paths():
+            result.scanned += 1
+            if os.path.basename(path) in keep:
+                continue
+            if st.st_mtime > cutoff:
+                result.kept_recent += 1
+                continue
+            candidates.append(path)
+        if candidates:
+            # A put may have deduped onto a candidate since the scan: decide
+            # on a fresh stat, with puts held off until the unlink is done
+            with self._gc_lock(exclusive=True):
+                for path in candidates:
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if st.st_mtime > cutoff:
+                        result.kept_recent += 1
+                        continue
+                    os.unlink(path)
+                    result.removed += 1
+                    result.bytes_freed += st.st_size
+        if os.path.isdir(self.tmp_dir):
+            # Leftovers from writers that died mid-write
+            for entry in os.scandir(self.tmp_dir):
+                if entry.stat().st_mtime <= cutoff:
+                    os.unlink(entry.path)
+                    result.tmp_removed += 1
+        return result
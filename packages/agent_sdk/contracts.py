@@ -1,8 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
+from .protocol.messages import AgentMessage, Artifact
+
+# What ``execute_stream`` yields: partial messages and artifacts as they are
+# produced, then the final result dict (what ``execute`` would return)
+AgentUpdate = Union[AgentMessage, Artifact, Dict[str, Any]]
+
 
 class AgentContext(BaseModel):
     task: Dict[str, Any]
@@ -25,6 +32,30 @@ class AgentBase(ABC):
         """Execute the agent with the given context."""
         pass
 
+    async def execute_stream(
+        self, ctx: AgentContext
+    ) -> AsyncGenerator[AgentUpdate, None]:
+        """
+        Execute the agent, yielding progress as it is made.
+
+        Yields any number of ``AgentMessage``/``Artifact`` increments and ends
+        with the result dict. Agents that don't override this yield only the
+        result of ``execute``.
+        """
+        yield await self.execute(ctx)
+
     def get_name(self) -> str:
         """Get the agent's name. Defaults to class name."""
         return self.__class__.__name__
+
+
+async def final_result(updates: AsyncGenerator[AgentUpdate, None]) -> Dict[str, Any]:
+    """Drain an ``execute_stream`` and return its result dict."""
+    result: Optional[Dict[str, Any]] = None
+    async with aclosing(updates) as stream:
+        async for update in stream:
+            if isinstance(update, dict):
+                result = update
+    if result is None:
+        raise RuntimeError("Agent stream ended without a result")
+    return result
@@ -0,0 +1,219 @@
+"""
+Lazy discovery of tool packs and agents.
+
+A plugin describes itself with a manifest: tool schemas plus the
+``module:attr`` of their executor, and agents with their capabilities plus
+the ``module:attr`` of their factory. Manifests come from JSON/YAML files in
+manifest directories and from the ``kyros.manifests`` entry point group,
+whose entry points must resolve to a manifest dict (or a callable returning
+one) in a module that imports nothing heavy.
+
+Only manifests are read at startup. Executor and agent modules are imported
+the first time one of their tools or agents is called, so startup cost grows
+with manifest size rather than with the code behind each plugin.
+"""
+
+import importlib
+import inspect
+import json
+import os
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .contracts import AgentBase, AgentContext, AgentUpdate
+from .tools.protocol import ToolExecutor, ToolSchema
+
+ENTRY_POINT_GROUP = "kyros.manifests"
+MANIFEST_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+class ToolManifest(ToolSchema):
+    """A tool schema plus where to find its executor."""
+
+    executor: str = Field(..., description="module:attr of the ToolExecutor class")
+
+
+class AgentManifest(BaseModel):
+    """An agent's name and capabilities plus where to find its factory."""
+
+    name: str = Field(..., description="Agent id")
+    capabilities: List[str] = Field(default_factory=list)
+    factory: str = Field(..., description="module:attr of the agent class")
+    priority: int = Field(default=1, description="Negotiator priority")
+    hosting: str = Field(
+        default="inline",
+        pattern="^(inline|process)$",
+        description="Run in the orchestrator's event loop or in a worker process",
+    )
+
+
+class PluginManifest(BaseModel):
+    """Tools and agents contributed by one plugin."""
+
+    source: str = Field(default="", description="File or entry point read")
+    tools: List[ToolManifest] = Field(default_factory=list)
+    agents: List[AgentManifest] = Field(default_factory=list)
+
+
+@dataclass
+class Discovery:
+    """Manifests found, and the sources that failed to load."""
+
+    manifests: List[PluginManifest] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def import_target(target: str) -> Any:
+    """Import ``module:attr`` (dotted attrs allowed) and return the attribute."""
+    module_name, _, attr = target.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Expected module:attr, got {target!r}")
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class LazyToolExecutor(ToolExecutor):
+    """Executor that imports and instantiates its target on first use."""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._executor: Optional[ToolExecutor] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._executor is not None
+
+    def load(self) -> ToolExecutor:
+        if self._executor is None:
+            self._executor = import_target(self.target)()
+        return self._executor
+
+    async def execute(self, name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.load().execute(name, parameters)
+
+
+class LazyAgent(AgentBase):
+    """
+    Agent stand-in that imports and builds the real agent on first execute.
+
+    ``providers`` maps dependency names (e.g. ``memory_store``, ``sandbox``)
+    to zero-argument callables; the factory is called with the dependencies
+    its signature accepts, and only those providers are invoked.
+    """
+
+    def __init__(
+        self, manifest: AgentManifest, providers: Dict[str, Callable[[], Any]]
+    ):
+        self.manifest = manifest
+        self.providers = providers
+        self._agent: Optional[AgentBase] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._agent is not None
+
+    def load(self) -> AgentBase:
+        if self._agent is None:
+            factory: Callable[..., AgentBase] = import_target(self.manifest.factory)
+            params = inspect.signature(factory).parameters
+            accepts_any = any(p.kind is p.VAR_KEYWORD for p in params.values())
+            kwargs = {
+                name: provide()
+                for name, provide in self.providers.items()
+                if accepts_any or name in params
+            }
+            self._agent = factory(**kwargs)
+        return self._agent
+
+    @property
+    def tool_registry(self) -> Any:
+        """The loaded agent's tool registry; None until the agent is loaded."""
+        return getattr(self._agent, "tool_registry", None)
+
+    def capabilities(self) -> List[str]:
+        return list(self.manifest.capabilities)
+
+    async def execute(self, ctx: AgentContext) -> Dict[str, Any]:
+        return await self.load().execute(ctx)
+
+    def execute_stream(self, ctx: AgentContext) -> AsyncGenerator[AgentUpdate, None]:
+        return self.load().execute_stream(ctx)
+
+    def get_name(self) -> str:
+        return self.manifest.name
+
+
+def _read_manifest_file(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if path.endswith(".json"):
+            data = json.loads(f.read())
+        else:
+            import yaml
+
+            data = yaml.safe_load(f)
+    return data or {}
+
+
+def discover(
+    manifest_dirs: List[str], entry_point_group: Optional[str] = ENTRY_POINT_GROUP
+) -> Discovery:
+    """Read manifests from ``manifest_dirs`` (sorted by name) and entry points."""
+    found = Discovery()
+    for directory in manifest_dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(MANIFEST_SUFFIXES):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                data = _read_manifest_file(path)
+                found.manifests.append(PluginManifest(**{**data, "source": path}))
+            except Exception as e:
+                found.errors.append((path, str(e)))
+
+    if entry_point_group:
+        for ep in entry_points(group=entry_point_group):
+            source = f"{ep.group}:{ep.name}"
+            try:
+                data = ep.load()
+                if callable(data):
+                    data = data()
+                found.manifests.append(PluginManifest(**{**data, "source": source}))
+            except Exception as e:
+                found.errors.append((source, str(e)))
+    return found
+
+
+def lazy_tools(
+    manifests: List[PluginManifest],
+) -> List[Tuple[ToolSchema, LazyToolExecutor]]:
+    """Schemas with lazy executors; tools sharing a target share one executor."""
+    executors: Dict[str, LazyToolExecutor] = {}
+    tools = []
+    for manifest in manifests:
+        for tool in manifest.tools:
+            executor = executors.get(tool.executor)
+            if executor is None:
+                executor = executors[tool.executor] = LazyToolExecutor(tool.executor)
+            # Already validated as a ToolManifest
+            schema = ToolSchema.model_construct(
+                **{name: getattr(tool, name) for name in ToolSchema.model_fields}
+            )
+            tools.append((schema, executor))
+    return tools
+
+
+def lazy_agents(
+    manifests: List[PluginManifest], providers: Dict[str, Callable[[], Any]]
+) -> List[LazyAgent]:
+    return [
+        LazyAgent(agent, providers)
+        for manifest in manifests
+        for agent in manifest.agents
+    ]
@@ -0,0 +1,19 @@
+"""Client for the LLM router shared by agents."""
+
+from .router_client import (
+    LLMClientStats,
+    LLMRouterClient,
+    LLMRouterError,
+    ResponseCache,
+    normalize_prompt,
+    request_key,
+)
+
+__all__ = [
+    "LLMRouterClient",
+    "LLMRouterError",
+    "LLMClientStats",
+    "ResponseCache",
+    "normalize_prompt",
+    "request_key",
+]
@@ -0,0 +1,302 @@
+"""
+Shared async client for the LiteLLM router (``AppConfig.llm_router_base``).
+
+One ``LLMRouterClient`` per process keeps a pool of keep-alive connections
+to the router, so agents reuse connections instead of opening their own.
+On top of the pool it:
+
+- bounds concurrent requests per model (``max_concurrency``, overridable in
+  ``model_concurrency``), so one busy model cannot take every connection;
+- retries connection errors, timeouts, 429 and 5xx responses with
+  full-jitter exponential backoff, honouring ``Retry-After``;
+- coalesces identical requests: callers asking for the same model, prompt
+  and parameters while a request is outstanding share its response;
+- optionally caches responses on disk under ``cache_dir``, keyed by a
+  SHA-256 of the model, the normalized messages and the parameters.
+
+Prompts are normalized by unifying line endings and stripping trailing
+whitespace and surrounding blank lines, so cosmetic differences still hit.
+Shared and cached responses must be treated as read-only.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Responses worth retrying: rate limited, or the router/upstream failing
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class LLMRouterError(RuntimeError):
+    """Raised when the router rejects a request or retries are exhausted."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class LLMClientStats:
+    """Counters for one router client."""
+
+    requests: int = 0  # chat() calls
+    http_requests: int = 0  # sent to the router, including retries
+    retries: int = 0
+    coalesced: int = 0  # calls that joined an identical in-flight request
+    cache_hits: int = 0
+    cache_misses: int = 0
+    errors: int = 0
+    in_flight: int = 0
+
+
+def normalize_prompt(text: str) -> str:
+    """Unify line endings and drop trailing and surrounding whitespace."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def request_key(
+    model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]
+) -> str:
+    """Hex SHA-256 identifying a request for coalescing and caching."""
+    normalized = [
+        {
+            **message,
+            "content": normalize_prompt(message["content"])
+            if isinstance(message.get("content"), str)
+            else message.get("content"),
+        }
+        for message in messages
+    ]
+    canonical = json.dumps(
+        [model, normalized, params], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk response cache, one JSON file per key (``root/ab/<key>.json``).
+
+    Writes go to a temporary file that is renamed into place, so readers
+    (including other processes) never see a partial entry. Entries older than
+    ``ttl_seconds`` are treated as missing.
+    """
+
+    def __init__(self, root: str, ttl_seconds: Optional[float] = None):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.path(key)
+        try:
+            if self.ttl_seconds is not None:
+                if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                    return None
+            with open(path, "rb") as f:
+                response: Dict[str, Any] = json.loads(f.read())
+            return response
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(response).encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None  # HTTP-date form; fall back to backoff
+
+
+class LLMRouterClient:
+    """Pooled, retrying, coalescing client for the router's chat completions."""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:4000",
+        api_key: Optional[str] = None,
+        max_connections: int = 64,
+        max_keepalive: int = 16,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 8,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        timeout_seconds: float = 120.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 8.0,
+        cache_dir: Optional[str] = None,
+        cache_ttl_seconds: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = ResponseCache(cache_dir, cache_ttl_seconds) if cache_dir else None
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Keyed by request key and cache flag: an uncached call must not be
+        # answered by a cached fetch
+        self._in_flight: Dict[Tuple[str, bool], "asyncio.Task[Dict[str, Any]]"] = {}
+        self._stats = LLMClientStats()
+
+    async def __aenter__(self) -> "LLMRouterClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        cache: bool = True,
+        **params: Any,
+    ) -> Dict[str, Any]:
+        """
+        POST ``/chat/completions`` and return the decoded response.
+
+        ``params`` (``temperature``, ``max_tokens``, ...) are sent as-is and
+        are part of the coalescing/cache key. ``cache=False`` skips the disk
+        cache for this call; it only shares an in-flight request with other
+        ``cache=False`` calls.
+        """
+        self._stats.requests += 1
+        key = request_key(model, messages, params)
+        flight = (key, cache)
+        task = self._in_flight.get(flight)
+        if task is not None:
+            self._stats.coalesced += 1
+        else:
+            body = {**params, "model": model, "messages": messages}
+            task = asyncio.create_task(self._fetch(key, model, body, cache))
+            self._in_flight[flight] = task
+            task.add_done_callback(lambda done: self._finished(flight, done))
+        # Shielded so one caller giving up does not cancel the others' request
+        return await asyncio.shield(task)
+
+    async def complete(self, model: str, prompt: str, **kwargs: Any) -> str:
+        """Send ``prompt`` as a single user message; return the reply text."""
+        response = await self.chat(
+            model, [{"role": "user", "content": prompt}], **kwargs
+        )
+        try:
+            content: str = response["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMRouterError(f"Malformed router response: {e!r}") from e
+        return content
+
+    def _finished(
+        self, flight: Tuple[str, bool], task: "asyncio.Task[Dict[str, Any]]"
+    ) -> None:
+        if self._in_flight.get(flight) is task:
+            del self._in_flight[flight]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats.errors += 1
+
+    async def _fetch(
+        self, key: str, model: str, body: Dict[str, Any], use_cache: bool
+    ) -> Dict[str, Any]:
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                self._stats.cache_hits += 1
+                return cached
+            self._stats.cache_misses += 1
+        response = await self._post(model, body)
+        if cache is not None:
+            await asyncio.to_thread(cache.put, key, response)
+        return response
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            limit = self.model_concurrency.get(model, self.max_concurrency)
+            semaphore = self._semaphores[model] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def _post(self, model: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            retry_after: Optional[float] = None
+            # The model's slot is held per attempt, not across backoff sleeps
+            async with self._semaphore(model):
+                self._stats.http_requests += 1
+                self._stats.in_flight += 1
+                try:
+                    response = await self._http.post("/chat/completions", json=body)
+                except httpx.TransportError as e:
+                    error = LLMRouterError(f"Router request failed: {e!r}")
+                    error.__cause__ = e
+                else:
+                    if response.status_code < 400:
+                        try:
+                            result: Dict[str, Any] = response.json()
+                        except ValueError as e:
+                            raise LLMRouterError(
+                                "Router returned invalid JSON", response.status_code
+                            ) from e
+                        return result
+                    error = LLMRouterError(
+                        f"Router returned {response.status_code}: {response.text[:500]}",
+                        response.status_code,
+                    )
+                    if response.status_code not in RETRY_STATUSES:
+                        raise error
+                    retry_after = _retry_after(response.headers.get("retry-after"))
+                finally:
+                    self._stats.in_flight -= 1
+            if attempt >= self.max_retries:
+                raise error
+            if retry_after is None:
+                # Full jitter: spread retries from many callers over the window
+                ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+                retry_after = random.uniform(0, ceiling)
+            attempt += 1
+            self._stats.retries += 1
+            await asyncio.sleep(min(retry_after, self.backoff_max))
+
+    def stats(self) -> Dict[str, Any]:
+        return asdict(self._stats)
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
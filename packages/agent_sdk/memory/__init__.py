@@ -1,15 +1,37 @@
 """Memory and storage systems for agents."""
 
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Any
+
 from .store import AgentMemoryStore, InteractionRecord
 
-try:
-    from .sqlite_store import SQLiteMemoryStore  # type: ignore
+# The SQLite store and vector index are imported on first access: they pull
+# in aiosqlite and numpy, which most importers of this package never use
+_LAZY = {
+    "SQLiteMemoryStore": ".sqlite_store",
+    "HashingEmbedder": ".vector_index",
+    "VectorIndex": ".vector_index",
+}
+
+_HAS_SQLITE = find_spec("aiosqlite") is not None
+_HAS_VECTOR = find_spec("numpy") is not None
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(import_module(module, __name__), name)
+    except Exception:  # optional dependency missing or import error
+        value = None
+    globals()[name] = value
+    return value
 
-    _HAS_SQLITE = True
-except Exception:  # aiosqlite missing or import error
-    SQLiteMemoryStore = None  # type: ignore
-    _HAS_SQLITE = False
 
-__all__ = ["AgentMemoryStore", "InteractionRecord"] + (
-    ["SQLiteMemoryStore"] if _HAS_SQLITE else []
+__all__ = (
+    ["AgentMemoryStore", "InteractionRecord"]
+    + (["SQLiteMemoryStore"] if _HAS_SQLITE else [])
+    + (["HashingEmbedder", "VectorIndex"] if _HAS_VECTOR else [])
 )
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+
+@dataclass
+class _Entry:
+    """Newest-first decoded history for one task."""
+
+    records: List[Dict[str, Any]]
+    sizes: List[int]
+    ids: List[int]  # row id per record, descending
+    complete: bool  # True when records hold the task's entire history
+    nbytes: int = 0
+
+
+@dataclass
+class HistoryCacheStats:
+    """Counters for the history cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    hit_rate: float = 0.0
+
+
+class HistoryCache:
+    """
+    Byte-bounded LRU cache of decoded task history.
+
+    Sizes are the length of the stored JSON for each record, which tracks the
+    decoded footprint closely enough for budgeting. Cached records are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Reads in flight per task, and tasks written to while one was running
+        self._filling: Dict[str, int] = {}
+        self._raced: Set[str] = set()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
+
+    def begin_fill(self, task_id: str) -> None:
+        """Mark a database read for ``task_id`` as in flight."""
+        self._filling[task_id] = self._filling.get(task_id, 0) + 1
+
+    def end_fill(self, task_id: str) -> bool:
+        """Finish a read; returns False if a write raced it and it must not be cached."""
+        raced = task_id in self._raced
+        remaining = self._filling.pop(task_id) - 1
+        if remaining:
+            self._filling[task_id] = remaining
+        else:
+            self._raced.discard(task_id)
+        return not raced
+
+    def _mark_written(self, task_id: str) -> None:
+        if task_id in self._filling:
+            self._raced.add(task_id)
+
+    def get(self, task_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(task_id)
+        if entry is None or (not entry.complete and len(entry.records) < limit):
+            self._misses += 1
+            return None
+        self._entries.move_to_end(task_id)
+        self._hits += 1
+        return entry.records[:limit]
+
+    def put(
+        self,
+        task_id: str,
+        records: List[Dict[str, Any]],
+        sizes: List[int],
+        ids: List[int],
+        limit: int,
+    ) -> None:
+        """Cache the newest ``limit`` records (row ``ids`` descending) for a task."""
+        self._discard(task_id)
+        entry = _Entry(
+            records=records,
+            sizes=sizes,
+            ids=ids,
+            complete=len(records) < limit,
+            nbytes=sum(sizes),
+        )
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[task_id] = entry
+        self._bytes += entry.nbytes
+        self._evict()
+
+    def prepend(
+        self, task_id: str, record: Dict[str, Any], size: int, row_id: int
+    ) -> None:
+        """
+        Record a new interaction in a cached history.
+
+        Concurrent writers may report rows out of order, and a read may
+        already have cached the row, so it is placed by ``row_id`` and
+        skipped if present.
+        """
+        self._mark_written(task_id)
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return
+        ids = entry.ids
+        position = 0
+        while position < len(ids) and ids[position] > row_id:
+            position += 1
+        if position < len(ids) and ids[position] == row_id:
+            return
+        if position == len(ids) and not entry.complete:
+            return  # older than the cached window
+        entry.records.insert(position, record)
+        entry.sizes.insert(position, size)
+        ids.insert(position, row_id)
+        entry.nbytes += size
+        self._bytes += size
+        # Shed the oldest records of this task first when it outgrows the budget
+        while entry.nbytes > self.max_bytes and entry.records:
+            entry.records.pop()
+            entry.ids.pop()
+            dropped = entry.sizes.pop()
+            entry.nbytes -= dropped
+            self._bytes -= dropped
+            entry.complete = False
+        self._entries.move_to_end(task_id)
+        self._evict()
+
+    def invalidate(self, task_id: str) -> None:
+        self._mark_written(task_id)
+        self._discard(task_id)
+
+    def _discard(self, task_id: str) -> None:
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self._evictions += 1
+
+    def stats(self) -> HistoryCacheStats:
+        lookups = self._hits + self._misses
+        return HistoryCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            entries=len(self._entries),
+            bytes=self._bytes,
+            max_bytes=self.max_bytes,
+            hit_rate=self._hits / lookups if lookups else 0.0,
+        )
@@ -1,25 +1,144 @@
 from __future__ import annotations
 
+import asyncio
+import fcntl
 import json
+import logging
 import os
-from typing import Any, Dict, List
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import aiosqlite
 
+from ..artifacts.blob_store import REF_PATTERN
+from .history_cache import HistoryCache
 from .store import AgentMemoryStore
 
+if TYPE_CHECKING:
+    from .vector_index import VectorIndex
+
+log = logging.getLogger("kyros.memory")
+
+# Text indexed for full-text search: the task payload plus the raw result JSON.
+# The agent tool list and recalled memory in the context are left out.
+_FTS_BODY = "coalesce(json_extract({row}.context, '$.task'), '') || ' ' || coalesce({row}.result, '')"
+# The tenant as a single token (hex of its UTF-8 bytes), so the tenant filter
+# is part of the MATCH instead of a post-filter over every tenant's hits
+_FTS_TENANT = "CASE WHEN {row}.tenant_id IS NULL THEN 'tnone' ELSE 't' || hex({row}.tenant_id) END"
+_FTS_BACKFILL_BATCH = 10_000
+# Expired progress rows are deleted by a flush at most this often
+_PROGRESS_PRUNE_INTERVAL = 3600.0
+
+
+def fts_query(text: str) -> str:
+    """Quote each term so paths and error text match literally, not as FTS5 syntax."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    return " ".join(terms)
+
+
+def fts_tenant(tenant_id: Optional[str]) -> str:
+    """The token ``_FTS_TENANT`` indexes for ``tenant_id``."""
+    return "tnone" if tenant_id is None else "t" + str(tenant_id).encode().hex()
+
+
+def interaction_text(context: Dict[str, Any], result: Dict[str, Any]) -> str:
+    """Flatten the searchable parts of an interaction into one string."""
+    task = context.get("task") or {}
+    message = result.get("message")
+    parts = [
+        task.get("type"),
+        task.get("description"),
+        " ".join(task.get("labels", [])),
+        message.get("intent") if isinstance(message, dict) else None,
+        result.get("output"),
+        result.get("error"),
+    ]
+    return "\n".join(str(p) for p in parts if p)
+
 
 class SQLiteMemoryStore(AgentMemoryStore):
     """SQLite-backed memory store for agent interactions."""
 
-    def __init__(self, db_path: str = "data/kyros.db") -> None:
+    def __init__(
+        self,
+        db_path: str = "data/kyros.db",
+        vector_index: Optional[VectorIndex] = None,
+        history_cache_bytes: int = 0,
+        progress_batch_size: int = 64,
+        progress_flush_seconds: float = 0.5,
+        progress_retention_seconds: Optional[float] = None,
+    ) -> None:
         self.db_path = db_path
+        self.vector_index = vector_index
+        # Streamed increments queued for the next batched write; the buffer
+        # lock only guards the list, the write lock keeps batches in order
+        self.progress_batch_size = progress_batch_size
+        self.progress_flush_seconds = progress_flush_seconds
+        self.progress_retention_seconds = progress_retention_seconds
+        self._progress: List[Tuple[str, str, str, str]] = []
+        self._progress_lock = threading.Lock()
+        self._progress_write_lock = threading.Lock()
+        self._progress_flushed_at = time.monotonic()
+        self._progress_pruned_at: Optional[float] = None
+        # Per-process read-through cache; writes from other processes are not seen
+        self._history_cache = (
+            HistoryCache(history_cache_bytes) if history_cache_bytes > 0 else None
+        )
+        self.has_fts = False
         self._initialized = False
 
+    @classmethod
+    def from_settings(
+        cls,
+        vector_store: bool = False,
+        vector_path: str = "data/vectors",
+        vector_dim: int = 256,
+        vector_ivf_lists: int = 0,
+        **kwargs: Any,
+    ) -> "SQLiteMemoryStore":
+        """
+        Build a store from plain (serializable) settings, creating the recall
+        index when ``vector_store`` is on; the other settings go to ``__init__``.
+        Worker processes build their stores this way from the parent's config.
+        """
+        vector_index = None
+        if vector_store:
+            try:
+                from .vector_index import VectorIndex
+            except ImportError:
+                log.warning("Vector store enabled but numpy is not installed")
+            else:
+                vector_index = VectorIndex(
+                    path=vector_path, dim=vector_dim, nlist=vector_ivf_lists
+                )
+        return cls(vector_index=vector_index, **kwargs)
+
     async def _init(self) -> None:
         if self._initialized:
             return
         os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        # Several processes (uvicorn or agent workers) may open a new database
+        # at once and the migrations are check-then-act, so run them under an
+        # exclusive lock on a file next to the database (released on close)
+        with open(self.db_path + ".lock", "ab") as lock:
+            await asyncio.to_thread(fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+            await self._create_schema()
+        self._initialized = True
+
+    async def _create_schema(self) -> None:
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
                 """
@@ -33,8 +152,176 @@ class SQLiteMemoryStore(AgentMemoryStore):
                 )
                 """
             )
+            columns = {
+                row[1]
+                for row in await db.execute_fetchall("PRAGMA table_info(agent_history)")
+            }
+            if "tenant_id" not in columns:
+                await db.execute("ALTER TABLE agent_history ADD COLUMN tenant_id TEXT")
+                await db.execute(
+                    "UPDATE agent_history SET tenant_id = json_extract(context, '$.tenant_id')"
+                )
+            # Keyset pagination and per-task history both seek on (task_id, id)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_history_task_id ON agent_history(task_id, id)"
+            )
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_history_tenant_id ON agent_history(tenant_id)"
+            )
+            # Partial messages and artifacts streamed while a task runs
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_progress (
+                    id INTEGER PRIMARY KEY,
+                    agent_id TEXT,
+                    task_id TEXT,
+                    kind TEXT,
+                    payload TEXT,
+                    ts DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_progress_task_id ON agent_progress(task_id, id)"
+            )
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_progress_ts ON agent_progress(ts)"
+            )
+            await db.commit()
+            self.has_fts = await self._init_fts(db)
+
+    async def _init_fts(self, db: aiosqlite.Connection) -> bool:
+        """
+        Create the FTS5 index and its sync triggers, backfilling old rows.
+
+        The index is external-content: it reads indexed text back through the
+        ``agent_history_fts_src`` view instead of storing a second copy.
+        """
+        existing = await db.execute_fetchall(
+            "SELECT sql FROM sqlite_master WHERE name = 'agent_history_fts'"
+        )
+        existing = list(existing)
+        if existing and "tenant" not in existing[0][0]:
+            # Pre-tenant layout (a full copy of the body, no tenant column)
+            await db.execute("DROP TRIGGER IF EXISTS agent_history_fts_ai")
+            await db.execute("DROP TRIGGER IF EXISTS agent_history_fts_ad")
+            await db.execute("DROP TABLE agent_history_fts")
+            await db.execute("DROP TABLE IF EXISTS agent_history_fts_backfill")
+            existing = []
+        if not existing:
+            try:
+                await db.execute(
+                    f"""
+                    CREATE VIEW IF NOT EXISTS agent_history_fts_src AS
+                    SELECT h.id, {_FTS_BODY.format(row="h")} AS body,
+                           {_FTS_TENANT.format(row="h")} AS tenant
+                    FROM agent_history h
+                    """
+                )
+                await db.execute(
+                    """
+                    CREATE VIRTUAL TABLE agent_history_fts USING fts5(
+                        body, tenant,
+                        content='agent_history_fts_src', content_rowid='id'
+                    )
+                    """
+                )
+            except aiosqlite.OperationalError:  # SQLite built without FTS5
+                return False
+        # Rows in (done_id, end_id] predate the triggers and still need
+        # indexing; the high-water mark lets a restart resume the backfill
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_history_fts_backfill (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                done_id INTEGER NOT NULL,
+                end_id INTEGER NOT NULL
+            )
+            """
+        )
+        # Triggers first, so rows written while the backfill runs are indexed
+        await db.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS agent_history_fts_ai
+            AFTER INSERT ON agent_history BEGIN
+                INSERT INTO agent_history_fts(rowid, body, tenant)
+                VALUES (
+                    new.id,
+                    {_FTS_BODY.format(row="new")},
+                    {_FTS_TENANT.format(row="new")}
+                );
+            END
+            """
+        )
+        # External-content deletes must pass the values that were indexed,
+        # and rows the backfill has not reached yet were not indexed at all
+        await db.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS agent_history_fts_ad
+            AFTER DELETE ON agent_history
+            WHEN NOT EXISTS (
+                SELECT 1 FROM agent_history_fts_backfill
+                WHERE old.id > done_id AND old.id <= end_id
+            )
+            BEGIN
+                INSERT INTO agent_history_fts(agent_history_fts, rowid, body, tenant)
+                VALUES (
+                    'delete',
+                    old.id,
+                    {_FTS_BODY.format(row="old")},
+                    {_FTS_TENANT.format(row="old")}
+                );
+            END
+            """
+        )
+        if existing:
+            # An index built before the mark existed: whatever is past its
+            # highest indexed row was never indexed
+            start = "(SELECT max(id) FROM agent_history_fts_docsize)"
+        else:
+            start = "0"
+        await db.execute(
+            f"""
+            INSERT OR IGNORE INTO agent_history_fts_backfill(id, done_id, end_id)
+            SELECT 0, coalesce({start}, 0), coalesce(max(id), 0) FROM agent_history
+            """
+        )
+        await db.commit()
+        await self._backfill_fts(db)
+        return True
+
+    async def _backfill_fts(self, db: aiosqlite.Connection) -> None:
+        """Index rows up to the backfill's end in bounded, committed batches."""
+        while True:
+            ((done_id, end_id),) = await db.execute_fetchall(
+                "SELECT done_id, end_id FROM agent_history_fts_backfill"
+            )
+            if done_id >= end_id:
+                return
+            ((batch_end,),) = await db.execute_fetchall(
+                """
+                SELECT max(id) FROM (
+                    SELECT id FROM agent_history
+                    WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+                )
+                """,
+                (done_id, end_id, _FTS_BACKFILL_BATCH),
+            )
+            if batch_end is None:  # the remaining rows were deleted
+                batch_end = end_id
+            await db.execute(
+                """
+                INSERT INTO agent_history_fts(rowid, body, tenant)
+                SELECT id, body, tenant FROM agent_history_fts_src
+                WHERE id > ? AND id <= ?
+                """,
+                (done_id, batch_end),
+            )
+            # The batch and its mark commit together
+            await db.execute(
+                "UPDATE agent_history_fts_backfill SET done_id = ?", (batch_end,)
+            )
             await db.commit()
-        self._initialized = True
 
     async def store_interaction(
         self,
@@ -44,21 +331,295 @@ class SQLiteMemoryStore(AgentMemoryStore):
         result: Dict[str, Any],
     ) -> None:
         await self._init()
+        context_json, result_json = json.dumps(context), json.dumps(result)
+        # Same format as CURRENT_TIMESTAMP so cached and stored rows agree
+        ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT INTO agent_history(agent_id, task_id, context, result) VALUES (?, ?, ?, ?)",
-                (agent_id, task_id, json.dumps(context), json.dumps(result)),
+            cursor = await db.execute(
+                "INSERT INTO agent_history(agent_id, task_id, tenant_id, context, result, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    agent_id,
+                    task_id,
+                    context.get("tenant_id"),
+                    context_json,
+                    result_json,
+                    ts,
+                ),
             )
             await db.commit()
+        if self._history_cache is not None:
+            if task_id in self._history_cache:
+                # Decode our own copies so later mutation by the caller can't leak in
+                record = {
+                    "context": json.loads(context_json),
+                    "result": json.loads(result_json),
+                    "ts": ts,
+                }
+                size = len(context_json) + len(result_json)
+                # Placed by row id: another write may have reached the cache first
+                self._history_cache.prepend(
+                    task_id, record, size, cursor.lastrowid or 0
+                )
+            else:
+                self._history_cache.invalidate(task_id)
+        if self.vector_index is not None and cursor.lastrowid is not None:
+            # Flushes the memmap and may train the IVF partition: off the loop
+            await asyncio.to_thread(
+                self.vector_index.add,
+                [cursor.lastrowid],
+                [interaction_text(context, result)],
+            )
 
     async def history(self, task_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        await self._init()
+        cache = self._history_cache
+        if cache is not None:
+            cached = cache.get(task_id, limit)
+            if cached is not None:
+                return cached
+            cache.begin_fill(task_id)
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                rows = await db.execute_fetchall(
+                    "SELECT id, context, result, ts FROM agent_history WHERE task_id = ? ORDER BY id DESC LIMIT ?",
+                    (task_id, limit),
+                )
+        finally:
+            fresh = cache.end_fill(task_id) if cache is not None else False
+        records = [
+            {"context": json.loads(c), "result": json.loads(r), "ts": ts}
+            for (_, c, r, ts) in rows
+        ]
+        if cache is not None and fresh:
+            sizes = [len(c) + len(r) for (_, c, r, _) in rows]
+            ids = [row_id for (row_id, _, _, _) in rows]
+            cache.put(task_id, list(records), sizes, ids, limit)
+        return records
+
+    async def store_progress(
+        self, agent_id: str, task_id: str, kind: str, payload: Dict[str, Any]
+    ) -> None:
+        """
+        Queue a streamed increment (``message``/``artifact``) for storage.
+
+        Increments are written in batches: once ``progress_batch_size`` are
+        queued or ``progress_flush_seconds`` have passed since the last write,
+        and on ``flush_progress`` (run end, reads, shutdown).
+        """
+        row = (agent_id, task_id, kind, json.dumps(payload))
+        with self._progress_lock:
+            self._progress.append(row)
+            due = (
+                len(self._progress) >= self.progress_batch_size
+                or time.monotonic() - self._progress_flushed_at
+                >= self.progress_flush_seconds
+            )
+        if due:
+            await self.flush_progress()
+
+    async def flush_progress(self) -> int:
+        """Write queued increments (and prune expired ones when due); returns how many."""
+        prune_due = self.progress_retention_seconds is not None and (
+            self._progress_pruned_at is None
+            or time.monotonic() - self._progress_pruned_at >= _PROGRESS_PRUNE_INTERVAL
+        )
+        if not self._progress and not prune_due:
+            return 0
+        await self._init()
+        written, _ = await asyncio.to_thread(self._write_progress, prune_due)
+        return written
+
+    async def prune_progress(self) -> int:
+        """Delete increments older than ``progress_retention_seconds`` now."""
+        if self.progress_retention_seconds is None:
+            return 0
+        await self._init()
+        _, pruned = await asyncio.to_thread(self._write_progress, True)
+        return pruned
+
+    def _write_progress(self, prune: bool) -> Tuple[int, int]:
+        """Insert the queued batch in one transaction; returns (written, pruned)."""
+        with self._progress_write_lock:
+            with self._progress_lock:
+                rows, self._progress = self._progress, []
+                self._progress_flushed_at = time.monotonic()
+            pruned = 0
+            conn = sqlite3.connect(self.db_path)
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO agent_progress(agent_id, task_id, kind, payload) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                    if prune and self.progress_retention_seconds is not None:
+                        pruned = conn.execute(
+                            "DELETE FROM agent_progress WHERE ts < datetime('now', ?)",
+                            (f"-{self.progress_retention_seconds} seconds",),
+                        ).rowcount
+                        self._progress_pruned_at = time.monotonic()
+            except BaseException:
+                # Put the batch back in front of anything queued meanwhile
+                with self._progress_lock:
+                    self._progress[:0] = rows
+                raise
+            finally:
+                conn.close()
+        return len(rows), pruned
+
+    async def progress(
+        self, task_id: str, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Streamed increments for a task in arrival order, after ``after_id``."""
+        await self.flush_progress()
         await self._init()
         async with aiosqlite.connect(self.db_path) as db:
             rows = await db.execute_fetchall(
-                "SELECT context, result, ts FROM agent_history WHERE task_id = ? ORDER BY id DESC LIMIT ?",
-                (task_id, limit),
+                "SELECT id, agent_id, kind, payload, ts FROM agent_progress WHERE task_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (task_id, after_id or 0, limit),
+            )
+        return [
+            {
+                "id": row_id,
+                "agent_id": agent_id,
+                "kind": kind,
+                "payload": json.loads(payload),
+                "ts": ts,
+            }
+            for (row_id, agent_id, kind, payload, ts) in rows
+        ]
+
+    async def artifact_refs(self) -> Set[str]:
+        """Every ``sha256:`` artifact ref mentioned in a stored result or increment."""
+        await self.flush_progress()
+        await self._init()
+        refs: Set[str] = set()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT result FROM agent_history WHERE instr(result, 'sha256:') > 0"
+                " UNION ALL "
+                "SELECT payload FROM agent_progress WHERE instr(payload, 'sha256:') > 0"
+            ) as cursor:
+                async for (text,) in cursor:
+                    refs.update(REF_PATTERN.findall(text))
+        return refs
+
+    def invalidate_history(self, task_id: str) -> None:
+        """Drop ``task_id`` from the history cache after another process wrote to it."""
+        if self._history_cache is not None:
+            self._history_cache.invalidate(task_id)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit/miss and size counters for the history cache, if enabled."""
+        if self._history_cache is None:
+            return None
+        return asdict(self._history_cache.stats())
+
+    async def iter_history(
+        self, task_id: str, after_id: Optional[int] = None, page_size: int = 100
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream interaction history for a task in insertion order.
+
+        Rows are fetched in pages of ``page_size`` using keyset pagination on
+        ``id`` (no OFFSET scans) and each row is JSON-decoded only when it is
+        yielded. Pass the ``id`` of the last record seen as ``after_id`` to
+        resume.
+        """
+        await self._init()
+        cursor_id = after_id if after_id is not None else 0
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                rows = list(
+                    await db.execute_fetchall(
+                        "SELECT id, context, result, ts FROM agent_history WHERE task_id = ? AND id > ? ORDER BY id LIMIT ?",
+                        (task_id, cursor_id, page_size),
+                    )
+                )
+                for row_id, c, r, ts in rows:
+                    cursor_id = row_id
+                    yield {
+                        "id": row_id,
+                        "context": json.loads(c),
+                        "result": json.loads(r),
+                        "ts": ts,
+                    }
+                if len(rows) < page_size:
+                    return
+
+    async def recall(
+        self, query: str, k: int = 5, tenant_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return up to ``k`` past interactions most similar to ``query``.
+
+        Requires a ``vector_index``; returns an empty list without one. Only
+        interactions recorded under ``tenant_id`` are returned.
+        """
+        if self.vector_index is None or not query:
+            return []
+        await self._init()
+        # Over-fetch so tenant filtering still leaves k candidates
+        (hits,) = await asyncio.to_thread(self.vector_index.search, [query], k * 4)
+        if not hits:
+            return []
+        scores = dict(hits)
+        placeholders = ",".join("?" * len(scores))
+        async with aiosqlite.connect(self.db_path) as db:
+            rows = await db.execute_fetchall(
+                f"SELECT id, agent_id, task_id, result, ts FROM agent_history WHERE id IN ({placeholders}) AND tenant_id IS ?",
+                (*scores, tenant_id),
+            )
+        recalled = []
+        for row_id, agent_id, task_id, r, ts in rows:
+            recalled.append(
+                {
+                    "id": row_id,
+                    "agent_id": agent_id,
+                    "task_id": task_id,
+                    "score": scores[row_id],
+                    "result": json.loads(r),
+                    "ts": ts,
+                }
+            )
+        recalled.sort(key=lambda item: item["score"], reverse=True)
+        return recalled[:k]
+
+    async def search(
+        self, query: str, tenant_id: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over interaction history, best matches first.
+
+        Every whitespace-separated term in ``query`` must appear. Results carry
+        a highlighted ``snippet`` instead of the full context and result.
+        """
+        await self._init()
+        if not self.has_fts:
+            raise RuntimeError("SQLite build does not support FTS5")
+        terms = fts_query(query)
+        if not terms:
+            return []
+        # Only the tenant's postings are intersected and ranked
+        match = f'tenant : "{fts_tenant(tenant_id)}" AND body : ({terms})'
+        async with aiosqlite.connect(self.db_path) as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT h.id, h.agent_id, h.task_id, h.ts,
+                       snippet(agent_history_fts, 0, '[', ']', '...', 16), f.rank
+                FROM agent_history_fts f JOIN agent_history h ON h.id = f.rowid
+                WHERE agent_history_fts MATCH ?
+                ORDER BY f.rank LIMIT ?
+                """,
+                (match, limit),
             )
-            return [
-                {"context": json.loads(c), "result": json.loads(r), "ts": ts}
-                for (c, r, ts) in rows
-            ]
+        return [
+            {
+                "id": row_id,
+                "agent_id": agent_id,
+                "task_id": task_id,
+                "ts": ts,
+                "snippet": snippet,
+                "rank": rank,
+            }
+            for (row_id, agent_id, task_id, ts, snippet, rank) in rows
+        ]
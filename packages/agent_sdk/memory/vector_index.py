@@ -0,0 +1,321 @@
+"""
+Offline similarity index over stored agent interactions.
+
+Texts are embedded with deterministic hashed n-gram features (no model
+download) and kept in a float32 matrix that is memory-mapped from disk, so the
+index survives restarts and grows by appending rows in place.
+
+Several processes (uvicorn workers, agent worker processes) may share one
+index directory: every read and write takes a ``flock`` on ``path/lock`` and
+first picks up rows other processes appended. Methods block on disk I/O, and
+``add`` may run IVF training, so async callers should use ``asyncio.to_thread``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Embed text with signed feature hashing of word and character n-grams."""
+
+    def __init__(self, dim: int = 256, char_ngram: int = 3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        features = [f"w:{w}" for w in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        n = self.char_ngram
+        for w in words:
+            padded = f"<{w}>"
+            features.extend(
+                f"c:{padded[i : i + n]}" for i in range(max(1, len(padded) - n + 1))
+            )
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an L2-normalized ``(len(texts), dim)`` float32 matrix."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(f.encode("utf-8")) for f in self._features(text)),
+                dtype=np.uint32,
+            )
+            if not hashes.size:
+                continue
+            # Low bits pick the bucket, the top bit picks the sign
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(out[row], hashes % self.dim, signs)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class VectorIndex:
+    """
+    Append-only cosine similarity index backed by memory-mapped NumPy files.
+
+    Layout under ``path``: ``vectors.f32`` (row-major embeddings),
+    ``ids.i64`` (interaction id per row), ``lists.i32`` (IVF list per row) and
+    ``meta.json`` (dimension, row count, capacity, IVF generation). The row
+    count in ``meta.json`` is written last, so a crash mid-append never exposes
+    a partially written row. With ``nlist > 0`` rows are partitioned into an
+    inverted file (IVF) once enough data exists and searches only scan the
+    ``nprobe`` closest lists.
+    """
+
+    _MIN_ROWS_PER_LIST = 32
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = 256,
+        nlist: int = 0,
+        nprobe: int = 4,
+        initial_capacity: int = 1024,
+    ):
+        self.path = path
+        self.embedder = HashingEmbedder(dim=dim)
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._count = 0
+        self._capacity = 0
+        # IVF generation, bumped in meta.json each time centroids are retrained;
+        # -1 until this instance has loaded them
+        self._ivf = -1
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        # flock excludes other processes and, since each acquisition opens its
+        # own descriptor, other threads; the mutex guards in-memory refreshes
+        # by concurrent readers
+        self._mutex = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        with self._locked(exclusive=True, sync=False):
+            meta = self._read_meta()
+            if meta:
+                if meta["dim"] != dim:
+                    raise ValueError(
+                        f"Vector index at {path} has dim {meta['dim']}, expected {dim}"
+                    )
+            else:
+                self._ivf = 0
+                self._open(initial_capacity)
+                self._write_meta()
+            self._sync()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # --- storage ---
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _locked(self, exclusive: bool, sync: bool = True) -> Iterator[None]:
+        with open(self._file("lock"), "ab") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            if sync:
+                with self._mutex:
+                    self._sync()
+            yield
+
+    def _sync(self) -> None:
+        """Catch up with rows, growth and training done by other processes."""
+        meta = self._read_meta()
+        if meta is None:
+            return
+        if meta["capacity"] != self._capacity:
+            self._open(meta["capacity"])
+        previous, self._count = self._count, meta["count"]
+        ivf = meta.get("ivf", 0)
+        if ivf != self._ivf:
+            self._ivf = ivf
+            centroids_path = self._file("centroids.npy")
+            if self.nlist and os.path.exists(centroids_path):
+                self._centroids = np.load(centroids_path)
+                self._rebuild_lists()
+        elif self._centroids is not None:
+            for row in range(previous, self._count):
+                self._lists[int(self._assign[row])].append(row)
+
+    def _read_meta(self) -> Optional[Dict[str, int]]:
+        try:
+            with open(self._file("meta.json")) as f:
+                meta: Dict[str, int] = json.load(f)
+                return meta
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "count": self._count,
+                    "capacity": self._capacity,
+                    "ivf": self._ivf,
+                },
+                f,
+            )
+        os.replace(tmp, self._file("meta.json"))
+
+    def _memmap(self, name: str, dtype: type, shape: Tuple[int, ...]) -> np.memmap:
+        file_path = self._file(name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        # Grow (or create) the backing file before mapping it
+        with open(file_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(file_path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._vectors = self._memmap("vectors.f32", np.float32, (capacity, self.dim))
+        self._ids = self._memmap("ids.i64", np.int64, (capacity,))
+        self._assign = self._memmap("lists.i32", np.int32, (capacity,))
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for arr in (self._vectors, self._ids, self._assign):
+            arr.flush()
+        self._open(capacity)
+
+    # --- writes ---
+
+    def add(self, ids: Sequence[int], texts: Sequence[str]) -> None:
+        """Append embeddings for ``texts`` keyed by interaction ``ids``."""
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length")
+        if not ids:
+            return
+        vectors = self.embedder.embed(texts)
+        with self._locked(exclusive=True):
+            self._append(ids, vectors)
+
+    def _append(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        start, end = self._count, self._count + len(ids)
+        self._ensure_capacity(end)
+
+        self._vectors[start:end] = vectors
+        self._ids[start:end] = ids
+        if self._centroids is not None:
+            assigned = np.argmax(vectors @ self._centroids.T, axis=1)
+            self._assign[start:end] = assigned
+            for offset, list_id in enumerate(assigned):
+                self._lists[int(list_id)].append(start + offset)
+        self._vectors.flush()
+        self._ids.flush()
+        self._assign.flush()
+
+        self._count = end
+        self._write_meta()
+
+        if (
+            self.nlist
+            and self._centroids is None
+            and self._count >= self.nlist * self._MIN_ROWS_PER_LIST
+        ):
+            self._train(10, 0)
+
+    def train_ivf(self, iterations: int = 10, seed: int = 0) -> None:
+        """Partition the current rows into ``nlist`` lists with spherical k-means."""
+        with self._locked(exclusive=True):
+            self._train(iterations, seed)
+
+    def _train(self, iterations: int, seed: int) -> None:
+        if not self.nlist or self._count < self.nlist:
+            return
+        data = self._vectors[: self._count]
+        rng = np.random.default_rng(seed)
+        centroids = np.array(
+            data[rng.choice(self._count, self.nlist, replace=False)], dtype=np.float32
+        )
+        for _ in range(iterations):
+            assigned = np.argmax(data @ centroids.T, axis=1)
+            for list_id in range(self.nlist):
+                members = data[assigned == list_id]
+                if len(members):
+                    centroids[list_id] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+        self._centroids = centroids
+        self._assign[: self._count] = np.argmax(data @ centroids.T, axis=1)
+        self._assign.flush()
+        np.save(self._file("centroids.npy"), centroids)
+        self._ivf += 1
+        self._write_meta()
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        assert self._centroids is not None
+        self._lists = [[] for _ in range(len(self._centroids))]
+        for row, list_id in enumerate(self._assign[: self._count]):
+            self._lists[int(list_id)].append(row)
+
+    # --- reads ---
+
+    def search(
+        self, queries: Sequence[str], k: int = 5
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Return the top-``k`` ``(interaction_id, cosine)`` pairs per query.
+
+        All queries are scored in a single matrix product when the index is
+        brute force; with IVF each query scans only its probed lists.
+        """
+        if not queries:
+            return []
+        q = self.embedder.embed(queries)
+        with self._locked(exclusive=False):
+            return self._search(q, k)
+
+    def _search(self, q: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        if not self._count:
+            return [[] for _ in q]
+        if self._centroids is None:
+            scores = q @ self._vectors[: self._count].T
+            return [self._top_k(row, None, k) for row in scores]
+
+        probes = np.argsort(-(q @ self._centroids.T), axis=1)[:, : self.nprobe]
+        results: List[List[Tuple[int, float]]] = []
+        for query, lists in zip(q, probes):
+            rows = np.fromiter(
+                (r for list_id in lists for r in self._lists[int(list_id)]),
+                dtype=np.int64,
+            )
+            if not rows.size:
+                results.append([])
+                continue
+            results.append(self._top_k(self._vectors[rows] @ query, rows, k))
+        return results
+
+    def _top_k(
+        self, scores: np.ndarray, rows: Optional[np.ndarray], k: int
+    ) -> List[Tuple[int, float]]:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        row_ids = rows[top] if rows is not None else top
+        return [(int(self._ids[row]), float(scores[i])) for row, i in zip(row_ids, top)]
@@ -1,5 +1,22 @@
 """Protocol definitions for agent communication."""
 
 from .messages import AgentMessage, Artifact
+from .wire import (
+    WireFormatError,
+    decode,
+    decode_model,
+    encode,
+    encode_model,
+    encode_parts,
+)
 
-__all__ = ["AgentMessage", "Artifact"]
+__all__ = [
+    "AgentMessage",
+    "Artifact",
+    "WireFormatError",
+    "encode",
+    "encode_parts",
+    "decode",
+    "encode_model",
+    "decode_model",
+]
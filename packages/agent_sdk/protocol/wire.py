@@ -0,0 +1,348 @@
+"""
+Compact binary wire format for agent messages, artifacts and sandbox results.
+
+The encoding is MessagePack (nil, bool, int, float64, str, bin, array, map
+and the timestamp extension), written by a small pure-Python codec so any
+msgpack library can read it. Compared with ``json.dumps(model.dict())`` it
+skips string escaping and carries raw bytes as-is instead of text.
+
+Large payloads are never concatenated into a frame buffer: ``encode_parts``
+returns the frame as a list of chunks in which every str/bytes value of at
+least ``ZERO_COPY_THRESHOLD`` bytes is its own chunk, ready for
+``writelines``/``sendmsg``. Decoding works on a ``memoryview`` of the input;
+bin values come back as memoryview slices of it unless ``copy=True``.
+Naive datetimes are taken as UTC (``datetime.utcnow`` is used throughout the
+SDK) and decoded as naive UTC datetimes.
+"""
+
+import struct
+from datetime import datetime, timezone
+from typing import Any, List, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+Buffer = Union[bytes, bytearray, memoryview]
+M = TypeVar("M", bound=BaseModel)
+
+ZERO_COPY_THRESHOLD = 64 * 1024
+TIMESTAMP_EXT = -1
+
+_EPOCH = datetime(1970, 1, 1)
+_u16 = struct.Struct(">H")
+_u32 = struct.Struct(">I")
+_u64 = struct.Struct(">Q")
+_i8 = struct.Struct(">b")
+_i16 = struct.Struct(">h")
+_i32 = struct.Struct(">i")
+_i64 = struct.Struct(">q")
+_f64 = struct.Struct(">d")
+_ts96 = struct.Struct(">Iq")
+
+
+class WireFormatError(ValueError):
+    """Raised when a frame is truncated or uses an unsupported type."""
+
+
+class _Encoder:
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.parts: List[Buffer] = []
+        self.out = bytearray()
+
+    def payload(self, data: Buffer) -> None:
+        if len(data) >= self.threshold:
+            # Keep large payloads as their own chunk instead of copying them
+            if self.out:
+                self.parts.append(self.out)
+                self.out = bytearray()
+            self.parts.append(data)
+        else:
+            self.out += data
+
+    def finish(self) -> List[Buffer]:
+        if self.out or not self.parts:
+            self.parts.append(self.out)
+        return self.parts
+
+    def pack(self, obj: Any) -> None:
+        out = self.out
+        if obj is None:
+            out.append(0xC0)
+        elif obj is True:
+            out.append(0xC3)
+        elif obj is False:
+            out.append(0xC2)
+        elif isinstance(obj, int):
+            self._int(obj)
+        elif isinstance(obj, float):
+            out.append(0xCB)
+            out += _f64.pack(obj)
+        elif isinstance(obj, str):
+            data = obj.encode("utf-8")
+            n = len(data)
+            if n < 32:
+                out.append(0xA0 | n)
+            elif n < 0x100:
+                out.append(0xD9)
+                out.append(n)
+            elif n < 0x10000:
+                out.append(0xDA)
+                out += _u16.pack(n)
+            else:
+                out.append(0xDB)
+                out += _u32.pack(n)
+            self.payload(data)
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            raw: Buffer = obj.cast("B") if isinstance(obj, memoryview) else obj
+            n = len(raw)
+            if n < 0x100:
+                out += bytes((0xC4, n))
+            elif n < 0x10000:
+                out.append(0xC5)
+                out += _u16.pack(n)
+            else:
+                out.append(0xC6)
+                out += _u32.pack(n)
+            self.payload(raw)
+        elif isinstance(obj, dict):
+            self._header(len(obj), 0x80, 0xDE, 0xDF)
+            for key, value in obj.items():
+                self.pack(key)
+                self.pack(value)
+        elif isinstance(obj, (list, tuple)):
+            self._header(len(obj), 0x90, 0xDC, 0xDD)
+            for item in obj:
+                self.pack(item)
+        elif isinstance(obj, datetime):
+            if obj.tzinfo is not None:
+                obj = obj.astimezone(timezone.utc).replace(tzinfo=None)
+            delta = obj - _EPOCH
+            seconds = delta.days * 86400 + delta.seconds
+            out += b"\xc7\x0c\xff"
+            out += _ts96.pack(delta.microseconds * 1000, seconds)
+        elif isinstance(obj, BaseModel):
+            self.pack(obj.model_dump())
+        else:
+            raise WireFormatError(f"Cannot encode {type(obj).__name__}")
+
+    def _header(self, n: int, fix: int, code16: int, code32: int) -> None:
+        out = self.out
+        if n < 16:
+            out.append(fix | n)
+        elif n < 0x10000:
+            out.append(code16)
+            out += _u16.pack(n)
+        else:
+            out.append(code32)
+            out += _u32.pack(n)
+
+    def _int(self, n: int) -> None:
+        out = self.out
+        if 0 <= n < 0x80:
+            out.append(n)
+        elif -32 <= n < 0:
+            out.append(n & 0xFF)
+        elif n >= 0:
+            if n < 0x100:
+                out += bytes((0xCC, n))
+            elif n < 0x10000:
+                out.append(0xCD)
+                out += _u16.pack(n)
+            elif n < 0x100000000:
+                out.append(0xCE)
+                out += _u32.pack(n)
+            elif n < 0x10000000000000000:
+                out.append(0xCF)
+                out += _u64.pack(n)
+            else:
+                raise WireFormatError(f"Integer out of range: {n}")
+        elif n >= -0x80:
+            out.append(0xD0)
+            out += _i8.pack(n)
+        elif n >= -0x8000:
+            out.append(0xD1)
+            out += _i16.pack(n)
+        elif n >= -0x80000000:
+            out.append(0xD2)
+            out += _i32.pack(n)
+        elif n >= -0x8000000000000000:
+            out.append(0xD3)
+            out += _i64.pack(n)
+        else:
+            raise WireFormatError(f"Integer out of range: {n}")
+
+
+class _Decoder:
+    def __init__(self, data: Buffer, copy: bool):
+        self.view = memoryview(data).cast("B")
+        # Small values are sliced from bytes (a cheap copy); bin values and
+        # large strings are read through the memoryview
+        self.data: Buffer = data if isinstance(data, bytes) else self.view
+        self.size = len(self.view)
+        self.pos = 0
+        self.copy = copy
+
+    def take(self, n: int) -> memoryview:
+        start = self.pos
+        end = start + n
+        if end > self.size:
+            raise WireFormatError("Truncated frame")
+        self.pos = end
+        return self.view[start:end]
+
+    def text(self, n: int) -> str:
+        start = self.pos
+        end = start + n
+        if end > self.size:
+            raise WireFormatError("Truncated frame")
+        self.pos = end
+        if n < ZERO_COPY_THRESHOLD:
+            return str(self.data[start:end], "utf-8")
+        return str(self.view[start:end], "utf-8")
+
+    def unpack(self) -> Any:
+        pos = self.pos
+        if pos >= self.size:
+            raise WireFormatError("Truncated frame")
+        code = self.data[pos]
+        self.pos = pos + 1
+
+        # Most common first: fixint, fixstr, fixmap, fixarray
+        if code < 0x80:
+            return code
+        if code >= 0xA0:
+            if code < 0xC0:
+                return self.text(code & 0x1F)
+            if code >= 0xE0:
+                return code - 0x100
+        elif code < 0x90:
+            return self._map(code & 0x0F)
+        else:
+            return [self.unpack() for _ in range(code & 0x0F)]
+
+        if code == 0xC0:
+            return None
+        if code == 0xC2:
+            return False
+        if code == 0xC3:
+            return True
+        if code == 0xCB:
+            return _f64.unpack(self.take(8))[0]
+        if code == 0xCA:
+            return struct.unpack(">f", self.take(4))[0]
+        if code in (0xD9, 0xDA, 0xDB):
+            return self.text(self._length(code - 0xD9))
+        if code in (0xC4, 0xC5, 0xC6):
+            data = self.take(self._length(code - 0xC4))
+            return bytes(data) if self.copy else data
+        if code in (0xDC, 0xDD):
+            return [self.unpack() for _ in range(self._length(code - 0xDC + 1))]
+        if code in (0xDE, 0xDF):
+            return self._map(self._length(code - 0xDE + 1))
+        if 0xCC <= code <= 0xCF:
+            return int.from_bytes(self.take(1 << (code - 0xCC)), "big")
+        if 0xD0 <= code <= 0xD3:
+            return int.from_bytes(self.take(1 << (code - 0xD0)), "big", signed=True)
+        if code == 0xD6 or code == 0xD7 or code == 0xC7:
+            return self._ext(code)
+        raise WireFormatError(f"Unsupported type code 0x{code:02x}")
+
+    def _length(self, size_class: int) -> int:
+        # size_class 0/1/2 -> 1/2/4 byte big-endian length
+        return int.from_bytes(self.take(1 << size_class), "big")
+
+    def _map(self, n: int) -> dict:
+        result = {}
+        for _ in range(n):
+            key = self.unpack()
+            result[key] = self.unpack()
+        return result
+
+    def _ext(self, code: int) -> Any:
+        if code == 0xC7:
+            n = self.take(1)[0]
+        else:
+            n = 4 if code == 0xD6 else 8
+        ext_type = _i8.unpack(self.take(1))[0]
+        data = self.take(n)
+        if ext_type != TIMESTAMP_EXT:
+            raise WireFormatError(f"Unsupported extension type {ext_type}")
+        if n == 4:
+            nanoseconds, seconds = 0, _u32.unpack(data)[0]
+        elif n == 8:
+            value = _u64.unpack(data)[0]
+            nanoseconds, seconds = value >> 34, value & 0x3FFFFFFFF
+        elif n == 12:
+            nanoseconds, seconds = _ts96.unpack(data)
+        else:
+            raise WireFormatError(f"Bad timestamp length {n}")
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(
+            tzinfo=None, microsecond=nanoseconds // 1000
+        )
+
+
+def encode_parts(obj: Any, threshold: int = ZERO_COPY_THRESHOLD) -> List[Buffer]:
+    """
+    Encode ``obj`` as a list of chunks whose concatenation is the frame.
+
+    str/bytes values of ``threshold`` bytes or more are separate chunks
+    (bytes/memoryview values are the caller's own buffers, not copies).
+    """
+    encoder = _Encoder(threshold)
+    encoder.pack(obj)
+    return encoder.finish()
+
+
+def encode(obj: Any) -> bytes:
+    """Encode ``obj`` (dicts, lists, scalars, datetimes, pydantic models)."""
+    return b"".join(encode_parts(obj))
+
+
+def decode(data: Buffer, copy: bool = False) -> Any:
+    """
+    Decode one frame.
+
+    bin values are memoryview slices of ``data`` (valid while it is) unless
+    ``copy`` is set.
+    """
+    decoder = _Decoder(data, copy)
+    value = decoder.unpack()
+    if decoder.pos != decoder.size:
+        raise WireFormatError("Trailing bytes after frame")
+    return value
+
+
+def encode_model(model: BaseModel) -> bytes:
+    """Encode an ``AgentMessage``, ``Artifact``, ``ExecutionResult``, ..."""
+    return encode(model.model_dump())
+
+
+def decode_model(cls: Type[M], data: Buffer, validate: bool = True) -> M:
+    """
+    Decode a frame written by ``encode_model`` into ``cls``.
+
+    ``validate=False`` builds the model without validation, for frames this
+    process or a trusted peer wrote.
+    """
+    fields = decode(data)
+    if validate:
+        return cls.model_validate(fields)
+    return _construct(cls, fields)
+
+
+def _construct(cls: Type[M], fields: dict) -> M:
+    # model_construct does not recurse into nested models, so rebuild
+    # list-of-model fields (e.g. AgentMessage.artifacts) explicitly
+    values = dict(fields)
+    for name, info in cls.model_fields.items():
+        value = values.get(name)
+        args = getattr(info.annotation, "__args__", ())
+        if isinstance(value, list) and args and _is_model(args[0]):
+            values[name] = [_construct(args[0], item) for item in value]
+        elif isinstance(value, dict) and _is_model(info.annotation):
+            values[name] = _construct(info.annotation, value)  # type: ignore[arg-type]
+    return cls.model_construct(**values)
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
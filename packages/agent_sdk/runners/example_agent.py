@@ -2,10 +2,12 @@
 Example agent implementation demonstrating the Agent SDK usage.
 """
 
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
-from ..contracts import AgentBase, AgentContext
+from ..artifacts.blob_store import BlobStore
+from ..contracts import AgentBase, AgentContext, AgentUpdate, final_result
 from ..memory.store import AgentMemoryStore
 from ..protocol.messages import AgentMessage, Artifact
 from ..sandbox.executor import SandboxExecutor
@@ -35,10 +37,18 @@ class ExampleToolExecutor(ToolExecutor):
 class ExampleAgent(AgentBase):
     """Example agent that demonstrates basic functionality."""
 
-    def __init__(self, memory_store: AgentMemoryStore, sandbox: SandboxExecutor):
+    def __init__(
+        self,
+        memory_store: AgentMemoryStore,
+        sandbox: SandboxExecutor,
+        artifact_store: Optional[BlobStore] = None,
+        tool_settings: Optional[Dict[str, Any]] = None,
+    ):
         self.memory_store = memory_store
         self.sandbox = sandbox
-        self.tool_registry = ToolRegistry()
+        self.artifact_store = artifact_store
+        # ToolRegistry keyword arguments (validation mode, ...) from agents.tools
+        self.tool_registry = ToolRegistry(**(tool_settings or {}))
         self._setup_tools()
 
     def _setup_tools(self):
@@ -84,6 +94,7 @@ class ExampleAgent(AgentBase):
                 },
             },
             capabilities=["math", "calculation"],
+            pure=True,
         )
 
         # Register time tool
@@ -119,6 +130,12 @@ class ExampleAgent(AgentBase):
 
     async def execute(self, ctx: AgentContext) -> Dict[str, Any]:
         """Execute the agent with the given context."""
+        return await final_result(self.execute_stream(ctx))
+
+    async def execute_stream(
+        self, ctx: AgentContext
+    ) -> AsyncGenerator[AgentUpdate, None]:
+        """Execute the agent, yielding its intent and artifacts as they are ready."""
         task = ctx.task
         task_id = task.get("id", "unknown")
         agent_id = self.get_name()
@@ -131,6 +148,8 @@ class ExampleAgent(AgentBase):
             agent_id=agent_id,
             task_id=task_id,
         )
+        # Announce the intent before doing any work
+        yield message.model_copy()
 
         try:
             # Process the task based on its type
@@ -146,6 +165,7 @@ class ExampleAgent(AgentBase):
                         metadata=artifact_data.get("metadata", {}),
                     )
                     message.artifacts.append(artifact)
+                    yield artifact
 
             # Store interaction in memory
             await self.memory_store.store_interaction(
@@ -155,7 +175,7 @@ class ExampleAgent(AgentBase):
             # Update message with results
             message.next_actions = result.get("next_actions", [])
 
-            return {"status": "success", "message": message.dict(), "result": result}
+            yield {"status": "success", "message": message.dict(), "result": result}
 
         except Exception as e:
             error_result = {
@@ -172,7 +192,7 @@ class ExampleAgent(AgentBase):
                 result=error_result,
             )
 
-            return error_result
+            yield error_result
 
     async def _process_task(
         self, task: Dict[str, Any], ctx: AgentContext
@@ -224,29 +244,51 @@ class ExampleAgent(AgentBase):
             code=code, language=language, timeout=timeout
         )
 
+        stdout, stdout_ref = await self._offload(execution_result.stdout)
+        stderr, stderr_ref = await self._offload(execution_result.stderr)
+
         artifacts = []
         if execution_result.stdout:
             artifacts.append(
                 {
                     "kind": "output",
-                    "ref": f"stdout_{datetime.utcnow().timestamp()}",
+                    "ref": stdout_ref or f"stdout_{datetime.utcnow().timestamp()}",
                     "summary": f"Code output ({language})",
                     "metadata": {
                         "language": language,
                         "execution_time": execution_result.execution_time,
                         "exit_code": execution_result.exit_code,
+                        "size": len(execution_result.stdout),
                     },
                 }
             )
 
-        return {
-            "output": execution_result.stdout,
-            "error": execution_result.stderr,
+        result = {
+            "output": stdout,
+            "error": stderr,
             "exit_code": execution_result.exit_code,
             "execution_time": execution_result.execution_time,
             "artifacts": artifacts,
             "next_actions": ["Code execution completed"],
         }
+        # Outputs over the artifact store's inline limit are truncated here and
+        # kept in full in the store
+        if stdout_ref:
+            result["output_ref"] = stdout_ref
+        if stderr_ref:
+            result["error_ref"] = stderr_ref
+        return result
+
+    async def _offload(self, text: str) -> Tuple[str, Optional[str]]:
+        """Store ``text`` as a blob if it is too large to inline; (preview, ref)."""
+        store = self.artifact_store
+        if store is None:
+            return text, None
+        data = text.encode("utf-8")
+        if len(data) <= store.inline_limit:
+            return text, None
+        ref = await asyncio.to_thread(store.put, data)
+        return text[: store.inline_limit], ref
 
     async def _handle_time_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Handle time task."""
@@ -0,0 +1,523 @@
+"""
+Agents hosted in a pool of worker processes.
+
+Agent code runs in the orchestrator's event loop, so CPU-bound work (diff
+parsing, AST analysis, ...) stalls every other request. ``WorkerPool`` runs
+``size`` worker processes (``python -m agent_sdk.runners.worker_pool``),
+each of which builds agents from their manifest's factory on first use and
+runs them in its own event loop. ``PooledAgent`` is the orchestrator-side
+stand-in: it sends a task to the least busy worker and relays the agent's
+streamed increments and result back.
+
+Frames on a worker's stdin/stdout are a 4-byte big-endian length followed by
+a ``protocol.wire`` (MessagePack) map. The worker moves its stdout aside for
+frames and points fd 1 at stderr, so ``print`` in agent code cannot corrupt
+the stream. Pings are answered by the worker's reader thread, so a worker
+busy in CPU-bound code still passes health checks. A worker that exits or
+misses a ping is killed and restarted, and requests in flight on it fail
+with ``WorkerCrashedError`` (agent runs are not assumed to be idempotent).
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from ..contracts import AgentBase, AgentContext, AgentUpdate, final_result
+from ..discovery import AgentManifest, LazyAgent, import_target
+from ..protocol.messages import AgentMessage, Artifact
+from ..protocol.wire import decode, encode_parts
+
+log = logging.getLogger("kyros.workers")
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# (module:attr of a factory, keyword arguments); built once per worker
+ProviderSpec = Tuple[str, Dict[str, Any]]
+
+# Reply kinds that end a request
+_FINAL = ("result", "error", "crashed", "pong")
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for requests in flight on a worker that exited or hung."""
+
+
+@dataclass
+class WorkerStats:
+    """Counters for one worker slot (across restarts)."""
+
+    slot: int
+    pid: Optional[int] = None
+    alive: bool = False
+    in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    restarts: int = 0
+    last_ping_ms: Optional[float] = None
+
+
+def _frame(message: Dict[str, Any]) -> List[Any]:
+    parts = encode_parts(message)
+    return [_LENGTH.pack(sum(len(part) for part in parts)), *parts]
+
+
+class _Worker:
+    def __init__(self, slot: int, on_exit: Callable[["_Worker"], None]):
+        self.stats = WorkerStats(slot=slot)
+        self.ready = asyncio.Event()
+        self.restarting = False
+        self._on_exit = on_exit
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._pending: Dict[int, "asyncio.Queue[Dict[str, Any]]"] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self, providers: Dict[str, ProviderSpec]) -> None:
+        # Workers import plugin factories from the same paths as this process
+        path = [entry or os.getcwd() for entry in sys.path]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(path)}
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "agent_sdk.runners.worker_pool",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=env,
+        )
+        self.stats.pid = self._process.pid
+        self.stats.alive = True
+        self._reader = asyncio.create_task(self._read(self._process))
+        self._send(next(self._ids), {"op": "init", "providers": providers})
+        self.ready.set()
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Close stdin (the worker exits when it sees EOF), then kill if needed."""
+        self.ready.clear()
+        process = self._process
+        if process is None:
+            return
+        if process.returncode is None:
+            assert process.stdin is not None
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        if self._reader is not None:
+            await self._reader
+
+    async def kill(self) -> None:
+        self.ready.clear()
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        if self._reader is not None:
+            await self._reader
+
+    async def _read(self, process: asyncio.subprocess.Process) -> None:
+        stdout = process.stdout
+        assert stdout is not None
+        reason = f"worker {process.pid} exited"
+        try:
+            while True:
+                (size,) = _LENGTH.unpack(await stdout.readexactly(_LENGTH.size))
+                if size > MAX_FRAME_BYTES:
+                    raise ValueError(f"Frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+                reply = decode(await stdout.readexactly(size), copy=True)
+                queue = self._pending.get(reply.get("id", 0))
+                if queue is not None:
+                    queue.put_nowait(reply)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            # Corrupt stream: nothing after this frame can be trusted
+            reason = f"worker {process.pid} sent a bad frame: {e}"
+        finally:
+            self.ready.clear()
+            self.stats.alive = False
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        for queue in self._pending.values():
+            queue.put_nowait({"kind": "crashed", "error": reason})
+        self._on_exit(self)
+
+    def _send(self, request_id: int, message: Dict[str, Any]) -> None:
+        assert self._process is not None and self._process.stdin is not None
+        self._process.stdin.writelines(_frame({**message, "id": request_id}))
+
+    async def request(
+        self, message: Dict[str, Any]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Send a request and yield its replies, ending with a final one."""
+        if not self.alive:
+            raise WorkerCrashedError(f"worker {self.stats.pid} is not running")
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        request_id = next(self._ids)
+        self._pending[request_id] = queue
+        self._send(request_id, message)
+        finished = False
+        try:
+            assert self._process is not None and self._process.stdin is not None
+            await self._process.stdin.drain()
+            while not finished:
+                reply = await queue.get()
+                finished = reply["kind"] in _FINAL
+                yield reply
+        except ConnectionError as e:
+            raise WorkerCrashedError(str(e)) from e
+        finally:
+            self._pending.pop(request_id, None)
+            if not finished and self.alive:
+                # Abandoned mid-run: stop the agent rather than let it finish
+                self._send(next(self._ids), {"op": "cancel", "target": request_id})
+
+    async def ping(self) -> float:
+        """Round trip to the worker's reader thread, in milliseconds."""
+        started = time.perf_counter()
+        async with aclosing(self.request({"op": "ping"})) as replies:
+            async for reply in replies:
+                if reply["kind"] != "pong":
+                    raise WorkerCrashedError(reply.get("error", "no pong"))
+        self.stats.last_ping_ms = (time.perf_counter() - started) * 1000
+        return self.stats.last_ping_ms
+
+
+class WorkerPool:
+    """
+    Pool of agent worker processes, started on first use.
+
+    ``providers`` maps dependency names (``memory_store``, ``sandbox``, ...)
+    to ``(module:attr, kwargs)`` specs; each worker builds the ones its agents'
+    factories accept, since live objects cannot cross the process boundary.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        providers: Optional[Dict[str, ProviderSpec]] = None,
+        ping_interval: float = 5.0,
+        ping_timeout: float = 10.0,
+        restart_delay: float = 0.5,
+    ):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.providers = providers or {}
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.restart_delay = restart_delay
+        self._workers: List[_Worker] = []
+        self._monitor: Optional["asyncio.Task[None]"] = None
+        self._restarts: Dict[int, "asyncio.Task[None]"] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._workers:
+                return
+            workers = [_Worker(slot, self._worker_exited) for slot in range(self.size)]
+            await asyncio.gather(*(w.start(self.providers) for w in workers))
+            self._workers = workers
+            self._monitor = asyncio.create_task(self._watch())
+            log.info(
+                json.dumps(
+                    {
+                        "event": "agent_workers_started",
+                        "pids": [w.stats.pid for w in workers],
+                    }
+                )
+            )
+
+    async def execute_stream(
+        self, manifest: AgentManifest, ctx: AgentContext
+    ) -> AsyncGenerator[AgentUpdate, None]:
+        """Run ``manifest``'s agent on the least busy worker, relaying updates."""
+        await self.start()
+        worker = await self._pick()
+        stats = worker.stats
+        stats.in_flight += 1
+        ok = False
+        try:
+            request = {
+                "op": "execute",
+                "agent": manifest.model_dump(),
+                "ctx": ctx.model_dump(),
+            }
+            async with aclosing(worker.request(request)) as replies:
+                async for reply in replies:
+                    kind = reply["kind"]
+                    if kind == "message":
+                        yield AgentMessage.model_validate(reply["update"])
+                    elif kind == "artifact":
+                        yield Artifact.model_validate(reply["update"])
+                    elif kind == "result":
+                        ok = True
+                        yield reply["result"]
+                    elif kind == "crashed":
+                        raise WorkerCrashedError(reply["error"])
+                    else:
+                        raise RuntimeError(reply.get("error", f"Unexpected {kind}"))
+        finally:
+            stats.in_flight -= 1
+            if ok:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+
+    async def _pick(self) -> _Worker:
+        while True:
+            ready = [w for w in self._workers if w.ready.is_set()]
+            if ready:
+                return min(ready, key=lambda w: w.stats.in_flight)
+            if self._closing:
+                raise WorkerCrashedError("Worker pool is closed")
+            # Every worker is restarting; wait for the first to come back
+            waits = [asyncio.create_task(w.ready.wait()) for w in self._workers]
+            try:
+                await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for wait in waits:
+                    wait.cancel()
+
+    def _worker_exited(self, worker: _Worker) -> None:
+        if not self._closing:
+            self._schedule_restart(worker, "exited")
+
+    def _schedule_restart(self, worker: _Worker, reason: str) -> None:
+        if worker.restarting or self._closing:
+            return
+        worker.restarting = True
+        slot = worker.stats.slot
+        self._restarts[slot] = asyncio.create_task(self._restart(worker, reason))
+
+    async def _restart(self, worker: _Worker, reason: str) -> None:
+        try:
+            log.warning(
+                json.dumps(
+                    {
+                        "event": "agent_worker_restart",
+                        "slot": worker.stats.slot,
+                        "pid": worker.stats.pid,
+                        "reason": reason,
+                    }
+                )
+            )
+            await worker.kill()
+            await asyncio.sleep(self.restart_delay)
+            if self._closing:
+                return
+            await worker.start(self.providers)
+            worker.stats.restarts += 1
+        except Exception as e:
+            # Left dead; the next health check schedules another attempt
+            log.error(
+                json.dumps(
+                    {
+                        "event": "agent_worker_restart_error",
+                        "slot": worker.stats.slot,
+                        "error": str(e),
+                    }
+                )
+            )
+        finally:
+            worker.restarting = False
+            self._restarts.pop(worker.stats.slot, None)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await asyncio.gather(*(self._check(w) for w in self._workers))
+
+    async def _check(self, worker: _Worker) -> None:
+        if worker.restarting:
+            return
+        if not worker.alive:
+            self._schedule_restart(worker, "not running")
+            return
+        try:
+            await asyncio.wait_for(worker.ping(), self.ping_timeout)
+        except (asyncio.TimeoutError, WorkerCrashedError):
+            self._schedule_restart(worker, "missed ping")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-worker pid, load, completion and restart counters."""
+        return [asdict(w.stats) for w in self._workers]
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+        restarts = list(self._restarts.values())
+        await asyncio.gather(*restarts, return_exceptions=True)
+        await asyncio.gather(*(w.stop() for w in self._workers))
+
+
+class PooledAgent(AgentBase):
+    """Agent stand-in that runs the agent ``manifest`` describes in a ``WorkerPool``."""
+
+    def __init__(self, pool: WorkerPool, manifest: AgentManifest):
+        self.pool = pool
+        self.manifest = manifest
+
+    def capabilities(self) -> List[str]:
+        return list(self.manifest.capabilities)
+
+    async def execute(self, ctx: AgentContext) -> Dict[str, Any]:
+        return await final_result(self.execute_stream(ctx))
+
+    def execute_stream(self, ctx: AgentContext) -> AsyncGenerator[AgentUpdate, None]:
+        return self.pool.execute_stream(self.manifest, ctx)
+
+    def get_name(self) -> str:
+        return self.manifest.name
+
+
+def manifest_for(agent: AgentBase) -> AgentManifest:
+    """Manifest to rebuild ``agent`` in a worker (from its class if it has none)."""
+    manifest = getattr(agent, "manifest", None)
+    if isinstance(manifest, AgentManifest):
+        return manifest
+    cls = type(agent)
+    return AgentManifest(
+        name=agent.get_name(),
+        capabilities=agent.capabilities(),
+        factory=f"{cls.__module__}:{cls.__qualname__}",
+    )
+
+
+# --- worker process side ---
+
+
+def _serve(requests: BinaryIO, replies: BinaryIO) -> None:
+    loop = asyncio.new_event_loop()
+    inbox: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    tasks: Dict[int, "asyncio.Task[None]"] = {}
+    write_lock = threading.Lock()
+
+    def send(message: Dict[str, Any]) -> None:
+        with write_lock:
+            replies.writelines(_frame(message))
+            replies.flush()
+
+    def read_requests() -> None:
+        # Runs on its own thread so pings are answered even while agent
+        # code holds the event loop
+        try:
+            while True:
+                header = requests.read(_LENGTH.size)
+                if len(header) < _LENGTH.size:
+                    break
+                (size,) = _LENGTH.unpack(header)
+                message = decode(requests.read(size), copy=True)
+                if message.get("op") == "ping":
+                    send({"id": message["id"], "kind": "pong", "in_flight": len(tasks)})
+                else:
+                    loop.call_soon_threadsafe(inbox.put_nowait, message)
+        finally:
+            loop.call_soon_threadsafe(inbox.put_nowait, None)
+
+    async def main() -> None:
+        agents: Dict[str, LazyAgent] = {}
+        built: Dict[str, Any] = {}
+        specs: Dict[str, ProviderSpec] = {}
+
+        def provider(name: str) -> Callable[[], Any]:
+            def provide() -> Any:
+                if name not in built:
+                    target, kwargs = specs[name]
+                    built[name] = import_target(target)(**kwargs)
+                return built[name]
+
+            return provide
+
+        async def run(agent: AgentBase, message: Dict[str, Any]) -> None:
+            try:
+                await _run(agent, message, send)
+            finally:
+                tasks.pop(message["id"], None)
+
+        threading.Thread(target=read_requests, daemon=True).start()
+        while (message := await inbox.get()) is not None:
+            op = message.get("op")
+            if op == "init":
+                specs.update(message.get("providers", {}))
+            elif op == "execute":
+                manifest = AgentManifest.model_validate(message["agent"])
+                agent = agents.get(manifest.factory)
+                if agent is None:
+                    providers = {name: provider(name) for name in specs}
+                    agent = agents[manifest.factory] = LazyAgent(manifest, providers)
+                tasks[message["id"]] = asyncio.create_task(run(agent, message))
+            elif op == "cancel":
+                running = tasks.get(message.get("target", 0))
+                if running is not None:
+                    running.cancel()
+        # stdin closed: the pool is shutting down (or the orchestrator died)
+        unfinished = list(tasks.values())
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+async def _run(
+    agent: AgentBase, message: Dict[str, Any], send: Callable[[Dict[str, Any]], None]
+) -> None:
+    request_id = message["id"]
+    try:
+        ctx = AgentContext.model_validate(message["ctx"])
+        result: Optional[Dict[str, Any]] = None
+        async with aclosing(agent.execute_stream(ctx)) as updates:
+            async for update in updates:
+                if isinstance(update, dict):
+                    result = update
+                    continue
+                kind = "message" if isinstance(update, AgentMessage) else "artifact"
+                send({"id": request_id, "kind": kind, "update": update.model_dump()})
+        if result is None:
+            raise RuntimeError("Agent stream ended without a result")
+        send({"id": request_id, "kind": "result", "result": result})
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        send({"id": request_id, "kind": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def worker_main() -> None:
+    """Entry point of a worker process: serve frames on stdin/stdout until EOF."""
+    replies = os.fdopen(os.dup(1), "wb")
+    # Anything agent code prints goes to stderr instead of the frame stream
+    os.dup2(2, 1)
+    _serve(sys.stdin.buffer, replies)
+
+
+if __name__ == "__main__":
+    worker_main()
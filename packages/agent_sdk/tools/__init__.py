@@ -1,5 +1,26 @@
 """Tool system for agent capabilities."""
 
-from .protocol import ToolExecutor, ToolRegistry, ToolSchema
+from .cache import ToolCacheStats, ToolResultCache, tool_run
+from .protocol import (
+    ToolCall,
+    ToolCallResult,
+    ToolExecutor,
+    ToolRegistry,
+    ToolSchema,
+    ToolTimeoutError,
+)
+from .validation import ToolValidationError, compile_schema
 
-__all__ = ["ToolRegistry", "ToolSchema", "ToolExecutor"]
+__all__ = [
+    "ToolRegistry",
+    "ToolSchema",
+    "ToolExecutor",
+    "ToolCall",
+    "ToolCallResult",
+    "ToolTimeoutError",
+    "ToolResultCache",
+    "ToolCacheStats",
+    "tool_run",
+    "ToolValidationError",
+    "compile_schema",
+]
@@ -0,0 +1,136 @@
+"""
+Memoization of results from pure or cacheable tools.
+
+Keys are the tool name, the run (for run-scoped tools) and the canonical
+JSON of the parameters, so ``{"a": 1, "b": 2}`` and ``{"b": 2, "a": 1}`` hit
+the same entry. The current run comes from ``tool_run``, a context variable
+set around an agent's execution, so tools called deep inside an agent are
+scoped without passing a run id through every call.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+CACHE_SCOPES = ("global", "run")
+
+# (tool name, run id or None, canonical parameters)
+CacheKey = Tuple[str, Optional[str], str]
+
+current_run: ContextVar[Optional[str]] = ContextVar("tool_run", default=None)
+
+
+@contextmanager
+def tool_run(run_id: str) -> Iterator[None]:
+    """Scope run-scoped tool caching to ``run_id`` for the enclosed calls."""
+    token = current_run.set(run_id)
+    try:
+        yield
+    finally:
+        current_run.reset(token)
+
+
+def cache_key(
+    name: str, parameters: Dict[str, Any], run_id: Optional[str]
+) -> Optional[CacheKey]:
+    """Key for a call, or None when the parameters are not JSON-serializable."""
+    try:
+        canonical = json.dumps(parameters, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+    return (name, run_id, canonical)
+
+
+_Entry = Tuple[Optional[float], Dict[str, Any]]
+
+
+@dataclass
+class ToolCacheStats:
+    """Counters for the tool result cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+    max_entries: int = 0
+    hit_rate: float = 0.0
+
+
+class ToolResultCache:
+    """
+    Entry-bounded LRU cache of tool results with optional per-entry TTL.
+
+    Cached results are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (expires_at or None, result)
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return result
+            del self._entries[key]
+            self._expirations += 1
+        self._misses += 1
+        return None
+
+    def put(
+        self, key: CacheKey, result: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(
+        self, name: Optional[str] = None, run_id: Optional[str] = None
+    ) -> int:
+        """Drop entries for a tool and/or a run (everything if neither given)."""
+        if name is None and run_id is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        stale = [
+            key
+            for key in self._entries
+            if (name is None or key[0] == name) and (run_id is None or key[1] == run_id)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> ToolCacheStats:
+        lookups = self._hits + self._misses
+        return ToolCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+            entries=len(self._entries),
+            max_entries=self.max_entries,
+            hit_rate=self._hits / lookups if lookups else 0.0,
+        )
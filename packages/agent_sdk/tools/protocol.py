@@ -1,8 +1,17 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Union
 
 from pydantic import BaseModel, Field
 
+from .cache import CACHE_SCOPES, ToolResultCache, cache_key, current_run
+from .validation import ToolValidationError, compile_schema
+
+VALIDATION_MODES = ("strict", "off")
+
 
 class ToolExample(BaseModel):
     """Example of tool usage with input and expected output."""
@@ -25,6 +34,56 @@ class ToolSchema(BaseModel):
     capabilities: List[str] = Field(
         default_factory=list, description="Required capabilities"
     )
+    timeout_seconds: Optional[float] = Field(
+        default=None, description="Per-call timeout, excluding time queued"
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None, description="Maximum concurrent calls of this tool"
+    )
+    pure: bool = Field(
+        default=False, description="Deterministic and side-effect free; memoized"
+    )
+    cache_ttl_seconds: Optional[float] = Field(
+        default=None, description="Memoize results for this long (any tool)"
+    )
+    cache_scope: str = Field(
+        default="global", description="global, or run to share results per run"
+    )
+
+
+class ToolCall(BaseModel):
+    """One call in a batch passed to ``ToolRegistry.execute_tools``."""
+
+    name: str = Field(..., description="Tool name")
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict, description="Tool parameters"
+    )
+
+
+class ToolCallResult(BaseModel):
+    """Outcome of one call in a batch; failures are reported, not raised."""
+
+    name: str = Field(..., description="Tool name")
+    status: str = Field(..., description="ok, error or timeout")
+    result: Optional[Dict[str, Any]] = Field(
+        default=None, description="Tool output when status is ok"
+    )
+    error: Optional[str] = Field(default=None, description="Failure message")
+    error_type: Optional[str] = Field(default=None, description="Exception class")
+    duration_ms: float = Field(default=0.0, description="Time including queueing")
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool call runs longer than its ``timeout_seconds``."""
+
+    def __init__(self, tool: str, timeout: float):
+        super().__init__(f"Tool {tool} timed out after {timeout}s")
+        self.tool = tool
+        self.timeout = timeout
 
 
 class ToolExecutor(ABC):
@@ -39,15 +98,80 @@ class ToolExecutor(ABC):
 class ToolRegistry:
     """Registry for managing tools and their execution."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        discover_cache_size: int = 1024,
+        validation: str = "strict",
+        executor_concurrency: Optional[int] = None,
+        cache_size: int = 1024,
+    ):
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"validation must be one of {VALIDATION_MODES}")
+        self.validation = validation
+        self.executor_concurrency = executor_concurrency
         self._tools: Dict[str, ToolSchema] = {}
         self._executors: Dict[str, ToolExecutor] = {}
+        # Concurrency limits: per tool from ToolSchema.max_concurrency, and
+        # per executor instance (shared by every tool it serves)
+        self._tool_slots: Dict[str, asyncio.Semaphore] = {}
+        self._executor_slots: Dict[int, asyncio.Semaphore] = {}
+        # Results of pure/cacheable tools
+        self.cache = ToolResultCache(cache_size)
+        # Parameter validators, compiled at register time in strict mode
+        self._validators: Dict[str, Callable[[Any], List[str]]] = {}
+        # capability -> names of tools requiring it; tools requiring nothing
+        # match every query and are kept separately
+        self._by_capability: Dict[str, Set[str]] = {}
+        self._unrestricted: Set[str] = set()
+        self._required: Dict[str, int] = {}  # distinct capabilities per tool
+        self._order: Dict[str, int] = {}
+        self._discover_cache: "OrderedDict[FrozenSet[str], List[ToolSchema]]" = (
+            OrderedDict()
+        )
+        self._discover_cache_size = discover_cache_size
 
     def register(self, tool: ToolSchema, executor: Optional[ToolExecutor] = None):
         """Register a tool schema and optionally its executor."""
+        if tool.cache_scope not in CACHE_SCOPES:
+            raise ValueError(f"cache_scope must be one of {CACHE_SCOPES}")
+        # Compile before touching any state, so a bad schema leaves the
+        # registry (and a previously registered version) as it was
+        validator = (
+            compile_schema(tool.parameters) if self.validation == "strict" else None
+        )
+        if tool.name in self._tools:
+            self._unindex(self._tools[tool.name])
+            self.cache.invalidate(name=tool.name)
         self._tools[tool.name] = tool
+        self._order.setdefault(tool.name, len(self._order))
+        self._required[tool.name] = len(set(tool.capabilities))
+        if tool.capabilities:
+            for cap in set(tool.capabilities):
+                self._by_capability.setdefault(cap, set()).add(tool.name)
+        else:
+            self._unrestricted.add(tool.name)
+        self._discover_cache.clear()
+        if validator is not None:
+            self._validators[tool.name] = validator
+        if tool.max_concurrency:
+            self._tool_slots[tool.name] = asyncio.Semaphore(tool.max_concurrency)
+        else:
+            self._tool_slots.pop(tool.name, None)
         if executor:
             self._executors[tool.name] = executor
+            if self.executor_concurrency and id(executor) not in self._executor_slots:
+                self._executor_slots[id(executor)] = asyncio.Semaphore(
+                    self.executor_concurrency
+                )
+
+    def _unindex(self, tool: ToolSchema) -> None:
+        self._unrestricted.discard(tool.name)
+        for cap in set(tool.capabilities):
+            names = self._by_capability.get(cap)
+            if names is not None:
+                names.discard(tool.name)
+                if not names:
+                    del self._by_capability[cap]
 
     def get(self, name: str) -> Optional[ToolSchema]:
         """Get tool schema by name."""
@@ -58,17 +182,34 @@ class ToolRegistry:
         return self._executors.get(name)
 
     def discover(self, capabilities: List[str]) -> List[ToolSchema]:
-        """Discover tools that match given capabilities."""
+        """Discover tools whose required capabilities are all in ``capabilities``."""
         if not capabilities:
             return list(self._tools.values())
 
-        matching_tools = []
-        for tool in self._tools.values():
-            if not tool.capabilities or all(
-                cap in capabilities for cap in tool.capabilities
-            ):
-                matching_tools.append(tool)
-        return matching_tools
+        key = frozenset(capabilities)
+        cached = self._discover_cache.get(key)
+        if cached is not None:
+            self._discover_cache.move_to_end(key)
+            return list(cached)
+
+        # Count, per tool, how many of its required capabilities were offered;
+        # only tools requiring one of the offered capabilities are touched
+        offered: Dict[str, int] = {}
+        for cap in key:
+            for name in self._by_capability.get(cap, ()):
+                offered[name] = offered.get(name, 0) + 1
+        names = set(self._unrestricted)
+        names.update(
+            name for name, count in offered.items() if count == self._required[name]
+        )
+        matching_tools = [
+            self._tools[name] for name in sorted(names, key=self._order.__getitem__)
+        ]
+
+        self._discover_cache[key] = matching_tools
+        if len(self._discover_cache) > self._discover_cache_size:
+            self._discover_cache.popitem(last=False)
+        return list(matching_tools)
 
     def list_all(self) -> List[ToolSchema]:
         """List all registered tools."""
@@ -77,9 +218,115 @@ class ToolRegistry:
     async def execute_tool(
         self, name: str, parameters: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Execute a tool by name with parameters."""
+        """
+        Execute a tool by name with parameters.
+
+        Pure and cacheable tools are answered from the result cache when
+        possible; cached results are shared and must not be mutated.
+        Otherwise waits for a free slot under the tool's and its executor's
+        concurrency limits, then raises ``ToolTimeoutError`` if the call
+        itself exceeds the tool's ``timeout_seconds``.
+        """
         executor = self.get_executor(name)
         if not executor:
             raise ValueError(f"No executor found for tool: {name}")
 
-        return await executor.execute(name, parameters)
+        validator = self._validators.get(name)
+        if validator is not None:
+            errors = validator(parameters)
+            if errors:
+                raise ToolValidationError(name, errors)
+
+        tool = self._tools[name]
+        key = None
+        if tool.pure or tool.cache_ttl_seconds is not None:
+            # Run-scoped tools are only memoized inside a tool_run() scope
+            run_id = current_run.get() if tool.cache_scope == "run" else None
+            if tool.cache_scope == "global" or run_id is not None:
+                key = cache_key(name, parameters, run_id)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = await self._limited(executor, name, parameters)
+        if key is not None:
+            self.cache.put(key, result, tool.cache_ttl_seconds)
+        return result
+
+    async def _limited(
+        self, executor: ToolExecutor, name: str, parameters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        tool_slot = self._tool_slots.get(name)
+        executor_slot = self._executor_slots.get(id(executor))
+        if tool_slot is None and executor_slot is None:
+            return await self._run(executor, name, parameters)
+
+        # Take the narrower per-tool slot first so a call queued on its own
+        # tool's limit does not hold an executor slot other tools could use
+        if tool_slot is not None:
+            await tool_slot.acquire()
+        try:
+            if executor_slot is not None:
+                async with executor_slot:
+                    return await self._run(executor, name, parameters)
+            return await self._run(executor, name, parameters)
+        finally:
+            if tool_slot is not None:
+                tool_slot.release()
+
+    async def _run(
+        self, executor: ToolExecutor, name: str, parameters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        timeout = self._tools[name].timeout_seconds
+        if timeout is None:
+            return await executor.execute(name, parameters)
+        try:
+            async with asyncio.timeout(timeout):
+                return await executor.execute(name, parameters)
+        except TimeoutError as e:
+            raise ToolTimeoutError(name, timeout) from e
+
+    async def execute_tools(
+        self, calls: List[Union[ToolCall, Dict[str, Any]]]
+    ) -> List[ToolCallResult]:
+        """
+        Run independent tool calls concurrently.
+
+        Calls are dicts or ``ToolCall`` objects with ``name`` and
+        ``parameters``. Results come back in call order; a failing or timed
+        out call is reported in its ``ToolCallResult`` and does not cancel
+        the others.
+        """
+        parsed = [
+            call if isinstance(call, ToolCall) else ToolCall(**call) for call in calls
+        ]
+        return list(await asyncio.gather(*(self._call(call) for call in parsed)))
+
+    async def _call(self, call: ToolCall) -> ToolCallResult:
+        start = time.perf_counter()
+        try:
+            result = await self.execute_tool(call.name, call.parameters)
+            status, error, error_type = "ok", None, None
+        except Exception as e:
+            result = None
+            status = "timeout" if isinstance(e, ToolTimeoutError) else "error"
+            error, error_type = str(e), type(e).__name__
+        return ToolCallResult(
+            name=call.name,
+            status=status,
+            result=result,
+            error=error,
+            error_type=error_type,
+            duration_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss and size counters for the tool result cache."""
+        return asdict(self.cache.stats())
+
+    def clear_cache(self, run_id: Optional[str] = None) -> int:
+        """Drop memoized results for one run, or all of them; returns how many."""
+        if run_id is None:
+            return self.cache.invalidate()
+        return self.cache.invalidate(run_id=run_id)
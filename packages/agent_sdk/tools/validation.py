@@ -0,0 +1,332 @@
+"""
+Compile JSON-schema tool parameter definitions into validator functions.
+
+``compile_schema`` walks a schema once and returns a closure per node, so a
+call only runs the checks that schema actually has instead of interpreting
+the schema dict again. It covers the draft-07 keywords tool schemas use:
+type, enum, const, properties, required, additionalProperties, items,
+min/maxItems, uniqueItems, min/maxLength, pattern, minimum, maximum,
+exclusiveMinimum/Maximum, multipleOf, min/maxProperties, allOf, anyOf, oneOf
+and not. Other keywords (``$ref``, ``format``, ...) are ignored.
+
+enum, const and uniqueItems compare values as JSON does: booleans never equal
+numbers, and numbers compare by value (``1`` equals ``1.0``). multipleOf is
+decided on the decimal values as written, so ``0.3`` is a multiple of ``0.1``.
+"""
+
+import math
+import re
+from fractions import Fraction
+from typing import Any, Callable, Dict, Hashable, List
+
+# Paths are built as (parent, key) pairs and only formatted when reporting an
+# error, so valid calls never pay for string formatting
+Path = Any
+Check = Callable[[Any, Path, List[str]], None]
+
+
+def _fmt(path: Path) -> str:
+    keys = []
+    while isinstance(path, tuple):
+        path, key = path
+        keys.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "$" + "".join(reversed(keys))
+
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (
+        isinstance(v, int)
+        and not isinstance(v, bool)
+        or isinstance(v, float)
+        and v.is_integer()
+    ),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _json_key(value: Any) -> Hashable:
+    """Hashable key under which two values are equal exactly when JSON says so."""
+    if isinstance(value, bool):
+        return ("boolean", value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, list):
+        return ("array", tuple(_json_key(item) for item in value))
+    if isinstance(value, dict):
+        return (
+            "object",
+            frozenset((key, _json_key(item)) for key, item in value.items()),
+        )
+    return (type(value).__name__, value)
+
+
+def _decimal(value: Any) -> Fraction:
+    # str() gives the shortest repr, i.e. the decimal the JSON document held
+    return Fraction(str(value))
+
+
+class ToolValidationError(ValueError):
+    """Raised when tool parameters do not match the tool's parameter schema."""
+
+    def __init__(self, tool: str, errors: List[str]):
+        super().__init__(f"Invalid parameters for tool {tool}: " + "; ".join(errors))
+        self.tool = tool
+        self.errors = errors
+
+
+def _compile(schema: Any) -> Check:
+    if schema is True or schema == {}:
+        return lambda value, path, errors: None
+    if schema is False:
+        return lambda value, path, errors: errors.append(f"{_fmt(path)}: not allowed")
+    if not isinstance(schema, dict):
+        raise TypeError(f"Schema must be an object or boolean, got {schema!r}")
+
+    checks: List[Check] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        tests = [_TYPES[name] for name in names]
+        expected = " or ".join(names)
+
+        if len(tests) == 1:
+            test = tests[0]
+
+            def check_type(value: Any, path: Path, errors: List[str]) -> None:
+                if not test(value):
+                    errors.append(f"{_fmt(path)}: expected {expected}")
+
+        else:
+
+            def check_type(value: Any, path: Path, errors: List[str]) -> None:
+                if not any(test(value) for test in tests):
+                    errors.append(f"{_fmt(path)}: expected {expected}")
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        allowed_keys = {_json_key(item) for item in allowed}
+
+        def check_enum(value: Any, path: Path, errors: List[str]) -> None:
+            if _json_key(value) not in allowed_keys:
+                errors.append(f"{_fmt(path)}: must be one of {allowed}")
+
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const = schema["const"]
+        const_key = _json_key(const)
+
+        def check_const(value: Any, path: Path, errors: List[str]) -> None:
+            if _json_key(value) != const_key:
+                errors.append(f"{_fmt(path)}: must be {const!r}")
+
+        checks.append(check_const)
+
+    checks.extend(_compile_object(schema))
+    checks.extend(_compile_array(schema))
+    checks.extend(_compile_string(schema))
+    checks.extend(_compile_number(schema))
+    checks.extend(_compile_combinators(schema))
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any, path: Path, errors: List[str]) -> None:
+        for check in checks:
+            check(value, path, errors)
+
+    return check_all
+
+
+def _compile_object(schema: Dict[str, Any]) -> List[Check]:
+    checks: List[Check] = []
+    properties = {
+        name: _compile(sub) for name, sub in schema.get("properties", {}).items()
+    }
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    extra = None if additional is True else _compile(additional)
+    min_props = schema.get("minProperties")
+    max_props = schema.get("maxProperties")
+    if not (properties or required or extra or min_props or max_props is not None):
+        return checks
+
+    def check_object(value: Any, path: Path, errors: List[str]) -> None:
+        if not isinstance(value, dict):
+            return
+        for name in required:
+            if name not in value:
+                errors.append(f"{_fmt((path, name))}: required")
+        for name, item in value.items():
+            check = properties.get(name)
+            if check is not None:
+                check(item, (path, name), errors)
+            elif extra is not None:
+                extra(item, (path, name), errors)
+        if min_props is not None and len(value) < min_props:
+            errors.append(f"{_fmt(path)}: needs at least {min_props} properties")
+        if max_props is not None and len(value) > max_props:
+            errors.append(f"{_fmt(path)}: allows at most {max_props} properties")
+
+    checks.append(check_object)
+    return checks
+
+
+def _compile_array(schema: Dict[str, Any]) -> List[Check]:
+    checks: List[Check] = []
+    items = schema.get("items")
+    if isinstance(items, dict) or isinstance(items, bool):
+        check_item = _compile(items)
+
+        def check_items(value: Any, path: Path, errors: List[str]) -> None:
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    check_item(item, (path, i), errors)
+
+        checks.append(check_items)
+    elif isinstance(items, list):
+        tuple_checks = [_compile(sub) for sub in items]
+
+        def check_tuple(value: Any, path: Path, errors: List[str]) -> None:
+            if isinstance(value, list):
+                for i, (check, item) in enumerate(zip(tuple_checks, value)):
+                    check(item, (path, i), errors)
+
+        checks.append(check_tuple)
+
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    unique = schema.get("uniqueItems", False)
+    if min_items is not None or max_items is not None or unique:
+
+        def check_size(value: Any, path: Path, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{_fmt(path)}: needs at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{_fmt(path)}: allows at most {max_items} items")
+            if unique and len({_json_key(item) for item in value}) != len(value):
+                errors.append(f"{_fmt(path)}: items must be unique")
+
+        checks.append(check_size)
+    return checks
+
+
+def _compile_string(schema: Dict[str, Any]) -> List[Check]:
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    if min_length is None and max_length is None and pattern is None:
+        return []
+
+    def check_string(value: Any, path: Path, errors: List[str]) -> None:
+        if not isinstance(value, str):
+            return
+        if min_length is not None and len(value) < min_length:
+            errors.append(f"{_fmt(path)}: shorter than {min_length}")
+        if max_length is not None and len(value) > max_length:
+            errors.append(f"{_fmt(path)}: longer than {max_length}")
+        if pattern is not None and not pattern.search(value):
+            errors.append(f"{_fmt(path)}: does not match {pattern.pattern!r}")
+
+    return [check_string]
+
+
+def _compile_number(schema: Dict[str, Any]) -> List[Check]:
+    bounds = [
+        (schema.get("minimum"), lambda v, b: v >= b, "must be >="),
+        (schema.get("maximum"), lambda v, b: v <= b, "must be <="),
+        (schema.get("exclusiveMinimum"), lambda v, b: v > b, "must be >"),
+        (schema.get("exclusiveMaximum"), lambda v, b: v < b, "must be <"),
+    ]
+    active = [(bound, test, text) for bound, test, text in bounds if bound is not None]
+    multiple = schema.get("multipleOf")
+    if not active and multiple is None:
+        return []
+    divisor = _decimal(multiple) if multiple is not None else None
+
+    def check_number(value: Any, path: Path, errors: List[str]) -> None:
+        if not _TYPES["number"](value):
+            return
+        for bound, test, text in active:
+            if not test(value, bound):
+                errors.append(f"{_fmt(path)}: {text} {bound}")
+        if divisor is not None and not _is_multiple(value, divisor):
+            errors.append(f"{_fmt(path)}: must be a multiple of {multiple}")
+
+    return [check_number]
+
+
+def _is_multiple(value: Any, divisor: Fraction) -> bool:
+    if isinstance(value, int):
+        if divisor.denominator == 1:
+            return value % divisor.numerator == 0
+    elif not math.isfinite(value):
+        return False
+    return _decimal(value) % divisor == 0
+
+
+def _compile_combinators(schema: Dict[str, Any]) -> List[Check]:
+    checks: List[Check] = []
+    for sub in schema.get("allOf", []):
+        checks.append(_compile(sub))
+
+    for keyword in ("anyOf", "oneOf"):
+        if keyword not in schema:
+            continue
+        options = [_compile(sub) for sub in schema[keyword]]
+        exactly_one = keyword == "oneOf"
+
+        def check_options(
+            value: Any,
+            path: Path,
+            errors: List[str],
+            options: List[Check] = options,
+            exactly_one: bool = exactly_one,
+        ) -> None:
+            passed = 0
+            for option in options:
+                option_errors: List[str] = []
+                option(value, path, option_errors)
+                if not option_errors:
+                    passed += 1
+                    if not exactly_one:
+                        return
+            if passed == 0:
+                errors.append(f"{_fmt(path)}: matches none of the allowed schemas")
+            elif exactly_one and passed > 1:
+                errors.append(f"{_fmt(path)}: matches more than one schema")
+
+        checks.append(check_options)
+
+    if "not" in schema:
+        negated = _compile(schema["not"])
+
+        def check_not(value: Any, path: Path, errors: List[str]) -> None:
+            sub_errors: List[str] = []
+            negated(value, path, sub_errors)
+            if not sub_errors:
+                errors.append(f"{_fmt(path)}: must not match schema")
+
+        checks.append(check_not)
+    return checks
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """Compile ``schema`` once; the result returns the errors for a value."""
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        errors: List[str] = []
+        check(value, None, errors)
+        return errors
+
+    return validate
@@ -2,10 +2,24 @@ from abc import ABC, abstractmethod
 from typing import Iterable
 
 
+class ConcurrencyError(Exception):
+    """Raised when ``expected_version`` does not match the stream's version."""
+
+    def __init__(self, stream_id: str, expected: int, actual: int):
+        super().__init__(
+            f"Stream {stream_id!r} is at version {actual}, expected {expected}"
+        )
+        self.stream_id = stream_id
+        self.expected = expected
+        self.actual = actual
+
+
 class EventStore(ABC):
     @abstractmethod
     async def append(
         self, stream_id: str, events: list[dict], expected_version: int | None = None
     ): ...
     @abstractmethod
-    async def read(self, stream_id: str, from_version: int = 0) -> Iterable[dict]: ...
+    async def read(
+        self, stream_id: str, from_version: int = 0, limit: int | None = None
+    ) -> Iterable[dict]: ...
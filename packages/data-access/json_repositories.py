@@ -0,0 +1,255 @@
+"""
+Repositories over the JSON documents in ``collaboration/state``.
+
+Each document is a JSON array of records keyed by ``id`` (or ``lock_id``).
+``JsonDocument`` keeps the parsed records in memory and re-reads the file
+only when its inode, mtime or size changes, i.e. when another process has
+replaced it. Writes go to a temp file that is fsync'd and renamed over the
+original while holding an exclusive flock on ``<file>.lock``, so readers in
+any process see either the old or the new document, never a torn one.
+
+ETags are ``"<version>-<digest>"``: the version is the sum of the records'
+``version`` fields and the digest is the XOR of per-record SHA-256 hashes of
+their canonical JSON. Both are updated per changed record on write, so
+producing an ETag never rehashes the whole document.
+"""
+
+import asyncio
+import copy
+import fcntl
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from repositories import PreconditionFailedError, TaskRepository
+
+
+def canonical_json(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def record_digest(record: Dict[str, Any]) -> int:
+    return int.from_bytes(hashlib.sha256(canonical_json(record)).digest()[:16], "big")
+
+
+def format_etag(version: int, digest: int) -> str:
+    return f'"{version}-{digest:032x}"'
+
+
+class _Loaded(NamedTuple):
+    records: Dict[str, Dict[str, Any]]
+    digests: Dict[str, int]
+    version: int
+    digest: int
+    stamp: Optional[Tuple[int, int, int]]
+
+
+_EMPTY = _Loaded({}, {}, 0, 0, None)
+
+# Called under the file lock with the freshly loaded records; returns keys of
+# ``changes`` to leave out of the write.
+Veto = Callable[[Dict[str, Dict[str, Any]]], Set[str]]
+
+
+class JsonDocument:
+    """
+    In-memory view of one JSON array file with atomic, locked writes.
+
+    The parsed state is one immutable ``_Loaded`` tuple swapped in whole, so
+    readers on the event loop never observe a half-applied write made from
+    the writer thread.
+    """
+
+    def __init__(self, path: str, key: str = "id"):
+        self.path = path
+        self.key = key
+        self.lock_path = path + ".lock"
+        self._loaded = _EMPTY
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    # --- cache ---
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _state(self) -> _Loaded:
+        """The loaded document, re-read first if the file has been replaced."""
+        loaded = self._loaded
+        stamp = self._current_stamp()
+        if stamp == loaded.stamp and (stamp is not None or not loaded.records):
+            return loaded
+        records: List[Dict[str, Any]] = []
+        if stamp is not None:
+            with open(self.path, "rb") as f:
+                # Stat the handle we read, so a rename racing with us is seen next time
+                st = os.fstat(f.fileno())
+                stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+                records = json.loads(f.read() or b"[]")
+        by_key = {record[self.key]: record for record in records}
+        digests = {key: record_digest(record) for key, record in by_key.items()}
+        combined = 0
+        for digest in digests.values():
+            combined ^= digest
+        version = sum(record.get("version", 0) for record in by_key.values())
+        self._loaded = loaded = _Loaded(by_key, digests, version, combined, stamp)
+        self.reloads += 1
+        return loaded
+
+    def etag(self) -> str:
+        loaded = self._state()
+        return format_etag(loaded.version, loaded.digest)
+
+    def record_etag(self, key: str) -> Optional[str]:
+        return self._record_etag(self._state(), key)
+
+    @staticmethod
+    def _record_etag(loaded: _Loaded, key: str) -> Optional[str]:
+        record = loaded.records.get(key)
+        if record is None:
+            return None
+        return format_etag(record.get("version", 0), loaded.digests[key])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        record = self._state().records.get(key)
+        return copy.deepcopy(record) if record is not None else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        return copy.deepcopy(list(self._state().records.values()))
+
+    # --- writes ---
+
+    def _write_file(
+        self, records: List[Dict[str, Any]]
+    ) -> Optional[Tuple[int, int, int]]:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(records, indent=2).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return self._current_stamp()
+
+    def _locked_update(
+        self,
+        changes: Dict[str, Optional[Dict[str, Any]]],
+        if_match: Dict[str, str],
+        bump_version: bool,
+        veto: Optional[Veto],
+    ) -> None:
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                loaded = self._state()  # pick up writes made by other processes
+                for key, expected in if_match.items():
+                    actual = self._record_etag(loaded, key)
+                    if actual != expected:
+                        raise PreconditionFailedError(key, expected, actual)
+                if veto is not None:
+                    rejected = veto(loaded.records)
+                    changes = {k: v for k, v in changes.items() if k not in rejected}
+
+                records = dict(loaded.records)
+                digests = dict(loaded.digests)
+                version, combined = loaded.version, loaded.digest
+                for key, record in changes.items():
+                    old = records.pop(key, None)
+                    if old is not None:
+                        version -= old.get("version", 0)
+                        combined ^= digests.pop(key)
+                    if record is None:
+                        continue
+                    if bump_version:
+                        record = {
+                            **record,
+                            "version": (old or {}).get("version", 0) + 1,
+                        }
+                    records[key] = record
+                    digests[key] = digest = record_digest(record)
+                    version += record.get("version", 0)
+                    combined ^= digest
+
+                stamp = self._write_file(list(records.values()))
+                self._loaded = _Loaded(records, digests, version, combined, stamp)
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    async def update(
+        self,
+        changes: Dict[str, Optional[Dict[str, Any]]],
+        if_match: Optional[Dict[str, str]] = None,
+        bump_version: bool = True,
+        veto: Optional[Veto] = None,
+    ) -> None:
+        """
+        Apply ``changes`` (key -> record, or None to delete) atomically.
+
+        ``if_match`` maps keys to the record ETags the caller last saw; any
+        mismatch raises ``PreconditionFailedError`` and nothing is written. With
+        ``bump_version`` each written record's version becomes the stored
+        one plus one, decided under the file lock. ``veto`` sees the records
+        as stored at that point and names changes to skip, for checks that
+        must be atomic with the write.
+        """
+        async with self._lock:
+            await asyncio.to_thread(
+                self._locked_update, changes, if_match or {}, bump_version, veto
+            )
+
+
+class JsonTaskRepository(TaskRepository):
+    """``TaskRepository`` backed by ``collaboration/state/tasks.json``."""
+
+    def __init__(self, path: str = "collaboration/state/tasks.json"):
+        self.document = JsonDocument(path)
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self.document.get(task_id)
+
+    def etag(self, task_id: Optional[str] = None) -> Optional[str]:
+        """ETag of one task, or of the whole document when no id is given."""
+        if task_id is None:
+            return self.document.etag()
+        return self.document.record_etag(task_id)
+
+    async def save(self, task: dict, if_match: Optional[str] = None) -> str:
+        """
+        Create or replace a task, bumping its version; returns its new ETag.
+
+        With ``if_match`` the write only happens if the stored task still has
+        that ETag (``"*"`` matches any existing task).
+        """
+        task_id = task["id"]
+        if if_match == "*":
+            if_match = self.document.record_etag(task_id)
+            if if_match is None:
+                raise PreconditionFailedError(task_id, "*", None)
+        await self.document.update(
+            {task_id: dict(task)},
+            {task_id: if_match} if if_match is not None else None,
+        )
+        etag = self.document.record_etag(task_id)
+        assert etag is not None
+        return etag
+
+    async def list(self, **filters) -> List[Dict[str, Any]]:
+        """Tasks whose fields equal every filter (``label`` matches ``labels``)."""
+        label = filters.pop("label", None)
+        return [
+            task
+            for task in self.document.all()
+            if all(task.get(field) == value for field, value in filters.items())
+            and (label is None or label in task.get("labels", []))
+        ]
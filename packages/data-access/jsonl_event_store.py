@@ -0,0 +1,304 @@
+"""
+Append-only JSONL event store with a sidecar offset index.
+
+Each line of the log is one event: the caller's dict plus ``stream_id``,
+``version`` (1-based, per stream) and ``ts``. Lines without a ``stream_id``
+(e.g. hand-written entries in ``collaboration/events.jsonl``) belong to
+``DEFAULT_STREAM``.
+
+``<log>.idx`` maps (stream_id, version) to the byte offset and length of each
+line, so ``read`` slices events straight out of an mmap of the log instead of
+scanning it. The index is derived data: on open, any log bytes it does not
+cover are re-scanned and indexed.
+"""
+
+import asyncio
+import fcntl
+import json
+import mmap
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from event_store import ConcurrencyError, EventStore
+
+DEFAULT_STREAM = "collab"
+
+
+class LogFile:
+    """
+    One JSONL log file and its ``.idx`` sidecar.
+
+    Opened writable, the file is flock'd so only one process appends to it,
+    and a torn final line left by a crash is truncated on open.
+    """
+
+    def __init__(self, path: str, writable: bool = True):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.writable = writable
+        # stream_id -> [(offset, length)]; entry i holds first_version[stream_id] + i
+        self.streams: Dict[str, List[Tuple[int, int]]] = {}
+        self.first_version: Dict[str, int] = {}
+        self.size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._map_size = 0
+
+        if writable:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(self.fd)
+                raise RuntimeError(
+                    f"{path} is already open for writing by another process"
+                )
+        else:
+            self.fd = os.open(path, os.O_RDONLY)
+        self._load_index()
+        self._index_file = open(self.index_path, "a") if writable else None
+
+    # --- index ---
+
+    def _add(self, stream_id: str, version: int, offset: int, length: int) -> None:
+        entries = self.streams.setdefault(stream_id, [])
+        if not entries:
+            self.first_version[stream_id] = version
+        elif version != self.first_version[stream_id] + len(entries):
+            raise ValueError(f"Non-contiguous version {version} for {stream_id!r}")
+        entries.append((offset, length))
+
+    def _load_index(self) -> None:
+        self.size = os.fstat(self.fd).st_size
+        covered = 0
+        try:
+            with open(self.index_path) as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 4:
+                        break  # torn trailing line
+                    offset, length = int(parts[2]), int(parts[3])
+                    if offset + length > self.size:
+                        break
+                    self._add(parts[0], int(parts[1]), offset, length)
+                    covered = offset + length
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            # Corrupt index: rebuild it from the log
+            self.streams.clear()
+            self.first_version.clear()
+            covered = 0
+
+        if covered < self.size:
+            end = self._scan(covered)
+            if end < self.size and self.writable:
+                # Drop a torn final line so the next append starts on a fresh line
+                os.ftruncate(self.fd, end)
+                self.size = end
+            if self.writable:
+                self._rewrite_index()
+
+    def _scan(self, start: int) -> int:
+        """Index complete lines from ``start``; returns the offset after the last one."""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    record = json.loads(line)
+                    stream_id = record.get("stream_id") or DEFAULT_STREAM
+                    version = record.get("version") or self.last_version(stream_id) + 1
+                    self._add(stream_id, version, offset, len(line))
+                offset += len(line)
+        return offset
+
+    def _rewrite_index(self) -> None:
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            for offset, length, stream_id, version in self.entries():
+                f.write(f"{stream_id}\t{version}\t{offset}\t{length}\n")
+        os.replace(tmp, self.index_path)
+
+    def entries(self) -> List[Tuple[int, int, str, int]]:
+        """All (offset, length, stream_id, version) entries in log order."""
+        return sorted(
+            (offset, length, stream_id, version)
+            for stream_id, items in self.streams.items()
+            for version, (offset, length) in enumerate(
+                items, start=self.first_version[stream_id]
+            )
+        )
+
+    def last_version(self, stream_id: str) -> int:
+        entries = self.streams.get(stream_id)
+        if not entries:
+            return 0
+        return self.first_version[stream_id] + len(entries) - 1
+
+    # --- data ---
+
+    def write(self, records: List[dict]) -> None:
+        """Append already-versioned records (each with stream_id and version)."""
+        assert self._index_file is not None, "log opened read-only"
+        lines = []
+        offset = self.size
+        for record in records:
+            line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+            lines.append(line)
+            self._add(record["stream_id"], record["version"], offset, len(line))
+            self._index_file.write(
+                f"{record['stream_id']}\t{record['version']}\t{offset}\t{len(line)}\n"
+            )
+            offset += len(line)
+        os.write(self.fd, b"".join(lines))
+        self.size = offset
+
+    def read(
+        self, stream_id: str, from_version: int = 0, limit: Optional[int] = None
+    ) -> List[dict]:
+        entries = self.streams.get(stream_id, [])
+        start = max(from_version - self.first_version.get(stream_id, 1), 0)
+        if start >= len(entries):
+            return []
+        end = len(entries) if limit is None else start + limit
+        view = self._view()
+        return [
+            json.loads(view[offset : offset + length])
+            for offset, length in entries[start:end]
+        ]
+
+    def sync(self) -> None:
+        """Flush the sidecar and fsync the log (blocking)."""
+        if self._index_file is not None:
+            self._index_file.flush()
+        os.fsync(self.fd)
+
+    def close(self) -> None:
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        os.close(self.fd)
+
+    def _view(self) -> mmap.mmap:
+        # Remap only when the log has grown past the current mapping
+        if self._map is None or self._map_size < self.size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+            self._map_size = self.size
+        return self._map
+
+
+class GroupCommit:
+    """
+    Shares one blocking sync among concurrent waiters.
+
+    Waiters that arrive while a sync is running are all released by the next
+    one, so N concurrent appends cost two fsyncs rather than N. The future
+    from ``request()`` is shared, so waiters must ``asyncio.shield`` it: one
+    cancelled waiter must not cancel the sync for the others.
+    """
+
+    def __init__(self, sync: Callable[[], None]):
+        self._sync = sync
+        self._next: Optional["asyncio.Future[None]"] = None
+        self._running = False
+
+    @property
+    def pending(self) -> bool:
+        return self._next is not None or self._running
+
+    def request(self) -> "asyncio.Future[None]":
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+            if not self._running:
+                self._running = True
+                asyncio.create_task(self._loop())
+        return self._next
+
+    async def _loop(self) -> None:
+        try:
+            while self._next is not None:
+                waiter, self._next = self._next, None
+                try:
+                    await asyncio.to_thread(self._sync)
+                except Exception as e:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                else:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        finally:
+            self._running = False
+
+
+def stamp(stream_id: str, events: List[dict], first_version: int) -> List[dict]:
+    """Add stream_id, version and a default ts to a batch of events."""
+    ts = datetime.utcnow().isoformat() + "Z"
+    return [
+        {"ts": ts, **event, "stream_id": stream_id, "version": version}
+        for version, event in enumerate(events, start=first_version)
+    ]
+
+
+def check_stream_id(stream_id: str) -> None:
+    if "\t" in stream_id or "\n" in stream_id:
+        raise ValueError("stream_id may not contain tabs or newlines")
+
+
+class JsonlEventStore(EventStore):
+    """
+    File-backed ``EventStore`` for a single writer process.
+
+    Appends are checked against ``expected_version`` and written under an
+    asyncio lock, then wait for a shared fsync: appenders that arrive while a
+    sync is running are committed together by the next one (group commit).
+    """
+
+    def __init__(self, path: str = "collaboration/events.jsonl"):
+        self.path = path
+        self._lock = asyncio.Lock()
+        self._log = LogFile(path)
+        self._commit = GroupCommit(self._log.sync)
+
+    def version(self, stream_id: str) -> int:
+        """Current version (number of events) of a stream."""
+        return self._log.last_version(stream_id)
+
+    async def append(
+        self, stream_id: str, events: list[dict], expected_version: int | None = None
+    ) -> int:
+        """Append events and return the stream's new version once durable."""
+        check_stream_id(stream_id)
+        async with self._lock:
+            current = self._log.last_version(stream_id)
+            if expected_version is not None and expected_version != current:
+                raise ConcurrencyError(stream_id, expected_version, current)
+            if not events:
+                return current
+            self._log.write(stamp(stream_id, events, current + 1))
+            synced = self._commit.request()
+        await asyncio.shield(synced)
+        return current + len(events)
+
+    async def read(
+        self, stream_id: str, from_version: int = 0, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Return events of a stream with ``version >= from_version`` (at most ``limit``)."""
+        return self._log.read(stream_id, from_version, limit)
+
+    def streams(self) -> List[str]:
+        return list(self._log.streams)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._commit.pending:
+                await asyncio.shield(self._commit.request())
+            self._log.close()
@@ -0,0 +1,366 @@
+"""
+Lease manager backed by ``collaboration/state/locks.json``.
+
+A lease ``{lock_id, path, owner, ttl_seconds, acquired_at, heartbeat_at}``
+expires ``ttl_seconds`` after its last heartbeat. Expiry deadlines sit in a
+min-heap, so finding stale leases is a peek at the top rather than a scan.
+Heartbeats and releases do not remove heap entries; an entry is simply
+ignored when popped if its lease is gone or has a later deadline (lazy
+deletion), and the heap is rebuilt when stale entries dominate it.
+
+All changes are applied in memory first and written to the document in
+batches. Acquire, release and reclaim wait for the write that includes them,
+and concurrent ones share it (group commit); heartbeats do not wait and are
+written with the next batch, at least once per ``flush_interval``. After a
+crash a lease can therefore look up to one interval older than it was.
+Cancelling a caller does not cancel the shared write: an acquire cancelled
+while its lease is being written keeps the lease (it expires after its TTL)
+unless the write fails.
+
+Several managers (one per process) may share the document. The write that
+persists a new lease re-reads the document under its file lock and drops the
+lease if another manager holds a live one on the same path, so the path
+check is atomic with the insert; the losing ``acquire`` raises
+``LeaseConflictError``.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from event_store import EventStore
+from json_repositories import JsonDocument, Veto
+from repositories import LeaseConflictError, LockRepository
+
+log = logging.getLogger("kyros.leases")
+
+RECLAIM_STREAM = "collab"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _parse_iso(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class LeaseManager(LockRepository):
+    """
+    ``LockRepository`` with O(log n) expiry for thousands of leases.
+
+    Call ``run`` (or ``reclaim_expired`` and ``flush`` yourself) to reclaim
+    expired leases and persist pending heartbeats. Each reclaimed lease is
+    appended to ``events`` as a ``lease_reclaimed`` event when a store is given.
+    """
+
+    def __init__(
+        self,
+        path: str = "collaboration/state/locks.json",
+        events: Optional[EventStore] = None,
+        flush_interval: float = 1.0,
+    ):
+        self.document = JsonDocument(path, key="lock_id")
+        self.events = events
+        self.flush_interval = flush_interval
+        self._leases: Dict[str, Dict[str, Any]] = {}
+        self._by_path: Dict[str, str] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._dirty: Set[str] = set()  # lock_ids to write (deleted if untracked)
+        self._acquiring: Set[str] = set()  # new leases not written yet
+        self._rejected: Dict[str, str] = {}  # lock_id -> owner of the live lease
+        self._write_waiter: Optional["asyncio.Future[None]"] = None
+        self._writing = False
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self.reclaimed = 0
+
+        for lease in self.document.all():
+            self._track(lease)
+
+    # --- bookkeeping ---
+
+    def _track(self, lease: Dict[str, Any]) -> None:
+        lock_id = lease["lock_id"]
+        self._leases[lock_id] = lease
+        self._by_path[lease["path"]] = lock_id
+        self._schedule(lock_id)
+
+    def _schedule(self, lock_id: str) -> None:
+        lease = self._leases[lock_id]
+        deadline = _parse_iso(lease.get("heartbeat_at")) + lease["ttl_seconds"]
+        self._deadlines[lock_id] = deadline
+        heapq.heappush(self._heap, (deadline, lock_id))
+        if len(self._heap) > 2 * len(self._leases) + 64:
+            # Mostly superseded entries: rebuild from live deadlines
+            self._heap = [(d, lid) for lid, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _untrack(self, lock_id: str) -> Dict[str, Any]:
+        lease = self._leases.pop(lock_id)
+        self._deadlines.pop(lock_id, None)
+        self._dirty.add(lock_id)
+        if self._by_path.get(lease["path"]) == lock_id:
+            del self._by_path[lease["path"]]
+        return lease
+
+    def _forget(self, lock_id: str) -> None:
+        """Drop a lease that never reached the document."""
+        self._untrack(lock_id)
+        self._dirty.discard(lock_id)
+
+    def _owned(self, lock_id: str, owner: str) -> Dict[str, Any]:
+        lease = self._leases.get(lock_id)
+        if lease is None or self._deadlines[lock_id] <= time.time():
+            raise KeyError(lock_id)
+        if lease["owner"] != owner:
+            raise LeaseConflictError(f"Lease {lock_id} is held by {lease['owner']}")
+        return lease
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest live expiry, discarding stale heap entries on the way."""
+        while self._heap:
+            deadline, lock_id = self._heap[0]
+            if self._deadlines.get(lock_id) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    # --- LockRepository ---
+
+    async def acquire(self, path: str, owner: str, ttl_seconds: int) -> dict:
+        """Lease ``path`` to ``owner``; expired leases on it are reclaimed first."""
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        async with self._lock:
+            await self._reclaim_locked(time.time())
+            held = self._by_path.get(path)
+            if held is not None:
+                raise LeaseConflictError(
+                    f"{path} is leased to {self._leases[held]['owner']}"
+                )
+            now = _iso(time.time())
+            lock_id = uuid.uuid4().hex
+            lease: Dict[str, Any] = {
+                "lock_id": lock_id,
+                "path": path,
+                "owner": owner,
+                "ttl_seconds": ttl_seconds,
+                "acquired_at": now,
+                "heartbeat_at": now,
+            }
+            self._track(lease)
+            self._dirty.add(lock_id)
+            self._acquiring.add(lock_id)
+            written = self._request_write()
+        try:
+            await asyncio.shield(written)
+        except asyncio.CancelledError:
+            # Only this caller gave up; settle the lease once the write is done
+            written.add_done_callback(lambda _: self._settle_acquire(lock_id, written))
+            raise
+        except Exception:
+            self._settle_acquire(lock_id, written)
+            raise
+        holder = self._settle_acquire(lock_id, written)
+        if holder is not None:
+            raise LeaseConflictError(f"{path} is leased to {holder}")
+        return dict(lease)
+
+    def _settle_acquire(
+        self, lock_id: str, written: "asyncio.Future[None]"
+    ) -> Optional[str]:
+        """
+        Keep a new lease once its write has landed, or drop it if the write failed
+        or was vetoed; returns the other manager's owner in the veto case.
+        """
+        self._acquiring.discard(lock_id)
+        holder = self._rejected.pop(lock_id, None)
+        failed = written.cancelled() or written.exception() is not None
+        if failed or holder is not None:
+            if lock_id in self._leases:
+                self._forget(lock_id)
+        else:
+            self._wakeup.set()
+        return holder
+
+    async def heartbeat(self, lock_id: str, owner: str) -> dict:
+        """Extend a lease; persisted with the next batched flush."""
+        lease = self._owned(lock_id, owner)
+        lease["heartbeat_at"] = _iso(time.time())
+        self._schedule(lock_id)
+        self._dirty.add(lock_id)
+        return dict(lease)
+
+    async def release(self, lock_id: str, owner: str) -> None:
+        async with self._lock:
+            self._owned(lock_id, owner)
+            self._untrack(lock_id)
+            written = self._request_write()
+        await asyncio.shield(written)
+
+    async def get(self, lock_id: str) -> Optional[dict]:
+        lease = self._leases.get(lock_id)
+        return dict(lease) if lease is not None else None
+
+    async def list(self, **filters) -> List[dict]:
+        return [
+            dict(lease)
+            for lease in self._leases.values()
+            if all(lease.get(field) == value for field, value in filters.items())
+        ]
+
+    # --- maintenance ---
+
+    def _request_write(self) -> "asyncio.Future[None]":
+        """
+        Future for the next batched write of everything dirty. It is shared
+        by every caller, so callers await it through ``asyncio.shield``.
+        """
+        if self._write_waiter is None:
+            self._write_waiter = asyncio.get_running_loop().create_future()
+            if not self._writing:
+                self._writing = True
+                asyncio.create_task(self._write_loop())
+        return self._write_waiter
+
+    async def _write_loop(self) -> None:
+        try:
+            while self._write_waiter is not None:
+                waiter, self._write_waiter = self._write_waiter, None
+                dirty, self._dirty = self._dirty, set()
+                changes: Dict[str, Optional[Dict[str, Any]]] = {
+                    lock_id: (
+                        dict(self._leases[lock_id]) if lock_id in self._leases else None
+                    )
+                    for lock_id in dirty
+                }
+                acquiring = dirty & self._acquiring
+                rejected: Dict[str, str] = {}
+                try:
+                    if changes:
+                        await self.document.update(
+                            changes,
+                            bump_version=False,
+                            veto=self._path_veto(changes, acquiring, rejected),
+                        )
+                    self._acquiring -= acquiring
+                    self._rejected.update(rejected)
+                except Exception as e:
+                    self._dirty |= dirty
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                else:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        finally:
+            self._writing = False
+
+    @staticmethod
+    def _path_veto(
+        changes: Dict[str, Optional[Dict[str, Any]]],
+        acquiring: Set[str],
+        rejected: Dict[str, str],
+    ) -> Veto:
+        """Veto new leases on paths another manager holds a live lease on."""
+
+        def veto(records: Dict[str, Dict[str, Any]]) -> Set[str]:
+            if not acquiring:
+                return set()
+            now = time.time()
+            held = {
+                lease["path"]: lease["owner"]
+                for lock_id, lease in records.items()
+                if lock_id not in changes
+                and _parse_iso(lease.get("heartbeat_at")) + lease["ttl_seconds"] > now
+            }
+            for lock_id in acquiring:
+                lease = changes[lock_id]
+                if lease is not None and lease["path"] in held:
+                    rejected[lock_id] = held[lease["path"]]
+            return set(rejected)
+
+        return veto
+
+    async def flush(self) -> int:
+        """Persist batched heartbeats (and anything else pending); returns how many."""
+        pending = len(self._dirty)
+        if pending or self._writing:
+            await asyncio.shield(self._request_write())
+        return pending
+
+    async def reclaim_expired(self, now: Optional[float] = None) -> List[dict]:
+        """Drop leases whose heartbeat is older than their TTL."""
+        async with self._lock:
+            return await self._reclaim_locked(time.time() if now is None else now)
+
+    async def _reclaim_locked(self, now: float) -> List[dict]:
+        expired = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, lock_id = heapq.heappop(self._heap)
+            expired.append(self._untrack(lock_id))
+        if not expired:
+            return []
+
+        await asyncio.shield(self._request_write())
+        self.reclaimed += len(expired)
+        for lease in expired:
+            log.info(
+                json.dumps(
+                    {
+                        "event": "lease_reclaimed",
+                        "lock_id": lease["lock_id"],
+                        "path": lease["path"],
+                        "owner": lease["owner"],
+                    }
+                )
+            )
+        if self.events is not None:
+            await self.events.append(
+                RECLAIM_STREAM,
+                [
+                    {
+                        "event": "lease_reclaimed",
+                        "actor": "lease-manager",
+                        "target": lease["lock_id"],
+                        "details": lease,
+                    }
+                    for lease in expired
+                ],
+            )
+        return expired
+
+    async def run(self) -> None:
+        """Reclaim at each expiry and flush heartbeats every ``flush_interval``."""
+        while True:
+            now = time.time()
+            try:
+                await self.reclaim_expired(now)
+                await self.flush()
+            except Exception as e:
+                log.error(json.dumps({"event": "lease_manager_error", "error": str(e)}))
+            deadline = self.next_deadline()
+            timeout = self.flush_interval
+            if deadline is not None:
+                timeout = min(timeout, max(deadline - time.time(), 0.0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leases": len(self._leases),
+            "heap_entries": len(self._heap),
+            "pending_heartbeats": len(self._dirty),
+            "reclaimed": self.reclaimed,
+        }
@@ -0,0 +1,399 @@
+"""
+Incremental projections: read models built from ``EventStore`` streams.
+
+A ``Projection`` maps event names (the ``event`` field, falling back to
+``type``) to handlers that update a key/value ``ProjectionState``. The
+``ProjectionEngine`` feeds each projection the events after its checkpoint,
+per stream, and commits state changes together with the new checkpoint after
+every batch, so a restarted process resumes where it stopped instead of
+replaying the whole log.
+
+State lives either in memory (``MemoryProjectionState``, rebuilt on start)
+or in SQLite (``SQLiteProjectionState``, which buffers a batch's writes and
+commits them with the checkpoint in one transaction). States that block on
+I/O set ``blocking`` and the engine applies their batches in a worker thread.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from event_store import EventStore
+
+log = logging.getLogger("kyros.projections")
+
+Handler = Callable[["ProjectionState", dict], None]
+
+_DELETED = object()
+
+
+class ProjectionState(ABC):
+    """Key/value state of one projection plus its per-stream checkpoint."""
+
+    # True when reads/writes do blocking I/O; the engine then runs handlers,
+    # commits and resets off the event loop.
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any: ...
+
+    @abstractmethod
+    def put(self, key: str, value: Any) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, Any]]: ...
+
+    @abstractmethod
+    def checkpoint(self) -> Dict[str, int]:
+        """Last applied version per stream."""
+
+    @abstractmethod
+    def commit(self, checkpoint: Dict[str, int]) -> None:
+        """Make the writes since the last commit durable along with ``checkpoint``."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Drop all state and the checkpoint."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryProjectionState(ProjectionState):
+    def __init__(self) -> None:
+        self._data: Dict[str, Any] = {}
+        self._checkpoint: Dict[str, int] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def put(self, key: str, value: Any) -> None:
+        self._data[key] = value
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return iter(list(self._data.items()))
+
+    def checkpoint(self) -> Dict[str, int]:
+        return dict(self._checkpoint)
+
+    def commit(self, checkpoint: Dict[str, int]) -> None:
+        self._checkpoint = dict(checkpoint)
+
+    def reset(self) -> None:
+        self._data.clear()
+        self._checkpoint.clear()
+
+
+class SQLiteProjectionState(ProjectionState):
+    """
+    Projection state in a SQLite table (``projection_<name>``).
+
+    Writes are buffered and flushed by ``commit`` in one transaction with the
+    checkpoint, so the stored state always matches the stored checkpoint.
+    """
+
+    blocking = True
+
+    def __init__(self, db_path: str, name: str):
+        self.name = name
+        self._table = f"projection_{name}"
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self._table}" '
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS projection_checkpoints "
+            "(projection TEXT, stream_id TEXT, version INTEGER NOT NULL, "
+            "PRIMARY KEY (projection, stream_id))"
+        )
+        self._conn.commit()
+        self._dirty: Dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._dirty:
+            value = self._dirty[key]
+            return default if value is _DELETED else value
+        row = self._conn.execute(
+            f'SELECT value FROM "{self._table}" WHERE key = ?', (key,)
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        self._dirty[key] = value
+
+    def delete(self, key: str) -> None:
+        self._dirty[key] = _DELETED
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        rows = self._conn.execute(f'SELECT key, value FROM "{self._table}"')
+        stored = {key: json.loads(value) for key, value in rows}
+        for key, value in self._dirty.items():
+            if value is _DELETED:
+                stored.pop(key, None)
+            else:
+                stored[key] = value
+        return iter(list(stored.items()))
+
+    def checkpoint(self) -> Dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT stream_id, version FROM projection_checkpoints WHERE projection = ?",
+            (self.name,),
+        )
+        return {stream_id: version for stream_id, version in rows}
+
+    def commit(self, checkpoint: Dict[str, int]) -> None:
+        upserts = [
+            (key, json.dumps(value))
+            for key, value in self._dirty.items()
+            if value is not _DELETED
+        ]
+        deletes = [(key,) for key, value in self._dirty.items() if value is _DELETED]
+        with self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO "{self._table}" (key, value) VALUES (?, ?)',
+                upserts,
+            )
+            self._conn.executemany(
+                f'DELETE FROM "{self._table}" WHERE key = ?', deletes
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO projection_checkpoints "
+                "(projection, stream_id, version) VALUES (?, ?, ?)",
+                [(self.name, sid, version) for sid, version in checkpoint.items()],
+            )
+        self._dirty.clear()
+
+    def reset(self) -> None:
+        self._dirty.clear()
+        with self._conn:
+            self._conn.execute(f'DELETE FROM "{self._table}"')
+            self._conn.execute(
+                "DELETE FROM projection_checkpoints WHERE projection = ?", (self.name,)
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class Projection:
+    """
+    A named read model over one or more streams.
+
+    Register handlers with ``on``::
+
+        tasks = Projection("tasks", streams=["collab"])
+
+        @tasks.on("task_created")
+        def created(state, event):
+            state.put(event["target"], {"status": "queued"})
+    """
+
+    def __init__(
+        self,
+        name: str,
+        streams: Sequence[str],
+        state: Optional[ProjectionState] = None,
+    ):
+        if not name.isidentifier():
+            raise ValueError(f"Projection name must be an identifier: {name!r}")
+        self.name = name
+        self.streams = list(streams)
+        self.state = state or MemoryProjectionState()
+        self.handlers: Dict[str, Handler] = {}
+
+    def on(self, event_name: str) -> Callable[[Handler], Handler]:
+        def register(handler: Handler) -> Handler:
+            self.handlers[event_name] = handler
+            return handler
+
+        return register
+
+    def apply(self, event: dict) -> bool:
+        handler = self.handlers.get(event.get("event") or event.get("type") or "")
+        if handler is None:
+            return False
+        handler(self.state, event)
+        return True
+
+
+@dataclass
+class ProjectionStats:
+    """Progress counters for one projection."""
+
+    name: str
+    lag_events: int = 0  # events in its streams not applied yet
+    applied: int = 0  # events that matched a handler
+    processed: int = 0  # events read, matched or not
+    batches: int = 0
+    errors: int = 0
+    last_event_ts: Optional[str] = None
+    last_run_at: Optional[float] = None
+
+
+class ProjectionEngine:
+    """
+    Keeps registered projections up to date with an ``EventStore``.
+
+    ``catch_up`` applies whatever is new since each checkpoint; ``run`` does
+    that on an interval (or when ``notify`` is called after an append);
+    ``rebuild`` resets a projection and replays its streams in large batches.
+    """
+
+    def __init__(self, store: EventStore, batch_size: int = 500):
+        self.store = store
+        self.batch_size = batch_size
+        self.projections: Dict[str, Projection] = {}
+        self._stats: Dict[str, ProjectionStats] = {}
+        self._checkpoints: Dict[str, Dict[str, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def register(self, projection: Projection) -> Projection:
+        if projection.name in self.projections:
+            raise ValueError(f"Projection {projection.name!r} already registered")
+        self.projections[projection.name] = projection
+        self._stats[projection.name] = ProjectionStats(name=projection.name)
+        self._checkpoints[projection.name] = projection.state.checkpoint()
+        return projection
+
+    def notify(self) -> None:
+        """Wake ``run`` early, e.g. right after appending events."""
+        self._wakeup.set()
+
+    async def catch_up(
+        self, name: Optional[str] = None, batch_size: Optional[int] = None
+    ) -> int:
+        """Apply new events to one or all projections; returns events processed."""
+        names = [name] if name is not None else list(self.projections)
+        total = 0
+        async with self._lock:
+            for projection_name in names:
+                total += await self._catch_up(
+                    self.projections[projection_name], batch_size or self.batch_size
+                )
+        return total
+
+    async def _catch_up(self, projection: Projection, batch_size: int) -> int:
+        stats = self._stats[projection.name]
+        checkpoint = self._checkpoints[projection.name]
+        processed = 0
+        for stream_id in projection.streams:
+            while True:
+                batch = list(
+                    await self.store.read(
+                        stream_id, checkpoint.get(stream_id, 0) + 1, batch_size
+                    )
+                )
+                if not batch:
+                    break
+                committed = dict(checkpoint)
+                committed[stream_id] = batch[-1].get(
+                    "version", checkpoint.get(stream_id, 0) + len(batch)
+                )
+                if projection.state.blocking:
+                    await asyncio.to_thread(
+                        self._apply_batch, projection, stream_id, batch, committed
+                    )
+                else:
+                    self._apply_batch(projection, stream_id, batch, committed)
+                checkpoint[stream_id] = committed[stream_id]
+                processed += len(batch)
+                if len(batch) < batch_size:
+                    break
+        stats.last_run_at = time.time()
+        stats.lag_events = self._lag(projection)
+        return processed
+
+    def _apply_batch(
+        self,
+        projection: Projection,
+        stream_id: str,
+        batch: List[dict],
+        checkpoint: Dict[str, int],
+    ) -> None:
+        stats = self._stats[projection.name]
+        for event in batch:
+            try:
+                if projection.apply(event):
+                    stats.applied += 1
+            except Exception as e:
+                # A bad event must not wedge the projection behind it
+                stats.errors += 1
+                log.error(
+                    json.dumps(
+                        {
+                            "event": "projection_handler_error",
+                            "projection": projection.name,
+                            "stream_id": stream_id,
+                            "version": event.get("version"),
+                            "error": str(e),
+                        }
+                    )
+                )
+        projection.state.commit(checkpoint)
+        stats.batches += 1
+        stats.processed += len(batch)
+        stats.last_event_ts = batch[-1].get("ts", stats.last_event_ts)
+
+    async def rebuild(self, name: str, batch_size: int = 5000) -> int:
+        """Reset a projection and replay its streams from the start."""
+        async with self._lock:
+            projection = self.projections[name]
+            if projection.state.blocking:
+                await asyncio.to_thread(projection.state.reset)
+            else:
+                projection.state.reset()
+            self._checkpoints[name] = {}
+            self._stats[name] = ProjectionStats(name=name)
+            return await self._catch_up(projection, batch_size)
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Catch up forever, every ``interval`` seconds or when notified."""
+        while True:
+            try:
+                await self.catch_up()
+            except Exception as e:
+                log.error(
+                    json.dumps({"event": "projection_run_error", "error": str(e)})
+                )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _lag(self, projection: Projection) -> int:
+        version = getattr(self.store, "version", None)
+        if version is None:
+            return 0
+        checkpoint = self._checkpoints[projection.name]
+        return sum(
+            max(version(stream_id) - checkpoint.get(stream_id, 0), 0)
+            for stream_id in projection.streams
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-projection counters, with lag measured against the store now."""
+        out = []
+        for name, projection in self.projections.items():
+            stats = self._stats[name]
+            stats.lag_events = self._lag(projection)
+            out.append(asdict(stats))
+        return out
+
+    def close(self) -> None:
+        for projection in self.projections.values():
+            projection.state.close()
@@ -1,5 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Protocol
+from typing import Optional, Protocol
+
+
+class PreconditionFailedError(Exception):
+    """Raised when an If-Match ETag or expected version does not match (HTTP 412)."""
+
+    def __init__(self, key: str, expected: str, actual: Optional[str]):
+        super().__init__(f"{key!r} is at {actual}, expected {expected}")
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+
+class LeaseConflictError(Exception):
+    """Raised when a resource is already leased, or a lease is held by someone else."""
 
 
 class UnitOfWork(Protocol):
@@ -18,7 +32,23 @@ class TaskRepository(ABC):
     async def list(self, **filters): ...
 
 
-class LockRepository(ABC): ...
+class LockRepository(ABC):
+    @abstractmethod
+    async def acquire(self, path: str, owner: str, ttl_seconds: int) -> dict: ...
+    @abstractmethod
+    async def heartbeat(self, lock_id: str, owner: str) -> dict: ...
+    @abstractmethod
+    async def release(self, lock_id: str, owner: str): ...
+    @abstractmethod
+    async def get(self, lock_id: str): ...
+    @abstractmethod
+    async def list(self, **filters): ...
 
 
-class AgentRepository(ABC): ...
+class AgentRepository(ABC):
+    @abstractmethod
+    async def get(self, agent_id: str): ...
+    @abstractmethod
+    async def save(self, agent: dict): ...
+    @abstractmethod
+    async def list(self, **filters): ...
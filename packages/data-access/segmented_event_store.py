@@ -0,0 +1,357 @@
+"""
+Segmented event log with rotation, per-stream snapshots and compaction.
+
+Layout under ``directory``::
+
+    manifest.json                 segment list, per-segment stream ranges, heads
+    segment-000001.jsonl(.idx)    closed segment (read-only from now on)
+    segment-000001.jsonl.gz       ... or its compacted archive (idx kept beside it)
+    segment-000002.jsonl(.idx)    active segment, the only one ever appended to
+    snapshots/<stream>.json       latest snapshot per stream
+
+Opening the store reads the manifest and indexes only the active segment,
+which is bounded by ``max_segment_bytes``, so startup cost does not grow with
+history. Closed segments are opened lazily when a read reaches back into them.
+
+Archives are a series of independent gzip members of about
+``ARCHIVE_BLOCK_BYTES`` uncompressed each (still one valid ``.gz`` file). The
+archive's idx records, for every event, the compressed offset of its member
+and its offset inside it, so a read decompresses only the blocks holding the
+events it returns. An archive's idx is parsed once and kept in memory.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import time
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from event_store import ConcurrencyError, EventStore
+from jsonl_event_store import GroupCommit, LogFile, check_stream_id, stamp
+
+ARCHIVE_BLOCK_BYTES = 64 * 1024
+
+# stream_id -> [(version, member offset, offset in member, length)]
+ArchiveIndex = Dict[str, List[Tuple[int, int, int, int]]]
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_member(f: BinaryIO, offset: int) -> bytes:
+    """Decompress the single gzip member starting at ``offset``."""
+    f.seek(offset)
+    decompressor = zlib.decompressobj(wbits=31)
+    chunks = []
+    while not decompressor.eof:
+        chunk = f.read(64 * 1024)
+        if not chunk:
+            raise ValueError(f"Truncated gzip member at offset {offset}")
+        chunks.append(decompressor.decompress(chunk))
+    return b"".join(chunks)
+
+
+class SegmentedEventStore(EventStore):
+    """
+    ``EventStore`` that rolls its log over into bounded segments.
+
+    The active segment is closed and a new one started once it reaches
+    ``max_segment_bytes`` or is older than ``max_segment_age`` seconds.
+    Appends use the same expected_version checks and group-committed fsync
+    as ``JsonlEventStore``.
+    """
+
+    def __init__(
+        self,
+        directory: str = "collaboration/events",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segment_age: Optional[float] = None,
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        self._snapshot_dir = os.path.join(directory, "snapshots")
+        self._lock = asyncio.Lock()
+        self._closed_logs: Dict[str, LogFile] = {}
+        self._archive_indexes: Dict[str, ArchiveIndex] = {}
+
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        try:
+            with open(self._manifest_path) as f:
+                self._manifest: Dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            self._manifest = {"next_id": 1, "segments": [], "heads": {}}
+        if not self._manifest["segments"] or self._manifest["segments"][-1]["closed"]:
+            self._new_segment_meta()
+            self._save_manifest()
+
+        self._active = LogFile(self._path(self._active_meta["name"]))
+        self._commit = GroupCommit(lambda: self._active.sync())
+
+    # --- segments ---
+
+    @property
+    def _active_meta(self) -> Dict[str, Any]:
+        meta: Dict[str, Any] = self._manifest["segments"][-1]
+        return meta
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _new_segment_meta(self) -> None:
+        segment_id = self._manifest["next_id"]
+        self._manifest["next_id"] = segment_id + 1
+        self._manifest["segments"].append(
+            {
+                "name": f"segment-{segment_id:06d}.jsonl",
+                "created_at": time.time(),
+                "closed": False,
+                "archived": False,
+                "streams": {},
+            }
+        )
+
+    def _save_manifest(self) -> None:
+        _write_json_atomic(self._manifest_path, self._manifest)
+
+    def _should_rotate(self) -> bool:
+        if self._active.size == 0:
+            return False
+        if self._active.size >= self.max_segment_bytes:
+            return True
+        age = time.time() - self._active_meta["created_at"]
+        return self.max_segment_age is not None and age >= self.max_segment_age
+
+    async def _rotate(self) -> None:
+        """Close the active segment and start a new one (caller holds the lock)."""
+        if self._commit.pending:
+            await asyncio.shield(self._commit.request())
+        await asyncio.to_thread(self._active.sync)
+        meta = self._active_meta
+        meta["closed"] = True
+        meta["streams"] = {
+            stream_id: [self._active.first_version[stream_id], last]
+            for stream_id in self._active.streams
+            if (last := self._active.last_version(stream_id))
+        }
+        self._manifest["heads"].update(
+            {stream_id: last for stream_id, (_, last) in meta["streams"].items()}
+        )
+        self._active.close()
+        self._new_segment_meta()
+        self._save_manifest()
+        self._active = LogFile(self._path(self._active_meta["name"]))
+
+    # --- EventStore ---
+
+    def version(self, stream_id: str) -> int:
+        return self._active.last_version(stream_id) or self._manifest["heads"].get(
+            stream_id, 0
+        )
+
+    async def append(
+        self, stream_id: str, events: list[dict], expected_version: int | None = None
+    ) -> int:
+        check_stream_id(stream_id)
+        async with self._lock:
+            current = self.version(stream_id)
+            if expected_version is not None and expected_version != current:
+                raise ConcurrencyError(stream_id, expected_version, current)
+            if not events:
+                return current
+            if self._should_rotate():
+                await self._rotate()
+            self._active.write(stamp(stream_id, events, current + 1))
+            synced = self._commit.request()
+        await asyncio.shield(synced)
+        return current + len(events)
+
+    async def read(
+        self, stream_id: str, from_version: int = 0, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Return events of a stream with ``version >= from_version`` (at most ``limit``)."""
+        events: List[dict] = []
+        for meta in self._manifest["segments"][:-1]:
+            remaining = None if limit is None else limit - len(events)
+            if remaining == 0:
+                return events
+            span = meta["streams"].get(stream_id)
+            if span and span[1] >= from_version:
+                events.extend(
+                    await asyncio.to_thread(
+                        self._read_closed, meta, stream_id, from_version, remaining
+                    )
+                )
+        remaining = None if limit is None else limit - len(events)
+        if remaining != 0:
+            events.extend(self._active.read(stream_id, from_version, remaining))
+        return events
+
+    def _read_closed(
+        self,
+        meta: Dict[str, Any],
+        stream_id: str,
+        from_version: int,
+        limit: Optional[int],
+    ) -> List[dict]:
+        if not meta["archived"]:
+            log = self._closed_logs.get(meta["name"])
+            if log is None:
+                log = self._closed_logs[meta["name"]] = LogFile(
+                    self._path(meta["name"]), writable=False
+                )
+            return log.read(stream_id, from_version, limit)
+
+        index = self._archive_indexes.get(meta["name"])
+        if index is None:
+            index = self._archive_indexes[meta["name"]] = self._load_archive_index(
+                meta["name"]
+            )
+        located = [
+            entry for entry in index.get(stream_id, []) if entry[0] >= from_version
+        ][:limit]
+        if not located:
+            return []
+        events = []
+        blocks: Dict[int, bytes] = {}
+        with open(self._path(meta["name"] + ".gz"), "rb") as f:
+            for _, member, offset, length in located:
+                data = blocks.get(member)
+                if data is None:
+                    data = blocks[member] = _read_member(f, member)
+                events.append(json.loads(data[offset : offset + length]))
+        return events
+
+    def _load_archive_index(self, name: str) -> ArchiveIndex:
+        index: ArchiveIndex = {}
+        with open(self._path(name + ".idx")) as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) == 4:
+                    # Archive written as a single member: offsets are global
+                    fields.append("0")
+                sid, version, offset, length, member = fields
+                index.setdefault(sid, []).append(
+                    (int(version), int(member), int(offset), int(length))
+                )
+        return index
+
+    # --- snapshots ---
+
+    def _snapshot_path(self, stream_id: str) -> str:
+        return os.path.join(self._snapshot_dir, quote(stream_id, safe="") + ".json")
+
+    async def save_snapshot(self, stream_id: str, version: int, state: Any) -> None:
+        """Record ``state`` as the result of applying events up to ``version``."""
+        if version > self.version(stream_id):
+            raise ValueError(f"Stream {stream_id!r} has no version {version}")
+        await asyncio.to_thread(
+            _write_json_atomic,
+            self._snapshot_path(stream_id),
+            {"stream_id": stream_id, "version": version, "state": state},
+        )
+
+    def load_snapshot(self, stream_id: str) -> Optional[Tuple[int, Any]]:
+        """Return ``(version, state)`` of the latest snapshot, if any."""
+        try:
+            with open(self._snapshot_path(stream_id)) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        return snapshot["version"], snapshot["state"]
+
+    async def read_from_snapshot(self, stream_id: str) -> Tuple[Any, int, List[dict]]:
+        """Return ``(state, version, events after it)``; state is None without a snapshot."""
+        snapshot = self.load_snapshot(stream_id)
+        state, version = (None, 0) if snapshot is None else (snapshot[1], snapshot[0])
+        return state, version, await self.read(stream_id, version + 1)
+
+    # --- maintenance ---
+
+    async def compact(self, prune_snapshotted: bool = False) -> int:
+        """
+        Compress closed segments into gzip archives; returns how many were compacted.
+
+        With ``prune_snapshotted`` events at or below each stream's snapshot
+        version are dropped from the archive, since readers starting from the
+        snapshot never need them.
+        """
+        compacted = 0
+        for meta in list(self._manifest["segments"][:-1]):
+            if meta["archived"]:
+                continue
+            await asyncio.to_thread(self._archive_segment, meta, prune_snapshotted)
+            async with self._lock:
+                self._save_manifest()
+            log = self._closed_logs.pop(meta["name"], None)
+            if log is not None:
+                log.close()
+            os.unlink(self._path(meta["name"]))
+            compacted += 1
+        return compacted
+
+    def _archive_segment(self, meta: Dict[str, Any], prune: bool) -> None:
+        source = LogFile(self._path(meta["name"]), writable=False)
+        try:
+            keep_after = {}
+            if prune:
+                for stream_id in source.streams:
+                    snapshot = self.load_snapshot(stream_id)
+                    keep_after[stream_id] = snapshot[0] if snapshot else 0
+
+            with open(source.path, "rb") as f:
+                data = f.read()
+            entries = source.entries()
+        finally:
+            source.close()
+
+        archive = self._path(meta["name"] + ".gz")
+        index_lines: List[str] = []
+        streams: Dict[str, List[int]] = {}
+        with open(archive + ".tmp", "wb") as out:
+            block: List[bytes] = []
+            member, offset = 0, 0
+            for line_offset, length, stream_id, version in entries:
+                if version <= keep_after.get(stream_id, 0):
+                    continue
+                block.append(data[line_offset : line_offset + length])
+                index_lines.append(
+                    f"{stream_id}\t{version}\t{offset}\t{length}\t{member}\n"
+                )
+                span = streams.setdefault(stream_id, [version, version])
+                span[1] = version
+                offset += length
+                if offset >= ARCHIVE_BLOCK_BYTES:
+                    member += out.write(gzip.compress(b"".join(block)))
+                    block, offset = [], 0
+            if block:
+                out.write(gzip.compress(b"".join(block)))
+        os.replace(archive + ".tmp", archive)
+        index_path = self._path(meta["name"] + ".idx")
+        with open(index_path + ".tmp", "w") as idx:
+            idx.writelines(index_lines)
+        os.replace(index_path + ".tmp", index_path)
+        meta["streams"] = streams
+        meta["archived"] = True
+
+    def segments(self) -> List[Dict[str, Any]]:
+        return [dict(meta) for meta in self._manifest["segments"]]
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._commit.pending:
+                await asyncio.shield(self._commit.request())
+            self._active.close()
+            for log in self._closed_logs.values():
+                log.close()
+            self._closed_logs.clear()
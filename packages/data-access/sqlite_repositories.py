@@ -0,0 +1,475 @@
+"""
+SQLite implementations of the task, lock and agent repositories.
+
+All three repositories of a ``SQLiteUnitOfWork`` share its connection, so
+their writes commit or roll back together::
+
+    db = SQLiteDatabase("data/kyros.db")
+    async with db.unit_of_work() as uow:
+        await uow.tasks.save(task)
+        await uow.locks.acquire(task["id"], "worker-1", 60)
+    # committed here, or rolled back if the block raised
+
+Task list filters compile to SQL that depends only on which filters are set
+(never on their values), so each query shape is prepared once and then
+served from the connection's statement cache. Results are ordered by
+``(updated_at, id)`` descending and paged with a keyset cursor; the indexes
+below let every filter combination seek straight to its first row.
+
+Saves that read the stored version before writing start the transaction
+with ``BEGIN IMMEDIATE``, so no other connection can commit in between.
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+from repositories import (
+    AgentRepository,
+    LeaseConflictError,
+    LockRepository,
+    PreconditionFailedError,
+    TaskRepository,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    status TEXT,
+    assignee TEXT,
+    updated_at TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_assignee ON tasks(assignee, updated_at, id);
+-- updated_at is denormalized here so label queries walk the index in page order
+CREATE TABLE IF NOT EXISTS task_labels (
+    label TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    PRIMARY KEY (label, updated_at, task_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_task_labels_task ON task_labels(task_id);
+CREATE TABLE IF NOT EXISTS locks (
+    lock_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    owner TEXT NOT NULL,
+    ttl_seconds INTEGER NOT NULL,
+    acquired_at TEXT NOT NULL,
+    heartbeat_at TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_locks_expires ON locks(expires_at);
+CREATE INDEX IF NOT EXISTS idx_locks_owner ON locks(owner);
+CREATE TABLE IF NOT EXISTS agents (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    runner TEXT,
+    model TEXT,
+    doc TEXT NOT NULL
+);
+"""
+
+TASK_FILTERS = ("status", "assignee", "label", "updated_after", "updated_before")
+
+
+def _now_iso(ts: Optional[float] = None) -> str:
+    moment = datetime.fromtimestamp(time.time() if ts is None else ts, timezone.utc)
+    return moment.isoformat(timespec="microseconds").replace("+00:00", "Z")
+
+
+async def begin_write(conn: aiosqlite.Connection) -> None:
+    """Take the database write lock now unless this transaction already has it."""
+    # Python's sqlite3 only opens a transaction at the first write, and a
+    # transaction that has written already holds the lock
+    if not conn.in_transaction:
+        await conn.execute("BEGIN IMMEDIATE")
+
+
+def encode_cursor(updated_at: str, task_id: str) -> str:
+    return f"{updated_at}|{task_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    updated_at, _, task_id = cursor.partition("|")
+    return updated_at, task_id
+
+
+@lru_cache(maxsize=256)
+def compile_task_query(
+    statuses: int,
+    assignee: bool,
+    label: bool,
+    updated_after: bool,
+    updated_before: bool,
+    cursor: bool,
+) -> str:
+    """SQL for one combination of task filters (``statuses`` = number of values)."""
+    # With a label the page order comes from task_labels' primary key
+    updated, task_id = (
+        ("l.updated_at", "l.task_id") if label else ("t.updated_at", "t.id")
+    )
+    source = "task_labels l JOIN tasks t ON t.id = l.task_id" if label else "tasks t"
+    where = []
+    if label:
+        where.append("l.label = ?")
+    if statuses == 1:
+        where.append("t.status = ?")
+    elif statuses > 1:
+        where.append(f"t.status IN ({', '.join('?' * statuses)})")
+    if assignee:
+        where.append("t.assignee IS ?")
+    if updated_after:
+        where.append(f"{updated} > ?")
+    if updated_before:
+        where.append(f"{updated} < ?")
+    if cursor:
+        where.append(f"({updated}, {task_id}) < (?, ?)")
+    sql = f"SELECT t.doc FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + f" ORDER BY {updated} DESC, {task_id} DESC LIMIT ?"
+
+
+class SQLiteTaskRepository(TaskRepository):
+    def __init__(self, conn: aiosqlite.Connection):
+        self.conn = conn
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        rows = list(
+            await self.conn.execute_fetchall(
+                "SELECT doc FROM tasks WHERE id = ?", (task_id,)
+            )
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def save(
+        self, task: dict, expected_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert or replace a task, bumping its version and ``updated_at``.
+
+        With ``expected_version`` the write fails with
+        ``PreconditionFailedError`` unless the stored version matches (0 for a
+        task that does not exist yet).
+        """
+        task_id = task["id"]
+        await begin_write(self.conn)
+        rows = list(
+            await self.conn.execute_fetchall(
+                "SELECT version FROM tasks WHERE id = ?", (task_id,)
+            )
+        )
+        current = rows[0][0] if rows else 0
+        if expected_version is not None and expected_version != current:
+            raise PreconditionFailedError(task_id, str(expected_version), str(current))
+
+        doc = {**task, "version": current + 1, "updated_at": _now_iso()}
+        await self.conn.execute(
+            """
+            INSERT INTO tasks (id, version, status, assignee, updated_at, doc)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                version = excluded.version, status = excluded.status,
+                assignee = excluded.assignee, updated_at = excluded.updated_at,
+                doc = excluded.doc
+            """,
+            (
+                task_id,
+                doc["version"],
+                doc.get("status"),
+                doc.get("assignee"),
+                doc["updated_at"],
+                json.dumps(doc),
+            ),
+        )
+        await self.conn.execute("DELETE FROM task_labels WHERE task_id = ?", (task_id,))
+        await self.conn.executemany(
+            "INSERT OR IGNORE INTO task_labels (label, updated_at, task_id) VALUES (?, ?, ?)",
+            [(label, doc["updated_at"], task_id) for label in doc.get("labels") or []],
+        )
+        return doc
+
+    async def delete(self, task_id: str) -> None:
+        await self.conn.execute("DELETE FROM task_labels WHERE task_id = ?", (task_id,))
+        await self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    async def list(self, **filters) -> List[Dict[str, Any]]:
+        """Tasks matching ``TASK_FILTERS``, newest first (see ``page``)."""
+        items, _ = await self.page(**filters)
+        return items
+
+    async def page(
+        self,
+        status: Optional[Any] = None,
+        assignee: Optional[str] = None,
+        label: Optional[str] = None,
+        updated_after: Optional[str] = None,
+        updated_before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100,
+        **unknown: Any,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of tasks plus the cursor for the next (None on the last page).
+
+        ``status`` may be a single value or a list; ``after`` is the cursor
+        returned by the previous page.
+        """
+        if unknown:
+            raise ValueError(f"Unknown task filters: {', '.join(sorted(unknown))}")
+        statuses: List[str] = (
+            []
+            if status is None
+            else [status]
+            if isinstance(status, str)
+            else list(status)
+        )
+        params: List[Any] = []
+        if label is not None:
+            params.append(label)
+        params.extend(statuses)
+        if assignee is not None:
+            params.append(assignee)
+        if updated_after is not None:
+            params.append(updated_after)
+        if updated_before is not None:
+            params.append(updated_before)
+        if after is not None:
+            params.extend(decode_cursor(after))
+        params.append(limit)
+
+        sql = compile_task_query(
+            len(statuses),
+            assignee is not None,
+            label is not None,
+            updated_after is not None,
+            updated_before is not None,
+            after is not None,
+        )
+        items = [
+            json.loads(row[0]) for row in await self.conn.execute_fetchall(sql, params)
+        ]
+        next_after = None
+        if len(items) == limit:
+            next_after = encode_cursor(items[-1]["updated_at"], items[-1]["id"])
+        return items, next_after
+
+
+class SQLiteLockRepository(LockRepository):
+    """Leases as rows; an expired lease on a path is replaced by the next acquire."""
+
+    _COLUMNS = "lock_id, path, owner, ttl_seconds, acquired_at, heartbeat_at"
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self.conn = conn
+
+    @classmethod
+    def _row(cls, row: Iterable[Any]) -> Dict[str, Any]:
+        return dict(zip([c.strip() for c in cls._COLUMNS.split(",")], row))
+
+    async def acquire(self, path: str, owner: str, ttl_seconds: int) -> dict:
+        now = time.time()
+        await self.conn.execute(
+            "DELETE FROM locks WHERE path = ? AND expires_at <= ?", (path, now)
+        )
+        lease = {
+            "lock_id": os.urandom(16).hex(),
+            "path": path,
+            "owner": owner,
+            "ttl_seconds": ttl_seconds,
+            "acquired_at": _now_iso(now),
+            "heartbeat_at": _now_iso(now),
+        }
+        try:
+            await self.conn.execute(
+                f"INSERT INTO locks ({self._COLUMNS}, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*lease.values(), now + ttl_seconds),
+            )
+        except aiosqlite.IntegrityError:
+            raise LeaseConflictError(f"{path} is already leased")
+        return lease
+
+    async def heartbeat(self, lock_id: str, owner: str) -> dict:
+        now = time.time()
+        cursor = await self.conn.execute(
+            """
+            UPDATE locks SET heartbeat_at = ?, expires_at = ? + ttl_seconds
+            WHERE lock_id = ? AND owner = ? AND expires_at > ?
+            """,
+            (_now_iso(now), now, lock_id, owner, now),
+        )
+        lease = await self.get(lock_id)
+        if cursor.rowcount == 0:
+            if lease is not None and lease["owner"] != owner:
+                raise LeaseConflictError(f"Lease {lock_id} is held by {lease['owner']}")
+            raise KeyError(lock_id)
+        assert lease is not None
+        return lease
+
+    async def release(self, lock_id: str, owner: str) -> None:
+        cursor = await self.conn.execute(
+            "DELETE FROM locks WHERE lock_id = ? AND owner = ?", (lock_id, owner)
+        )
+        if cursor.rowcount == 0:
+            if await self.get(lock_id) is not None:
+                raise LeaseConflictError(f"Lease {lock_id} is held by someone else")
+            raise KeyError(lock_id)
+
+    async def get(self, lock_id: str) -> Optional[dict]:
+        rows = list(
+            await self.conn.execute_fetchall(
+                f"SELECT {self._COLUMNS} FROM locks WHERE lock_id = ?", (lock_id,)
+            )
+        )
+        return self._row(rows[0]) if rows else None
+
+    async def list(self, **filters) -> List[dict]:
+        """Live leases, optionally filtered by ``owner`` and/or ``path``."""
+        unknown = set(filters) - {"owner", "path"}
+        if unknown:
+            raise ValueError(f"Unknown lock filters: {', '.join(sorted(unknown))}")
+        where = ["expires_at > ?"] + [f"{field} = ?" for field in sorted(filters)]
+        params = [time.time()] + [filters[field] for field in sorted(filters)]
+        rows = await self.conn.execute_fetchall(
+            f"SELECT {self._COLUMNS} FROM locks WHERE {' AND '.join(where)} "
+            "ORDER BY expires_at",
+            params,
+        )
+        return [self._row(row) for row in rows]
+
+    async def reclaim_expired(self) -> List[dict]:
+        """Delete and return leases past their TTL."""
+        now = time.time()
+        rows = await self.conn.execute_fetchall(
+            f"SELECT {self._COLUMNS} FROM locks WHERE expires_at <= ?", (now,)
+        )
+        await self.conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+        return [self._row(row) for row in rows]
+
+
+class SQLiteAgentRepository(AgentRepository):
+    def __init__(self, conn: aiosqlite.Connection):
+        self.conn = conn
+
+    async def get(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        rows = list(
+            await self.conn.execute_fetchall(
+                "SELECT doc FROM agents WHERE id = ?", (agent_id,)
+            )
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def save(self, agent: dict) -> Dict[str, Any]:
+        await begin_write(self.conn)
+        rows = list(
+            await self.conn.execute_fetchall(
+                "SELECT version FROM agents WHERE id = ?", (agent["id"],)
+            )
+        )
+        doc = {**agent, "version": (rows[0][0] if rows else 0) + 1}
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO agents (id, version, runner, model, doc) VALUES (?, ?, ?, ?, ?)",
+            (
+                doc["id"],
+                doc["version"],
+                doc.get("runner"),
+                doc.get("model"),
+                json.dumps(doc),
+            ),
+        )
+        return doc
+
+    async def list(self, **filters) -> List[Dict[str, Any]]:
+        """Agents, optionally filtered by ``runner`` and/or ``model``."""
+        unknown = set(filters) - {"runner", "model"}
+        if unknown:
+            raise ValueError(f"Unknown agent filters: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f"{field} = ?" for field in sorted(filters)) or "1"
+        rows = await self.conn.execute_fetchall(
+            f"SELECT doc FROM agents WHERE {where} ORDER BY id",
+            [filters[field] for field in sorted(filters)],
+        )
+        return [json.loads(row[0]) for row in rows]
+
+
+class SQLiteUnitOfWork:
+    """
+    One transaction spanning the task, lock and agent repositories.
+
+    Commits on a clean exit from ``async with`` and rolls back on an
+    exception; ``commit``/``rollback`` may also be called inside the block.
+    """
+
+    def __init__(self, database: "SQLiteDatabase"):
+        self.database = database
+
+    async def __aenter__(self) -> "SQLiteUnitOfWork":
+        conn = await self.database.connect()
+        # One connection means one transaction at a time
+        await self.database._lock.acquire()
+        self.conn = conn
+        self.tasks = SQLiteTaskRepository(conn)
+        self.locks = SQLiteLockRepository(conn)
+        self.agents = SQLiteAgentRepository(conn)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            self.database._lock.release()
+
+    async def commit(self) -> None:
+        await self.conn.commit()
+
+    async def rollback(self) -> None:
+        await self.conn.rollback()
+
+
+class SQLiteDatabase:
+    """
+    Long-lived connection shared by units of work.
+
+    Keeping one connection open keeps its prepared statements cached
+    (``cached_statements``) across requests instead of re-parsing SQL.
+    """
+
+    def __init__(self, db_path: str = "data/kyros.db", cached_statements: int = 256):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._connecting = asyncio.Lock()
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> aiosqlite.Connection:
+        async with self._connecting:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = await aiosqlite.connect(
+                    self.db_path, cached_statements=self.cached_statements
+                )
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.executescript(_SCHEMA)
+                await conn.commit()
+                self._conn = conn
+        return self._conn
+
+    def unit_of_work(self) -> SQLiteUnitOfWork:
+        return SQLiteUnitOfWork(self)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
@@ -0,0 +1,19 @@
+"""In-process and cross-process event buses and the shared log tail."""
+
+from .bus import (
+    EventBus,
+    LocalEventBus,
+    OverflowPolicy,
+    SubscriberStats,
+    Subscription,
+    TopicTrie,
+)
+
+__all__ = [
+    "EventBus",
+    "LocalEventBus",
+    "OverflowPolicy",
+    "SubscriberStats",
+    "Subscription",
+    "TopicTrie",
+]
@@ -1,5 +1,16 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, List
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+log = logging.getLogger("kyros.event_bus")
+
+Handler = Callable[[dict, Optional[dict]], Union[None, Awaitable[None]]]
 
 
 class EventBus(ABC):
@@ -11,18 +22,297 @@ class EventBus(ABC):
     def subscribe(
         self, event_type: str, handler: Callable[[dict, dict | None], None]
     ): ...
+    @abstractmethod
+    def unsubscribe(self, subscription: "Subscription") -> None: ...
+
+
+class OverflowPolicy(str, Enum):
+    """What publish does when a subscriber's queue is full."""
+
+    BLOCK = "block"  # wait for room (backpressure on the publisher)
+    DROP_OLDEST = "drop_oldest"  # evict the oldest queued event
+    DROP_NEWEST = "drop_newest"  # discard the event being published
+
+
+@dataclass
+class SubscriberStats:
+    """Delivery counters for one subscriber."""
+
+    event_type: str
+    handler: str
+    delivered: int = 0
+    errors: int = 0
+    dropped: int = 0
+    queued: int = 0
+    handler_seconds_total: float = 0.0
+    handler_seconds_max: float = 0.0
+    lag_seconds_max: float = 0.0  # publish -> handler start
+
+
+class _Subscriber:
+    def __init__(
+        self,
+        event_type: str,
+        handler: Handler,
+        queue_size: int,
+        overflow: OverflowPolicy,
+    ):
+        self.handler = handler
+        self.overflow = overflow
+        self.queue: "asyncio.Queue[Tuple[dict, Optional[dict], float]]" = asyncio.Queue(
+            maxsize=queue_size
+        )
+        self.stats = SubscriberStats(
+            event_type=event_type,
+            handler=getattr(handler, "__qualname__", repr(handler)),
+        )
+        self.worker: Optional["asyncio.Task[None]"] = None
+        self.closed = False
+
+    async def offer(self, payload: dict, metadata: Optional[dict]) -> None:
+        if self.closed:
+            return
+        item = (payload, metadata, time.perf_counter())
+        if self.overflow is OverflowPolicy.BLOCK:
+            await self.queue.put(item)
+            return
+        if self.queue.full():
+            self.stats.dropped += 1
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+            self.queue.task_done()
+        self.queue.put_nowait(item)
+
+    async def run(self) -> None:
+        while True:
+            payload, metadata, enqueued_at = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                result = self.handler(payload, metadata)
+                if inspect.isawaitable(result):
+                    await result
+                self.stats.delivered += 1
+            except Exception as e:
+                self.stats.errors += 1
+                log.warning(
+                    json.dumps(
+                        {
+                            "event": "event_handler_error",
+                            "event_type": self.stats.event_type,
+                            "handler": self.stats.handler,
+                            "error": str(e),
+                        }
+                    )
+                )
+            finally:
+                elapsed = time.perf_counter() - started
+                self.stats.handler_seconds_total += elapsed
+                self.stats.handler_seconds_max = max(
+                    self.stats.handler_seconds_max, elapsed
+                )
+                self.stats.lag_seconds_max = max(
+                    self.stats.lag_seconds_max, started - enqueued_at
+                )
+                self.queue.task_done()
+
+    def stop(self) -> None:
+        """Stop the worker and discard queued events."""
+        self.closed = True
+        if self.worker is not None:
+            self.worker.cancel()
+        # Emptying the queue also releases publishers blocked on a full one
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+
+
+class Subscription:
+    """Handle returned by ``LocalEventBus.subscribe``; ``close()`` unsubscribes."""
+
+    def __init__(self, bus: "LocalEventBus", subscriber: _Subscriber):
+        self._bus = bus
+        self._subscriber = subscriber
+
+    @property
+    def stats(self) -> SubscriberStats:
+        return self._subscriber.stats
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class _TopicNode:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TopicNode"] = {}
+        self.subscribers: List[_Subscriber] = []
+
+
+class TopicTrie:
+    """
+    Subscription index over dot-separated topics.
+
+    Patterns are split into segments where ``*`` matches exactly one segment
+    and ``#`` matches zero or more, so ``run.*`` matches ``run.started`` and
+    ``lease.#`` matches ``lease`` and ``lease.reclaimed.stale``. Matching walks
+    the trie one segment at a time, so its cost grows with topic depth (and
+    the number of wildcard branches) rather than with the number of
+    subscriptions. Results are memoized per topic until the next ``add``.
+    """
+
+    _CACHE_LIMIT = 4096
+
+    def __init__(self) -> None:
+        self._root = _TopicNode()
+        self._cache: Dict[str, Tuple[_Subscriber, ...]] = {}
+
+    def add(self, pattern: str, subscriber: _Subscriber) -> None:
+        node = self._root
+        for segment in pattern.split("."):
+            node = node.children.setdefault(segment, _TopicNode())
+        node.subscribers.append(subscriber)
+        self._cache.clear()
+
+    def remove(self, pattern: str, subscriber: _Subscriber) -> None:
+        path = [self._root]
+        for segment in pattern.split("."):
+            child = path[-1].children.get(segment)
+            if child is None:
+                return
+            path.append(child)
+        if subscriber not in path[-1].subscribers:
+            return
+        path[-1].subscribers.remove(subscriber)
+        # Prune nodes left with no subscribers and no children
+        for parent, segment, node in zip(
+            reversed(path[:-1]), reversed(pattern.split(".")), reversed(path[1:])
+        ):
+            if node.subscribers or node.children:
+                break
+            del parent.children[segment]
+        self._cache.clear()
+
+    def match(self, topic: str) -> Tuple[_Subscriber, ...]:
+        cached = self._cache.get(topic)
+        if cached is None:
+            found: Dict[int, _Subscriber] = {}
+            self._collect(self._root, topic.split("."), 0, found)
+            if len(self._cache) >= self._CACHE_LIMIT:
+                self._cache.clear()
+            cached = self._cache[topic] = tuple(found.values())
+        return cached
+
+    def _collect(
+        self,
+        node: _TopicNode,
+        segments: List[str],
+        i: int,
+        found: Dict[int, _Subscriber],
+    ) -> None:
+        multi = node.children.get("#")
+        if multi is not None:
+            if not multi.children:
+                # Trailing '#': everything below this point matches
+                for sub in multi.subscribers:
+                    found.setdefault(id(sub), sub)
+            else:
+                for j in range(i, len(segments) + 1):
+                    self._collect(multi, segments, j, found)
+        if i == len(segments):
+            for sub in node.subscribers:
+                found.setdefault(id(sub), sub)
+            return
+        for key in (segments[i], "*"):
+            child = node.children.get(key)
+            if child is not None:
+                self._collect(child, segments, i + 1, found)
 
 
 class LocalEventBus(EventBus):
-    def __init__(self):
-        self._h: Dict[str, List[Callable]] = {}
+    """
+    In-process event bus with one bounded queue and worker task per subscriber.
+
+    ``event_type`` in ``subscribe`` may be a wildcard pattern (``run.*``,
+    ``lease.#``); see ``TopicTrie`` for the matching rules.
+
+    Handlers may be plain callables or coroutine functions. Publishing only
+    enqueues, so a slow handler delays its own queue rather than the publisher
+    or other subscribers; when a queue is full the subscriber's
+    ``OverflowPolicy`` decides whether publish waits or an event is dropped.
+    Handler exceptions are counted and logged, never raised to the publisher.
+    Short-lived consumers (e.g. a streaming response) must ``close()`` the
+    ``Subscription`` they get back, which stops its worker and drops its queue.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    ):
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._topics = TopicTrie()
+        self._subscribers: List[_Subscriber] = []
+        self._closed = False
 
-    def subscribe(self, event_type, handler):
-        self._h.setdefault(event_type, []).append(handler)
+    def subscribe(
+        self,
+        event_type,
+        handler,
+        queue_size: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None,
+    ) -> Subscription:
+        if self._closed:
+            raise RuntimeError("Event bus is closed")
+        sub = _Subscriber(
+            event_type,
+            handler,
+            queue_size or self.queue_size,
+            overflow or self.overflow,
+        )
+        self._topics.add(event_type, sub)
+        self._subscribers.append(sub)
+        return Subscription(self, sub)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to a subscription; events still queued are dropped."""
+        sub = subscription._subscriber
+        if sub.closed:
+            return
+        self._topics.remove(sub.stats.event_type, sub)
+        self._subscribers.remove(sub)
+        sub.stop()
 
     async def publish(self, event_type, payload, metadata=None):
-        for h in self._h.get(event_type, []):
-            try:
-                h(payload, metadata)
-            except Exception:
-                pass
+        if self._closed:
+            raise RuntimeError("Event bus is closed")
+        for sub in self._topics.match(event_type):
+            # Workers start lazily so subscribe() works before the loop runs
+            if sub.worker is None:
+                sub.worker = asyncio.create_task(sub.run())
+            await sub.offer(payload, metadata)
+
+    async def close(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop accepting events, optionally wait for queues to drain, then stop workers."""
+        self._closed = True
+        if drain:
+            pending = [sub.queue.join() for sub in self._subscribers if sub.worker]
+            if pending:
+                try:
+                    await asyncio.wait_for(asyncio.gather(*pending), timeout)
+                except asyncio.TimeoutError:
+                    log.warning(json.dumps({"event": "event_bus_drain_timeout"}))
+        workers = [sub.worker for sub in self._subscribers if sub.worker]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-subscriber delivery, error, drop and latency counters."""
+        out = []
+        for sub in self._subscribers:
+            sub.stats.queued = sub.queue.qsize()
+            out.append(asdict(sub.stats))
+        return out
@@ -0,0 +1,269 @@
+"""
+Shared tail of an append-only JSONL log for SSE clients.
+
+One ``LogTail`` per log file runs a single reader task that follows appends
+and pushes each new line into a fixed-size ring buffer. Subscribers keep
+their own cursor into the ring and all wake on the same event, so N clients
+cost one file read per append instead of N. Followers receive everything
+available since their cursor as one batch, so a burst of appends costs each
+client one wakeup and one write.
+
+Records are identified by byte offsets: a record's SSE ``id`` is the offset
+just past its line, so a reconnecting client's ``Last-Event-ID`` is exactly
+where to resume. A client that falls out of the ring (or resumes from an
+offset older than it) catches up by reading the gap from the file once and
+then rejoins the ring. When the log is truncated or replaced, offsets start
+over: the ring is emptied, ``generation`` is bumped and running followers
+restart from the beginning of the new file.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+log = logging.getLogger("kyros.event_bus")
+
+READ_CHUNK = 1024 * 1024
+
+
+class TailRecord(NamedTuple):
+    offset: int  # where the line starts
+    end: int  # where the next line starts; used as the SSE event id
+    line: bytes  # without the trailing newline
+    frame: bytes  # pre-encoded SSE frame, shared by every subscriber
+
+
+def sse_frame(end: int, line: bytes) -> bytes:
+    return b"id: %d\ndata: %s\n\n" % (end, line)
+
+
+KEEPALIVE = b": keep-alive\n\n"
+
+
+def _read_range(path: str, start: int, stop: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+def _split_lines(data: bytes, offset: int) -> List[TailRecord]:
+    """Complete lines of ``data`` (which starts at ``offset``) as records."""
+    records = []
+    start = 0
+    while True:
+        newline = data.find(b"\n", start)
+        if newline < 0:
+            break
+        line = data[start:newline]
+        end = offset + newline + 1
+        if line.strip():
+            records.append(TailRecord(offset + start, end, line, sse_frame(end, line)))
+        start = newline + 1
+    return records
+
+
+class LogTail:
+    """Single reader following one log file, fanned out through a ring buffer."""
+
+    def __init__(self, path: str, capacity: int = 4096, poll_interval: float = 0.1):
+        self.path = path
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self._ring: List[Optional[TailRecord]] = [None] * capacity
+        self._first_seq = 0  # oldest sequence number still valid in the ring
+        self._next_seq = 0
+        self._inode: Optional[int] = None
+        try:
+            stat = os.stat(path)
+            self._position, self._inode = stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            self._position = 0
+        # Bumped whenever the log is truncated or replaced
+        self._generation = 0
+        self._changed = asyncio.Event()
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._subscribers = 0
+        self.reads = 0
+
+    @property
+    def position(self) -> int:
+        """Byte offset up to which the log has been read."""
+        return self._position
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    # --- reader ---
+
+    def _oldest_seq(self) -> int:
+        return max(self._first_seq, self._next_seq - self.capacity)
+
+    def _push(self, records: List[TailRecord]) -> None:
+        for record in records:
+            self._ring[self._next_seq % self.capacity] = record
+            self._next_seq += 1
+        # Wake everyone waiting on the current event, then start a new one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def poll(self) -> None:
+        """Read whatever has been appended since the last poll."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        size = stat.st_size
+        if size < self._position or (
+            self._inode is not None and stat.st_ino != self._inode
+        ):
+            # Truncated or replaced: old offsets no longer mean anything
+            self._position = 0
+            self._first_seq = self._next_seq
+            self._generation += 1
+            self._push([])  # wake followers so they restart
+        self._inode = stat.st_ino
+        if size == self._position:
+            return
+        stop = min(size, self._position + READ_CHUNK)
+        data = await asyncio.to_thread(_read_range, self.path, self._position, stop)
+        self.reads += 1
+        records = _split_lines(data, self._position)
+        if not records and stop < size and b"\n" not in data:
+            # A single line longer than READ_CHUNK: read the rest of it at once
+            stop = size
+            data = await asyncio.to_thread(_read_range, self.path, self._position, stop)
+            records = _split_lines(data, self._position)
+        if records:
+            self._position = records[-1].end
+            self._push(records)
+        elif b"\n" in data:
+            self._position += data.rfind(b"\n") + 1  # only blank lines
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except OSError as e:
+                log.warning(json.dumps({"event": "event_tail_error", "error": str(e)}))
+            await asyncio.sleep(self.poll_interval)
+
+    def _ensure_reader(self) -> None:
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+
+    # --- subscribers ---
+
+    def _locate(self, offset: int) -> Optional[int]:
+        """Sequence number of the first ring record at or after ``offset``."""
+        oldest = self._oldest_seq()
+        if oldest == self._next_seq:
+            return oldest if offset >= self._position else None
+        if offset < self._ring[oldest % self.capacity].offset:  # type: ignore[union-attr]
+            return None
+        return (
+            bisect_left(
+                range(oldest, self._next_seq),
+                offset,
+                key=lambda seq: self._ring[seq % self.capacity].offset,  # type: ignore[union-attr]
+            )
+            + oldest
+        )
+
+    async def _catch_up(self, offset: int) -> List[TailRecord]:
+        """Read records from ``offset`` up to where the ring begins."""
+        oldest = self._oldest_seq()
+        if oldest < self._next_seq:
+            stop = self._ring[oldest % self.capacity].offset  # type: ignore[union-attr]
+        else:
+            stop = self._position
+        stop = min(stop, offset + READ_CHUNK)
+        data = await asyncio.to_thread(_read_range, self.path, offset, stop)
+        records = _split_lines(data, offset)
+        if not records and stop > offset:
+            # Nothing complete in the chunk: skip blank lines or read the long line
+            full = await asyncio.to_thread(
+                _read_range, self.path, offset, self._position
+            )
+            records = _split_lines(full, offset)[:1]
+        return records
+
+    async def follow(
+        self, offset: Optional[int] = None, keepalive: Optional[float] = None
+    ) -> AsyncIterator[List[TailRecord]]:
+        """
+        Yield batches of records appended to the log, starting at ``offset``.
+
+        Without an offset only new records are yielded. With ``keepalive``, an
+        empty batch is yielded after that many idle seconds.
+        """
+        self._subscribers += 1
+        self._ensure_reader()
+        try:
+            if offset is None or offset > self._position:
+                offset = self._position
+            generation = self._generation
+            while True:
+                if generation != self._generation or offset > self._position:
+                    # The log was truncated: our offset is from the old file
+                    generation = self._generation
+                    offset = 0
+                seq = self._locate(offset)
+                if seq is None:
+                    records = await self._catch_up(offset)
+                    if generation != self._generation:
+                        continue  # read from a file that has since been truncated
+                    if not records:
+                        offset = self._position
+                        continue
+                elif seq < self._next_seq:
+                    records = [
+                        self._ring[s % self.capacity]  # type: ignore[misc]
+                        for s in range(seq, self._next_seq)
+                    ]
+                else:
+                    changed = self._changed
+                    try:
+                        await asyncio.wait_for(changed.wait(), keepalive)
+                    except asyncio.TimeoutError:
+                        yield []
+                    continue
+                offset = records[-1].end
+                yield records
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0:
+                await self.close()
+
+
+class TailHub:
+    """One ``LogTail`` per log path, shared by every request that follows it."""
+
+    def __init__(self, capacity: int = 4096, poll_interval: float = 0.1):
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self._tails: Dict[str, LogTail] = {}
+
+    def get(self, path: str) -> LogTail:
+        key = os.path.abspath(path)
+        tail = self._tails.get(key)
+        if tail is None:
+            tail = self._tails[key] = LogTail(path, self.capacity, self.poll_interval)
+        return tail
+
+    async def close(self) -> None:
+        for tail in self._tails.values():
+            await tail.close()
@@ -0,0 +1,361 @@
+"""
+Cross-process event bus over a Unix domain socket.
+
+Every process (e.g. each uvicorn worker) runs a ``UnixSocketEventBus``. The
+first one to take the ``<socket>.lock`` file lock also hosts the
+``UnixSocketBroker``; the rest connect to it. When the broker's process exits
+the lock is released and a reconnecting client takes over.
+
+Frames are ``!IB`` (body length, frame type) followed by a JSON body. Each
+event gets a broker sequence number and the broker keeps a bounded backlog,
+so a client that reconnects replays whatever it missed (after a failover,
+everything the new broker has relayed).
+Published frames stay buffered until a write of them has drained; a batch
+cut off by a dropped connection is sent again after reconnecting, so an
+event may be delivered twice across a failover but is not lost.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import struct
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from .bus import EventBus, LocalEventBus, Subscription
+
+log = logging.getLogger("kyros.event_bus")
+
+_HEADER = struct.Struct("!IB")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# Frame types
+HELLO = 1  # client -> broker: {"epoch", "last_seq"}
+WELCOME = 2  # broker -> client: {"epoch"}
+PUBLISH = 3  # client -> broker: {"event_type", "payload", "metadata"}
+EVENT = 4  # broker -> client: PUBLISH body plus "seq"
+
+
+def encode_frame(kind: int, body: Dict[str, Any]) -> bytes:
+    data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(data), kind) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+    length, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    body: Dict[str, Any] = json.loads(await reader.readexactly(length))
+    return kind, body
+
+
+class _Outbox:
+    """Per-connection sender that coalesces queued frames into one write."""
+
+    def __init__(self, writer: asyncio.StreamWriter, limit: int):
+        self.writer = writer
+        self.limit = limit
+        self._frames: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+
+    def send(self, frame: bytes) -> None:
+        if len(self._frames) >= self.limit:
+            # Too far behind: disconnect, the client replays from the backlog
+            self.writer.close()
+            return
+        self._frames.append(frame)
+        self._ready.set()
+
+    async def run(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            batch = b"".join(self._frames)
+            self._frames.clear()
+            self.writer.write(batch)
+            await self.writer.drain()
+
+
+class UnixSocketBroker:
+    """Fans published events out to every connected client process."""
+
+    def __init__(self, path: str, backlog: int = 10_000, client_buffer: int = 10_000):
+        self.path = path
+        self.epoch = uuid.uuid4().hex
+        self.client_buffer = client_buffer
+        self._seq = 0
+        self._backlog: Deque[Tuple[int, bytes]] = deque(maxlen=backlog)
+        self._clients: Set[_Outbox] = set()
+        self._handlers: Set["asyncio.Task[Any]"] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a broker that died
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Closing the sockets ends each handler's read loop cleanly
+            for client in list(self._clients):
+                client.writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        handler = asyncio.current_task()
+        if handler is not None:
+            self._handlers.add(handler)
+        outbox = _Outbox(writer, self.client_buffer)
+        sender = asyncio.create_task(outbox.run())
+        try:
+            kind, hello = await read_frame(reader)
+            if kind != HELLO:
+                return
+            outbox.send(encode_frame(WELCOME, {"epoch": self.epoch}))
+            # Sequence numbers are only meaningful within one broker epoch. A
+            # client of an earlier broker (failover) has seen none of this
+            # broker's events, so it gets the whole backlog; new clients get
+            # only live events
+            epoch = hello.get("epoch")
+            if epoch is not None:
+                last_seq = hello.get("last_seq", 0) if epoch == self.epoch else 0
+                for seq, frame in self._backlog:
+                    if seq > last_seq:
+                        outbox.send(frame)
+            self._clients.add(outbox)
+            while True:
+                kind, body = await read_frame(reader)
+                if kind == PUBLISH:
+                    self._fanout(body)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(outbox)
+            if handler is not None:
+                self._handlers.discard(handler)
+            sender.cancel()
+            writer.close()
+
+    def _fanout(self, body: Dict[str, Any]) -> None:
+        self._seq += 1
+        body["seq"] = self._seq
+        frame = encode_frame(EVENT, body)
+        self._backlog.append((self._seq, frame))
+        for client in list(self._clients):
+            client.send(frame)
+
+
+class UnixSocketEventBus(EventBus):
+    """
+    ``EventBus`` shared by all processes on one host through a local broker.
+
+    Handlers run in the subscribing process via an embedded ``LocalEventBus``
+    (so wildcards, queues and overflow policies behave the same), and every
+    event, including ones published locally, is delivered through the broker.
+    Events published while disconnected are buffered up to ``backlog`` and
+    sent after reconnecting; past that the oldest are dropped and counted in
+    ``stats()``. ``close(drain=True)`` sends what is still buffered, waiting
+    at most ``timeout`` (or ``flush_timeout``).
+    """
+
+    def __init__(
+        self,
+        path: str = "data/events.sock",
+        backlog: int = 10_000,
+        reconnect_delay: float = 0.05,
+        max_reconnect_delay: float = 2.0,
+        local: Optional[LocalEventBus] = None,
+        flush_timeout: float = 5.0,
+    ):
+        self.path = path
+        self.backlog = backlog
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.flush_timeout = flush_timeout
+        self._local = local or LocalEventBus()
+        self._pending: Deque[bytes] = deque(maxlen=backlog)
+        self._pending_ready = asyncio.Event()
+        # Set while nothing is buffered or being written
+        self._flushed = asyncio.Event()
+        self._dropped = 0
+        self._connected = asyncio.Event()
+        self._epoch: Optional[str] = None
+        self._last_seq = 0
+        self._broker: Optional[UnixSocketBroker] = None
+        self._lock_fd: Optional[int] = None
+        self._runner: Optional["asyncio.Task[None]"] = None
+        self._closed = False
+
+    @property
+    def is_broker(self) -> bool:
+        return self._broker is not None
+
+    def subscribe(self, event_type, handler, **kwargs) -> Subscription:
+        self._ensure_runner()
+        return self._local.subscribe(event_type, handler, **kwargs)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._local.unsubscribe(subscription)
+
+    async def publish(self, event_type, payload, metadata=None):
+        if self._closed:
+            raise RuntimeError("Event bus is closed")
+        self._ensure_runner()
+        if len(self._pending) == self.backlog:
+            self._dropped += 1  # append evicts the oldest frame
+        self._pending.append(
+            encode_frame(
+                PUBLISH,
+                {"event_type": event_type, "payload": payload, "metadata": metadata},
+            )
+        )
+        self._flushed.clear()
+        self._pending_ready.set()
+
+    async def start(self, timeout: float = 5.0) -> None:
+        """Connect (hosting the broker if nobody else is) and wait until ready."""
+        self._ensure_runner()
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def _ensure_runner(self) -> None:
+        # Connects on first use inside the loop, so the bus can be built
+        # (and subscribed to) before the loop runs without calling start()
+        if self._runner is not None or self._closed:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._runner = asyncio.create_task(self._run())
+
+    async def close(self, drain: bool = True, timeout: Optional[float] = None):
+        self._closed = True
+        if drain and self._runner is not None and not self._flushed.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._flushed.wait(),
+                    self.flush_timeout if timeout is None else timeout,
+                )
+            except asyncio.TimeoutError:
+                self._dropped += len(self._pending)
+                log.warning(
+                    json.dumps(
+                        {
+                            "event": "event_bus_flush_timeout",
+                            "unsent": len(self._pending),
+                        }
+                    )
+                )
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+        await self._local.close(drain=drain, timeout=timeout)
+        if self._broker is not None:
+            await self._broker.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "broker": self.is_broker,
+            "connected": self._connected.is_set(),
+            "epoch": self._epoch,
+            "last_seq": self._last_seq,
+            "pending": len(self._pending),
+            "dropped": self._dropped,
+            "subscribers": self._local.stats(),
+        }
+
+    async def _maybe_host_broker(self) -> None:
+        if self._broker is not None:
+            return
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # another process hosts the broker
+        broker = UnixSocketBroker(self.path, backlog=self.backlog)
+        await broker.start()
+        self._broker = broker
+        log.info(json.dumps({"event": "event_broker_started", "path": self.path}))
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        # Runs until cancelled, so close() can still reconnect to flush
+        while True:
+            try:
+                await self._maybe_host_broker()
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            delay = self.reconnect_delay
+            try:
+                await self._session(reader, writer)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                pass
+            finally:
+                self._connected.clear()
+                writer.close()
+
+    async def _session(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        writer.write(
+            encode_frame(HELLO, {"epoch": self._epoch, "last_seq": self._last_seq})
+        )
+        kind, welcome = await read_frame(reader)
+        if kind != WELCOME:
+            raise ValueError(f"Expected WELCOME frame, got {kind}")
+        if welcome["epoch"] != self._epoch:
+            self._epoch = welcome["epoch"]
+            self._last_seq = 0
+        self._connected.set()
+
+        sender = asyncio.create_task(self._send_pending(writer))
+        try:
+            while True:
+                kind, body = await read_frame(reader)
+                if kind != EVENT or body["seq"] <= self._last_seq:
+                    continue
+                self._last_seq = body["seq"]
+                await self._local.publish(
+                    body["event_type"], body["payload"], body.get("metadata")
+                )
+        finally:
+            sender.cancel()
+
+    async def _send_pending(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            if not self._pending:
+                self._pending_ready.clear()
+                self._flushed.set()
+                await self._pending_ready.wait()
+            batch = list(self._pending)
+            self._pending.clear()
+            try:
+                writer.write(b"".join(batch))
+                await writer.drain()
+            except BaseException:
+                # Not known to be sent (connection lost or session ended):
+                # put the batch back ahead of anything published since
+                overflow = len(self._pending) + len(batch) - self.backlog
+                if overflow > 0:
+                    self._dropped += overflow  # extendleft evicts the newest
+                self._pending.extendleft(reversed(batch))
+                raise
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+CPU-bound agents inline vs in the worker process pool.
+
+Each task parses a source file into an AST a number of times (standing in
+for diff parsing / AST analysis). Eight tasks are run concurrently on the
+event loop and then through a ``WorkerPool``; a ticker coroutine records
+the worst event loop stall meanwhile, which is what every other request
+would wait behind. Also measures round-trip overhead for a trivial task.
+"""
+
+import ast
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.contracts import AgentBase, AgentContext  # noqa: E402
+from agent_sdk.discovery import AgentManifest  # noqa: E402
+from agent_sdk.runners.worker_pool import PooledAgent, WorkerPool  # noqa: E402
+
+SOURCE = os.path.join(
+    os.path.dirname(__file__), "..", "packages", "agent_sdk", "protocol", "wire.py"
+)
+TASKS = 8
+PARSES = 20
+TRIVIAL = 500
+
+
+class ParseAgent(AgentBase):
+    def capabilities(self):
+        return ["analysis"]
+
+    async def execute(self, ctx):
+        with open(SOURCE) as f:
+            source = f.read()
+        nodes = 0
+        for _ in range(ctx.task.get("parses", PARSES)):
+            nodes += sum(1 for _ in ast.walk(ast.parse(source)))
+        return {"status": "success", "nodes": nodes}
+
+
+async def timed(agent, tasks, parses=PARSES):
+    ctx = AgentContext(task={"parses": parses}, tools=[], memory={}, telemetry={})
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - before)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(agent.execute(ctx) for _ in range(tasks)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick
+    return elapsed, stall
+
+
+async def main_async() -> None:
+    elapsed, stall = await timed(ParseAgent(), TASKS)
+    print(
+        f"inline        {elapsed * 1e3:7.0f} ms  worst loop stall {stall * 1e3:6.0f} ms"
+    )
+
+    size = os.cpu_count() or 1
+    pool = WorkerPool(size=size)
+    manifest = AgentManifest(
+        name="ParseAgent", factory="bench_agent_workers:ParseAgent"
+    )
+    agent = PooledAgent(pool, manifest)
+    await pool.start()
+    await timed(agent, size, parses=1)  # import the agent module in every worker
+    elapsed, stall = await timed(agent, TASKS)
+    print(
+        f"{size} workers   {elapsed * 1e3:7.0f} ms  worst loop stall {stall * 1e3:6.0f} ms"
+    )
+    elapsed, _ = await timed(agent, TRIVIAL, parses=0)
+    print(
+        f"round trip    {elapsed * 1e6 / TRIVIAL:7.0f} us per trivial task (pipelined)"
+    )
+    await pool.close()
+
+
+def main() -> int:
+    asyncio.run(main_async())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
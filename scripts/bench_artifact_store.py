@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Measure the content-addressed artifact store.
+
+Times storing a 64 MiB output (hash + write + fsync + rename), storing it
+again (dedupe: hash only), reading 4 KiB ranges at random offsets through
+mmap against reading the whole file, and the size of a stored interaction
+with the output embedded versus referenced.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.artifacts.blob_store import BlobStore  # noqa: E402
+
+SIZE = 64 * 1024 * 1024
+RANGES = 2_000
+
+
+def main() -> int:
+    data = os.urandom(1024 * 1024) * (SIZE // (1024 * 1024))
+    with tempfile.TemporaryDirectory() as root:
+        store = BlobStore(root)
+
+        start = time.perf_counter()
+        ref = store.put(data)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        store.put(data)
+        again = time.perf_counter() - start
+        print(
+            f"put 64 MiB   {first * 1e3:7.1f} ms  ({SIZE / first / 2**20:6.0f} MiB/s)"
+        )
+        print(f"put again    {again * 1e3:7.1f} ms  (dedupe, no write)")
+
+        rng = random.Random(3)
+        offsets = [rng.randrange(SIZE - 4096) for _ in range(RANGES)]
+        with store.open(ref) as blob:
+            start = time.perf_counter()
+            for offset in offsets:
+                blob.read(offset, offset + 4096)
+            mapped = (time.perf_counter() - start) / RANGES
+        start = time.perf_counter()
+        for offset in offsets[:20]:
+            with open(store.path(ref), "rb") as f:
+                f.read()[offset : offset + 4096]
+        whole = (time.perf_counter() - start) / 20
+        print(
+            f"4 KiB range  {mapped * 1e6:7.1f} us mmap  vs {whole * 1e3:7.1f} ms read-all"
+        )
+
+        output = "line of test output\n" * 50_000  # ~1 MiB of stdout
+        embedded = json.dumps({"output": output, "artifacts": []})
+        referenced = json.dumps(
+            {
+                "output": output[: store.inline_limit],
+                "output_ref": store.put(output),
+                "artifacts": [],
+            }
+        )
+        print(
+            f"stored result {len(embedded) / 1024:7.0f} KiB embedded  "
+            f"vs {len(referenced) / 1024:5.0f} KiB referenced"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark topic matching in LocalEventBus at thousands of subscriptions.
+
+Compares the subscription trie (cold and memoized) against a linear scan that
+tests every pattern against the topic, then measures end-to-end publish cost.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from event_bus.bus import LocalEventBus, TopicTrie  # noqa: E402
+
+
+def patterns(n):
+    """n subscriptions: mostly exact topics plus '*' and '#' wildcards."""
+    out = []
+    for i in range(n):
+        svc = f"svc{i % 500}"
+        if i % 10 == 0:
+            out.append(f"{svc}.*")
+        elif i % 25 == 1:
+            out.append(f"{svc}.#")
+        else:
+            out.append(f"{svc}.event{i}.done")
+    return out
+
+
+def compile_linear(pats):
+    def to_regex(p):
+        parts = []
+        for seg in p.split("."):
+            if seg == "*":
+                parts.append(r"[^.]+")
+            elif seg == "#":
+                parts.append(r".*")
+            else:
+                parts.append(re.escape(seg))
+        return re.compile(r"\.".join(parts) + "$")
+
+    return [(p, to_regex(p)) for p in pats]
+
+
+def bench(label, fn, topics, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for topic in topics:
+            fn(topic)
+        best = min(best, time.perf_counter() - start)
+    per_call = best / len(topics) * 1e6
+    print(f"  {label:<22} {per_call:8.2f} us/match")
+
+
+def main() -> int:
+    topics = [f"svc{i % 500}.event{i}.done" for i in range(2000)]
+    for n in (1_000, 5_000, 20_000):
+        pats = patterns(n)
+        print(f"{n} subscriptions")
+
+        trie = TopicTrie()
+        for p in pats:
+            trie.add(p, p)  # type: ignore[arg-type]
+
+        def cold(topic, trie=trie):
+            trie._cache.clear()
+            return trie.match(topic)
+
+        linear = compile_linear(pats)
+
+        def scan(topic, linear=linear):
+            return [p for p, rx in linear if rx.match(topic)]
+
+        bench("trie (cold)", cold, topics)
+        bench("trie (memoized)", trie.match, topics)
+        bench("linear regex scan", scan, topics[:200], repeat=1)
+
+    async def publish_loop():
+        bus = LocalEventBus()
+        for p in patterns(5_000):
+            bus.subscribe(p, lambda payload, metadata: None)
+        start = time.perf_counter()
+        for topic in topics:
+            await bus.publish(topic, {})
+        elapsed = time.perf_counter() - start
+        await bus.close()
+        print(f"publish (5000 subs)      {elapsed / len(topics) * 1e6:8.2f} us/event")
+
+    asyncio.run(publish_loop())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared event-log tail at 1,000 subscribers.
+
+Appends batches of events to a JSONL log while N followers consume them, and
+reports end-to-end delivery time, per-delivery cost and how many file reads
+the shared reader made. For comparison it runs the naive approach where every
+client polls the file itself.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from event_bus.tail import LogTail  # noqa: E402
+
+SUBSCRIBERS = 1_000
+EVENTS = 2_000
+BATCH = 50
+POLL = 0.01
+
+
+def event_lines(start, count):
+    return "".join(
+        json.dumps({"ts": time.time(), "event": "task_updated", "n": n}) + "\n"
+        for n in range(start, start + count)
+    )
+
+
+async def write_events(path):
+    with open(path, "a") as f:
+        for start in range(0, EVENTS, BATCH):
+            f.write(event_lines(start, BATCH))
+            f.flush()
+            await asyncio.sleep(POLL)
+
+
+async def shared_tail(path):
+    tail = LogTail(path, capacity=4096, poll_interval=POLL)
+
+    async def follower():
+        count = 0
+        async for batch in tail.follow():
+            count += len(batch)
+            if count == EVENTS:
+                return
+
+    followers = [asyncio.create_task(follower()) for _ in range(SUBSCRIBERS)]
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await write_events(path)
+    await asyncio.gather(*followers)
+    elapsed = time.perf_counter() - start
+    await tail.close()
+    return elapsed, tail.reads
+
+
+async def polling_clients(path):
+    reads = 0
+    position = os.path.getsize(path)
+
+    async def client():
+        nonlocal reads
+        offset, count = position, 0
+        while count < EVENTS:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            reads += 1
+            complete = data[: data.rfind(b"\n") + 1]
+            offset += len(complete)
+            count += complete.count(b"\n")
+            await asyncio.sleep(POLL)
+
+    clients = [asyncio.create_task(client()) for _ in range(SUBSCRIBERS)]
+    start = time.perf_counter()
+    await write_events(path)
+    await asyncio.gather(*clients)
+    return time.perf_counter() - start, reads
+
+
+def report(label, elapsed, reads):
+    deliveries = SUBSCRIBERS * EVENTS
+    print(
+        f"  {label:<18} {elapsed:7.2f} s  "
+        f"{elapsed / deliveries * 1e6:6.2f} us/delivery  {reads:>8} file reads"
+    )
+
+
+def main() -> int:
+    print(f"{SUBSCRIBERS} subscribers, {EVENTS} events in batches of {BATCH}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.jsonl")
+        open(path, "w").close()
+        report("shared tail", *asyncio.run(shared_tail(path)))
+        report("per-client polling", *asyncio.run(polling_clients(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+LLM router client against a local stub router (20 ms per completion).
+
+Compares a fresh httpx client per call (what each agent opening its own
+connections amounts to) with the shared pooled client, then measures
+coalescing of repeated prompts and warm on-disk cache hits. Reports wall
+time, router requests and TCP connections opened.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.llm.router_client import LLMRouterClient  # noqa: E402
+
+LATENCY = 0.02
+CALLS = 200
+CONCURRENCY = 16
+DISTINCT = 10
+
+counters = {"requests": 0, "ports": set()}
+lock = threading.Lock()
+
+
+class StubRouter(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with lock:
+            counters["requests"] += 1
+            counters["ports"].add(self.client_address[1])
+        time.sleep(LATENCY)
+        reply = {"choices": [{"message": {"content": body["messages"][-1]["content"]}}]}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def reset():
+    with lock:
+        counters["requests"] = 0
+        counters["ports"] = set()
+
+
+def report(label, elapsed):
+    print(
+        f"{label:22s} {elapsed * 1e3:7.0f} ms  {counters['requests']:4d} requests"
+        f"  {len(counters['ports']):4d} connections"
+    )
+
+
+async def bounded(calls):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def run(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def main_async(base_url: str) -> None:
+    async def fresh_client(prompt):
+        async with httpx.AsyncClient(base_url=base_url) as http:
+            body = {"model": "m", "messages": [{"role": "user", "content": prompt}]}
+            response = await http.post("/chat/completions", json=body)
+            return response.json()
+
+    reset()
+    start = time.perf_counter()
+    await bounded([fresh_client(f"p{i}") for i in range(CALLS)])
+    report("client per call", time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        async with LLMRouterClient(
+            base_url, max_concurrency=CONCURRENCY, cache_dir=cache_dir
+        ) as client:
+            reset()
+            start = time.perf_counter()
+            await bounded(
+                [client.complete("m", f"p{i}", cache=False) for i in range(CALLS)]
+            )
+            report("pooled", time.perf_counter() - start)
+
+            reset()
+            start = time.perf_counter()
+            prompts = [f"q{i % DISTINCT}" for i in range(CALLS)]
+            await asyncio.gather(
+                *(client.complete("m", p, cache=False) for p in prompts)
+            )
+            report(f"coalesced ({DISTINCT} distinct)", time.perf_counter() - start)
+
+            await asyncio.gather(*(client.complete("m", f"c{i}") for i in range(CALLS)))
+            reset()
+            start = time.perf_counter()
+            await asyncio.gather(*(client.complete("m", f"c{i}") for i in range(CALLS)))
+            report("disk cache (warm)", time.perf_counter() - start)
+
+
+def main() -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRouter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(main_async(f"http://127.0.0.1:{server.server_address[1]}"))
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
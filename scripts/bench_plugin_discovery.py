@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure startup cost of manifest-based plugin discovery as tool packs grow.
+
+Generates N tool packs, each a manifest with five tools and an executor
+module whose import costs ~5 ms (standing in for a pack's own
+dependencies), then times discovering and registering them lazily against
+importing every executor eagerly, and the first call into one pack.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.discovery import discover, import_target, lazy_tools  # noqa: E402
+from agent_sdk.tools.protocol import ToolRegistry  # noqa: E402
+
+PACK_MODULE = """
+import time
+time.sleep(0.005)
+from agent_sdk.tools.protocol import ToolExecutor
+class Executor(ToolExecutor):
+    async def execute(self, name, parameters):
+        return {"tool": name}
+"""
+
+
+def make_packs(root, count, prefix):
+    manifests = os.path.join(root, f"manifests_{prefix}")
+    os.makedirs(manifests)
+    for i in range(count):
+        module = f"{prefix}_pack_{i}"
+        with open(os.path.join(root, module + ".py"), "w") as f:
+            f.write(PACK_MODULE)
+        tools = [
+            {
+                "name": f"{module}_tool_{j}",
+                "description": "generated",
+                "parameters": {"type": "object"},
+                "returns": {},
+                "executor": f"{module}:Executor",
+            }
+            for j in range(5)
+        ]
+        with open(os.path.join(manifests, module + ".json"), "w") as f:
+            json.dump({"tools": tools}, f)
+    return manifests
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as root:
+        sys.path.insert(0, root)
+        for count in (10, 50, 100):
+            manifests = make_packs(root, count, f"lazy{count}")
+            start = time.perf_counter()
+            registry = ToolRegistry()
+            for schema, executor in lazy_tools(discover([manifests], None).manifests):
+                registry.register(schema, executor)
+            lazy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            asyncio.run(registry.execute_tool(f"lazy{count}_pack_0_tool_0", {}))
+            first = time.perf_counter() - start
+
+            eager_dir = make_packs(root, count, f"eager{count}")
+            start = time.perf_counter()
+            for manifest in discover([eager_dir], None).manifests:
+                for tool in manifest.tools:
+                    import_target(tool.executor)
+            eager = time.perf_counter() - start
+
+            print(
+                f"{count:>3} packs  lazy startup {lazy * 1e3:6.1f} ms  "
+                f"eager startup {eager * 1e3:7.1f} ms  "
+                f"first call {first * 1e3:5.1f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
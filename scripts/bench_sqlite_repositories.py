@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark filtered task listing in SQLiteTaskRepository at 100k tasks.
+
+Loads tasks with a spread of statuses, assignees and labels, then times the
+Kanban-style list queries (first page and a keyset-paged follow-up) and
+prints each query plan so a missing index shows up as a SCAN or TEMP B-TREE.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(
+    os.path.join(os.path.dirname(__file__), "..", "packages", "data-access")
+)
+
+from sqlite_repositories import SQLiteDatabase, compile_task_query  # noqa: E402
+
+TASKS = 100_000
+STATUSES = ["new", "claimed", "in_progress", "review", "blocked", "done"]
+QUERIES = {
+    "all": {},
+    "status": {"status": "in_progress"},
+    "status in": {"status": ["review", "blocked"]},
+    "assignee": {"assignee": "agent-7"},
+    "label": {"label": "frontend"},
+    "status+label": {"status": "done", "label": "backend"},
+    "updated_after": {"updated_after": "2000-01-01T00:00:00Z"},
+}
+
+
+async def load(db):
+    rng = random.Random(7)
+    async with db.unit_of_work() as uow:
+        for i in range(TASKS):
+            await uow.tasks.save(
+                {
+                    "id": f"T-{i:06d}",
+                    "title": f"Task {i}",
+                    "status": rng.choice(STATUSES),
+                    "assignee": f"agent-{rng.randrange(50)}",
+                    "labels": rng.sample(["frontend", "backend", "infra", "docs"], 2),
+                }
+            )
+
+
+async def bench(db, label, filters, repeat=200):
+    async with db.unit_of_work() as uow:
+        items, cursor = await uow.tasks.page(limit=50, **filters)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await uow.tasks.page(limit=50, **filters)
+        first = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await uow.tasks.page(limit=50, after=cursor, **filters)
+        paged = (time.perf_counter() - start) / repeat
+        print(f"  {label:<14} first {first * 1e3:6.3f} ms  next {paged * 1e3:6.3f} ms")
+
+
+async def explain(db):
+    conn = await db.connect()
+    for label, filters in QUERIES.items():
+        status = filters.get("status")
+        statuses = (
+            0 if status is None else 1 if isinstance(status, str) else len(status)
+        )
+        sql = compile_task_query(
+            statuses,
+            "assignee" in filters,
+            "label" in filters,
+            "updated_after" in filters,
+            False,
+            True,
+        )
+        params = [None] * sql.count("?")
+        plan = await conn.execute_fetchall("EXPLAIN QUERY PLAN " + sql, params)
+        print(f"  {label:<14} " + "; ".join(row[3] for row in plan))
+
+
+async def main_async(path):
+    db = SQLiteDatabase(path)
+    start = time.perf_counter()
+    await load(db)
+    print(f"loaded {TASKS} tasks in {time.perf_counter() - start:.1f} s")
+    print("list latency (limit 50, through aiosqlite):")
+    for label, filters in QUERIES.items():
+        await bench(db, label, filters)
+    print("query plans:")
+    await explain(db)
+    await db.close()
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main_async(os.path.join(tmp, "bench.db")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
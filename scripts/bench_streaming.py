@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time to first feedback with and without execute_stream.
+
+An agent does five 50 ms steps and produces one artifact per step. Its
+increments are forwarded to an event bus subscriber as the orchestrator
+does; the same agent run through ``execute`` (the fallback path) delivers
+nothing until the end. Also measures the per-increment forwarding cost.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.contracts import AgentBase, AgentContext, final_result  # noqa: E402
+from agent_sdk.protocol.messages import AgentMessage, Artifact  # noqa: E402
+from event_bus.bus import LocalEventBus, OverflowPolicy  # noqa: E402
+
+STEPS = 5
+STEP_SECONDS = 0.05
+INCREMENTS = 20_000
+
+
+class SteppingAgent(AgentBase):
+    def __init__(self, steps=STEPS, delay=STEP_SECONDS):
+        self.steps = steps
+        self.delay = delay
+
+    def capabilities(self):
+        return ["bench"]
+
+    async def execute(self, ctx):
+        return await final_result(self.execute_stream(ctx))
+
+    async def execute_stream(self, ctx):
+        yield AgentMessage(intent="bench", rationale_summary="stepping")
+        for step in range(self.steps):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield Artifact(kind="output", ref=f"step-{step}", summary="step")
+        yield {"status": "success"}
+
+
+async def run(agent, ctx, stream):
+    bus = LocalEventBus(overflow=OverflowPolicy.DROP_OLDEST)
+    arrivals = []
+    bus.subscribe(
+        "run.#", lambda payload, metadata: arrivals.append(time.perf_counter())
+    )
+    start = time.perf_counter()
+    if stream:
+        async for update in agent.execute_stream(ctx):
+            if not isinstance(update, dict):
+                kind = "message" if isinstance(update, AgentMessage) else "artifact"
+                await bus.publish(f"run.{kind}", {kind: update.model_dump(mode="json")})
+    else:
+        await agent.execute(ctx)
+        await bus.publish("run.completed", {"status": "success"})
+    await bus.close()
+    end = time.perf_counter()
+    return (arrivals[0] - start) * 1e3, (end - start) * 1e3, len(arrivals)
+
+
+async def main_async() -> None:
+    ctx = AgentContext(task={}, tools=[], memory={}, telemetry={})
+    for label, stream in (("execute", False), ("execute_stream", True)):
+        first, total, events = await run(SteppingAgent(), ctx, stream)
+        print(
+            f"{label:15s} first feedback {first:6.1f} ms  total {total:6.1f} ms  events {events}"
+        )
+
+    agent = SteppingAgent(steps=INCREMENTS, delay=0)
+    _, total, events = await run(agent, ctx, True)
+    # The agent never yields to the loop here, so the subscriber's queue
+    # (1000 events, drop-oldest) overflows instead of slowing the agent
+    print(
+        f"forwarding      {total * 1e3 / (INCREMENTS + 1):6.1f} us per increment "
+        f"({events} of {INCREMENTS + 1} delivered)"
+    )
+
+
+def main() -> int:
+    asyncio.run(main_async())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
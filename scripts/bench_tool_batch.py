@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compare sequential execute_tool calls with one execute_tools batch.
+
+Five independent I/O-bound calls (simulated with a sleep) are run one per
+await and then as a batch, with and without a per-executor concurrency
+limit, and the per-call overhead of the batch path is measured with a
+no-op tool.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.tools.protocol import ToolExecutor, ToolRegistry, ToolSchema  # noqa: E402
+
+LATENCY = 0.05
+BATCH = 5
+CALLS = 20_000
+
+
+class SleepExecutor(ToolExecutor):
+    async def execute(self, name, parameters):
+        if parameters.get("sleep"):
+            await asyncio.sleep(LATENCY)
+        return {}
+
+
+def registry(executor_concurrency=None):
+    reg = ToolRegistry(executor_concurrency=executor_concurrency)
+    reg.register(
+        ToolSchema(
+            name="io",
+            description="I/O-bound call",
+            parameters={"type": "object"},
+            returns={},
+            timeout_seconds=1.0,
+        ),
+        SleepExecutor(),
+    )
+    return reg
+
+
+async def main_async():
+    calls = [{"name": "io", "parameters": {"sleep": True}}] * BATCH
+
+    reg = registry()
+    start = time.perf_counter()
+    for call in calls:
+        await reg.execute_tool(call["name"], call["parameters"])
+    print(f"sequential          {(time.perf_counter() - start) * 1e3:6.1f} ms")
+
+    for limit in (None, 2):
+        reg = registry(limit)
+        start = time.perf_counter()
+        results = await reg.execute_tools(calls)
+        assert all(r.ok for r in results)
+        label = f"batch (limit {limit})"
+        print(f"{label:<19} {(time.perf_counter() - start) * 1e3:6.1f} ms")
+
+    reg = registry()
+    noop = [{"name": "io", "parameters": {}}] * BATCH
+    start = time.perf_counter()
+    for _ in range(CALLS // BATCH):
+        await reg.execute_tools(noop)
+    per_call = (time.perf_counter() - start) / CALLS * 1e6
+    print(f"batch overhead      {per_call:6.1f} us/call (no-op tool, with timeout)")
+
+
+def main() -> int:
+    asyncio.run(main_async())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measure memoized execute_tool calls against uncached ones.
+
+A pure tool whose executor does ~200 us of CPU work is called with a small
+set of repeating argument tuples (as an agent loop would), once with the
+tool declared pure and once without, and the cache counters are printed.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.tools.protocol import ToolExecutor, ToolRegistry, ToolSchema  # noqa: E402
+
+CALLS = 20_000
+DISTINCT = 200
+
+
+class WorkExecutor(ToolExecutor):
+    async def execute(self, name, parameters):
+        total = 0
+        for i in range(5_000):
+            total += i * parameters["a"]
+        return {"result": total + parameters["b"]}
+
+
+async def run(pure):
+    registry = ToolRegistry(cache_size=1024)
+    registry.register(
+        ToolSchema(
+            name="work",
+            description="CPU-bound pure function",
+            parameters={
+                "type": "object",
+                "properties": {"a": {"type": "number"}, "b": {"type": "number"}},
+            },
+            returns={},
+            pure=pure,
+        ),
+        WorkExecutor(),
+    )
+    rng = random.Random(1)
+    args = [{"a": rng.randrange(DISTINCT), "b": 1} for _ in range(CALLS)]
+    start = time.perf_counter()
+    for parameters in args:
+        await registry.execute_tool("work", parameters)
+    elapsed = (time.perf_counter() - start) / CALLS * 1e6
+    return elapsed, registry.cache_stats()
+
+
+async def main_async():
+    uncached, _ = await run(False)
+    cached, stats = await run(True)
+    print(f"uncached {uncached:7.1f} us/call")
+    print(f"pure     {cached:7.1f} us/call  hit rate {stats['hit_rate']:.3f}")
+    print(f"stats    {stats}")
+
+
+def main() -> int:
+    asyncio.run(main_async())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
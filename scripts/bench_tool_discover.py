@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark ToolRegistry.discover with thousands of registered tools.
+
+Compares the capability index (cold, i.e. cache cleared before each call,
+and cached) against the previous linear scan over every tool.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.tools.protocol import ToolRegistry, ToolSchema  # noqa: E402
+
+CAPABILITIES = [f"cap{i}" for i in range(200)]
+
+
+def make_tools(n, rng):
+    return [
+        ToolSchema(
+            name=f"tool{i}",
+            description="benchmark tool",
+            parameters={"type": "object"},
+            returns={"type": "object"},
+            capabilities=rng.sample(CAPABILITIES, rng.randint(0, 3)),
+        )
+        for i in range(n)
+    ]
+
+
+def linear_discover(tools, capabilities):
+    return [
+        tool
+        for tool in tools
+        if not tool.capabilities
+        or all(cap in capabilities for cap in tool.capabilities)
+    ]
+
+
+def bench(label, fn, queries, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<16} {best / len(queries) * 1e6:9.1f} us/discover")
+
+
+def main() -> int:
+    rng = random.Random(3)
+    queries = [rng.sample(CAPABILITIES, 12) for _ in range(20)] * 10
+    for n in (1_000, 5_000, 20_000):
+        tools = make_tools(n, rng)
+        registry = ToolRegistry()
+        for tool in tools:
+            registry.register(tool)
+
+        def cold(query, registry=registry):
+            registry._discover_cache.clear()
+            return registry.discover(query)
+
+        for query in queries[:20]:
+            assert [t.name for t in registry.discover(query)] == [
+                t.name for t in linear_discover(tools, query)
+            ]
+
+        print(f"{n} tools")
+        bench("index (cold)", cold, queries)
+        bench("index (cached)", registry.discover, queries)
+        bench("linear scan", lambda q, tools=tools: linear_discover(tools, q), queries)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
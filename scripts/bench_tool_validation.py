@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Measure the per-call overhead of strict parameter validation in ToolRegistry.
+
+Runs execute_tool against a no-op executor with validation "off" and
+"strict" for a flat and a nested parameter schema, and reports the cost of
+compiling each schema at register time.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.tools.protocol import ToolExecutor, ToolRegistry, ToolSchema  # noqa: E402
+from agent_sdk.tools.validation import compile_schema  # noqa: E402
+
+CALLS = 50_000
+
+SCHEMAS = {
+    "flat": (
+        {
+            "type": "object",
+            "properties": {"a": {"type": "number"}, "b": {"type": "number"}},
+            "required": ["a", "b"],
+        },
+        {"a": 1, "b": 2.5},
+    ),
+    "nested": (
+        {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "pattern": "^[\\w./-]+$"},
+                "mode": {"enum": ["read", "write", "append"]},
+                "edits": {
+                    "type": "array",
+                    "maxItems": 100,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "line": {"type": "integer", "minimum": 1},
+                            "text": {"type": "string", "maxLength": 10_000},
+                        },
+                        "required": ["line", "text"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["path", "mode"],
+        },
+        {
+            "path": "src/app/main.py",
+            "mode": "write",
+            "edits": [{"line": i + 1, "text": "x = 1"} for i in range(10)],
+        },
+    ),
+}
+
+
+class NoopExecutor(ToolExecutor):
+    async def execute(self, name, parameters):
+        return {}
+
+
+async def per_call(registry, name, parameters):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await registry.execute_tool(name, parameters)
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+async def main_async():
+    for label, (schema, parameters) in SCHEMAS.items():
+        tool = ToolSchema(name=label, description=label, parameters=schema, returns={})
+        timings = {}
+        for mode in ("off", "strict"):
+            registry = ToolRegistry(validation=mode)
+            registry.register(tool, NoopExecutor())
+            timings[mode] = await per_call(registry, label, parameters)
+
+        start = time.perf_counter()
+        for _ in range(1_000):
+            compile_schema(schema)
+        compile_us = (time.perf_counter() - start) / 1_000 * 1e6
+
+        print(
+            f"{label:<7} off {timings['off']:6.2f} us/call  "
+            f"strict {timings['strict']:6.2f} us/call  "
+            f"overhead {timings['strict'] - timings['off']:6.2f} us  "
+            f"compile {compile_us:6.1f} us"
+        )
+
+
+def main() -> int:
+    asyncio.run(main_async())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
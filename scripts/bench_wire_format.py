@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare the binary wire format with the JSON path for SDK models.
+
+The JSON path is what results go through today: ``model.dict()`` then
+``json.dumps(...).encode()``, and ``json.loads`` then ``Model(**fields)``.
+The wire path is ``encode_model``/``decode_model`` (and ``encode_parts``,
+which leaves large payloads as separate chunks). Reports per-op time and
+tracemalloc peak memory for a small message, a message with 20 artifacts
+and a sandbox result with 8 MiB of stdout.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "packages"))
+
+from agent_sdk.protocol.messages import AgentMessage, Artifact  # noqa: E402
+from agent_sdk.protocol.wire import decode_model, encode_model, encode_parts  # noqa: E402
+from agent_sdk.sandbox.executor import ExecutionResult  # noqa: E402
+
+
+def cases():
+    small = AgentMessage(
+        intent="Process task: echo",
+        confidence=0.8,
+        rationale_summary="Analyzing task requirements and executing tools",
+        next_actions=["Task completed successfully"],
+        agent_id="ExampleAgent",
+        task_id="T-1",
+    )
+    artifacts = small.model_copy(
+        update={
+            "artifacts": [
+                Artifact(
+                    kind="output",
+                    ref=f"stdout_{i}",
+                    summary="Code output (python)",
+                    metadata={"language": "python", "exit_code": 0, "lines": i},
+                )
+                for i in range(20)
+            ]
+        }
+    )
+    line = 'test_module.py::test_case PASSED\t[ 42%] "quoted" path\\to\\file\n'
+    large = ExecutionResult(
+        exit_code=0,
+        stdout=line * (8 * 1024 * 1024 // len(line)),
+        stderr="",
+        execution_time=1.25,
+    )
+    return [("small message", small, 20_000), ("20 artifacts", artifacts, 5_000)] + [
+        ("8 MiB stdout", large, 10)
+    ]
+
+
+def json_encode(model):
+    return json.dumps(model.dict(), default=str).encode("utf-8")
+
+
+def json_decode(cls, data):
+    return cls(**json.loads(data))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def peak(fn):
+    tracemalloc.start()
+    fn()
+    _, high = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return high
+
+
+def main() -> int:
+    for label, model, repeat in cases():
+        cls = type(model)
+        as_json = json_encode(model)
+        as_wire = encode_model(model)
+        paths = {
+            "json": (lambda: json_encode(model), lambda: json_decode(cls, as_json)),
+            "wire": (lambda: encode_model(model), lambda: decode_model(cls, as_wire)),
+            "wire parts": (lambda: encode_parts(model.model_dump()), None),
+        }
+        print(f"{label}: json {len(as_json)} bytes, wire {len(as_wire)} bytes")
+        for name, (encode, decode) in paths.items():
+            enc = timed(encode, repeat)
+            line = f"  {name:<10} encode {enc * 1e6:9.1f} us  peak {peak(encode) / 1024:8.0f} KiB"
+            if decode is not None:
+                dec = timed(decode, repeat)
+                line += (
+                    f"  decode {dec * 1e6:9.1f} us  peak {peak(decode) / 1024:8.0f} KiB"
+                )
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())